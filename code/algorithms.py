@@ -1,203 +1,114 @@
 from code.classes.nodes_class import Node
 from code.classes.wire_class import Wire, WirePoint
 from code.classes.grid_class import Grid_3D
-from code.classes.segment_class import Segment
-import heapq
 
 
-def a_star_algorithm(node1: Node, node2: Node, grid: Grid_3D, nodes_csv_path: str, netlist_csv_path: str) -> Wire|None:
+def a_star_algorithm(node1: Node, node2: Node, grid: Grid_3D) -> Wire|None:
     """
     Same as BFS/Lee's algorithm, except that we use an A* approach:
     we combine the actual distance traveled (g_cost) with a heuristic (h_cost).
     """
+    return route_with_kernel(node1, node2, grid, heuristic=True)
 
-    wire = Wire(start_node=node1, end_node=node2,
-                nodes_csv_path=nodes_csv_path, netlist_csv_path=netlist_csv_path)
-    x_start, y_start, z_start = node1.give_x(), node1.give_y(), node1.give_z()
-    x_end,   y_end,   z_end   = node2.give_x(), node2.give_y(), node2.give_z()
 
-    # Priority queue for A* (min-heap of (f_cost, WirePoint))
-    q = []
-    start_point = WirePoint(x_start, y_start, z_start)
-    heapq.heappush(q, (0, start_point))
-
-    # Keep track of g_cost (distance so far) and parents for path reconstruction
-    costs = {start_point: 0}
-    parents = {}
-
-    # Standard A* closed set of already-processed nodes
-    closed_set = set()
-
-    while q:
-        current_f_cost, current = heapq.heappop(q)
-        x, y, z = current.give_place()
-
-        # If we've already processed this node at its best cost, skip
-        if current in closed_set:
-            continue
-        closed_set.add(current)
-
-        # Check if we've reached a point adjacent to the end (distance == 1)
-        point_dict = grid.return_point_dict()
-        if (grid.distance_nodes(current, WirePoint(x_end, y_end, z_end)) == 1 and point_dict[current.give_place()] == 0):
-            # Reconstruct the path by backtracking through parents
-            path = []
-            while current in parents:
-                path.append(current)
-                current = parents[current]
-            path.reverse()
-
-            # Now add the final route into the wire
-            for point in path:
-                wire.add_wire_point(point)
-
-            # After final route is known, add each segment to the grid
-            wirepoints = wire.give_wirepoints()
-            for i in range(len(wirepoints) - 1):
-                segment = Segment(wirepoints[i], wirepoints[i + 1])
-                grid.add_wire_segment(segment)  # Mark the segment as occupied
-            
-            # Also add the final segment to the grid
-            node_point = WirePoint(node2.give_x(), node2.give_y(), node2.give_z())
-            final_segment = Segment(wirepoints[-1], node_point)
-            grid.add_wire_segment(final_segment)
-            
-            # Return wire and add to dict to update cost calculations
-            grid.set_point_value(wire, 50) # The penalty for intersections tuned during experimental phase
-            grid.add_wire_dict(wire)
-            return wire
-
-        # Generate neighbors in 6 directions
-        neighbors = []
-        for dx, dy, dz in [(-1, 0, 0), (1, 0, 0),
-                           (0, -1, 0), (0, 1, 0),
-                           (0, 0, -1), (0, 0, 1)]:
-            temp_wirepoint = WirePoint(x + dx, y + dy, z + dz)
-            temp_segment = Segment(current, temp_wirepoint)
-
-            # Only add neighbor if it's a valid, unblocked cell
-            if grid.check_obstacle(temp_wirepoint, temp_segment):
-                neighbors.append(temp_wirepoint)
-
-        # Evaluate each neighbor
-        for neighbor in neighbors:
-            if neighbor in closed_set:
-                continue
-
-            # Compute g_cost (distance so far) + h_cost (heuristic)
-            g_cost = costs[current] + grid.get_point_value(neighbor)
-            h_cost = grid.distance_nodes(neighbor, WirePoint(x_end, y_end, z_end))
-            f_cost = g_cost + h_cost
-
-            # If this new route to neighbor is cheaper, update
-            if g_cost < costs.get(neighbor, float('inf')):
-                costs[neighbor] = g_cost
-                parents[neighbor] = current
-                heapq.heappush(q, (f_cost, neighbor))
-
-    # If the priority queue empties out and we never found a path:
-    return None
-
-
-def lee_algorithm(node1: Node, node2: Node, grid: Grid_3D, nodes_csv_path: str, netlist_csv_path: str) -> Wire|None:
+def lee_algorithm(node1: Node, node2: Node, grid: Grid_3D) -> Wire|None:
     """
     Breath first search with applied cost function. Works the same as the a* algorithm, except
-    that it does not use a heuristic.
+    that it does not use a heuristic. With use_buckets set on the search kernel of the grid the
+    cells are queued in a bucket queue instead of a heap, with the same result.
     """
+    return route_with_kernel(node1, node2, grid, heuristic=False)
 
-    wire = Wire(start_node=node1, end_node=node2,
-                nodes_csv_path=nodes_csv_path, netlist_csv_path=netlist_csv_path)
-    x_start, y_start, z_start = node1.give_x(), node1.give_y(), node1.give_z()
-    x_end,   y_end,   z_end   = node2.give_x(), node2.give_y(), node2.give_z()
-
-    # Priority queue
-    q = []
-    start_point = WirePoint(x_start, y_start, z_start)
-    heapq.heappush(q, (0, start_point))
 
-    # Keep track of g_cost (distance so far) and parents for path reconstruction
-    costs = {start_point: 0}
-    parents = {}
+def bidirectional_a_star_algorithm(node1: Node, node2: Node, grid: Grid_3D) -> Wire|None:
+    """
+    A* that searches from both nodes at the same time and stops once the two searches meet
+    in the middle. Useful for long wires, where a one-directional search floods large parts of the grid.
+    The number of expansions is kept on the search kernel of the grid.
+    """
+    return route_with_kernel(node1, node2, grid, heuristic=True, bidirectional=True)
 
-    # Already processed nodes
-    closed_set = set()
 
-    while q:
-        current_f_cost, current = heapq.heappop(q)
-        x, y, z = current.give_place()
+# The routers that search with the search kernel of the grid, a wire of theirs is never shorter
+# than the Manhattan distance between its nodes
+KERNEL_ROUTERS = (a_star_algorithm, lee_algorithm, bidirectional_a_star_algorithm)
 
-        # If we've already processed this node at its best cost, skip
-        if current in closed_set:
-            continue
-        closed_set.add(current)
 
-        # Check if we've reached a point adjacent to the end (distance == 1)
-        point_dict = grid.return_point_dict()
-        if (grid.distance_nodes(current, WirePoint(x_end, y_end, z_end)) == 1 and point_dict[current.give_place()] == 0):
-            # Reconstruct the path by backtracking through parents
-            path = []
-            while current in parents:
-                path.append(current)
-                current = parents[current]
-            path.reverse()
+def route_with_kernel(node1: Node, node2: Node, grid: Grid_3D, heuristic: bool, bidirectional: bool = False, values: list[float] = None) -> Wire|None:
+    """
+    Routes a wire between two nodes with the search kernel of the grid and lays it on the grid.
+    The search runs on flat cell indices, only the final route is turned into wirepoints.
+    If values is given, the search uses that cost field instead of the one of the grid.
+    """
+    path = kernel_path(node1, node2, grid, heuristic, bidirectional, values)
 
-            # Now add the final route into the wire
-            for point in path:
-                wire.add_wire_point(point)
+    # If the end can't be reached, no wire is laid
+    if path is None:
+        return None
 
-            # After final route is known, add each segment to the grid
-            wirepoints = wire.give_wirepoints()
-            for i in range(len(wirepoints) - 1):
-                segment = Segment(wirepoints[i], wirepoints[i + 1])
-                grid.add_wire_segment(segment)  # Mark the segment as occupied
-            
-            # Also add the final segment to the grid
-            node_point = WirePoint(node2.give_x(), node2.give_y(), node2.give_z())
-            final_segment = Segment(wirepoints[-1], node_point)
-            grid.add_wire_segment(final_segment)
-            
-            # Return wire and add to dict to update cost calculations
-            grid.add_wire_dict(wire)
-            grid.set_point_value(wire, 50) # The penalty for intersections tuned during experimental phase
+    return lay_wire(node1, node2, grid, path)
 
-            return wire
-
-        # Generate neighbors in 6 directions
-        neighbors = []
-        for dx, dy, dz in [(-1, 0, 0), (1, 0, 0),
-                           (0, -1, 0), (0, 1, 0),
-                           (0, 0, -1), (0, 0, 1)]:
-            temp_wirepoint = WirePoint(x + dx, y + dy, z + dz)
-            temp_segment = Segment(current, temp_wirepoint)
-
-            # Only add neighbor if it's a valid, unblocked cell
-            if grid.check_obstacle(temp_wirepoint, temp_segment):
-                neighbors.append(temp_wirepoint)
-
-        # Evaluate each neighbor
-        for neighbor in neighbors:
-            if neighbor in closed_set:
-                continue
 
-            # Compute g_cost (distance so far)
-            g_cost = costs[current] + grid.get_point_value(neighbor)
-            f_cost = g_cost
+def kernel_path(node1: Node, node2: Node, grid: Grid_3D, heuristic: bool, bidirectional: bool = False, values: list[float] = None) -> list[int]|None:
+    """
+    Searches the path route_with_kernel() would lay, without laying it.
+    Returns:
+      the flat indices of the path (see SearchKernel.search()), or None if the end can't be reached
+    """
+    kernel = grid.give_search_kernel()
+    start = grid.index(node1.give_x(), node1.give_y(), node1.give_z())
+    end = grid.index(node2.give_x(), node2.give_y(), node2.give_z())
+    if values is not None:
+        return kernel.search(start, end, heuristic=heuristic, values=values)
+    elif bidirectional:
+        return kernel.search_bidirectional(start, end)
+    elif heuristic or not kernel.use_buckets:
+        return kernel.search(start, end, heuristic=heuristic)
+    return kernel.search_buckets(start, end)
+
+
+def lay_wire(node1: Node, node2: Node, grid: Grid_3D, path: list[int]) -> Wire:
+    """
+    Turns a path of flat indices (as returned by the search kernel) into a wire and lays it on the grid.
+    """
+    wire = Wire(start_node=node1, end_node=node2, context=grid.give_context())
+    for index in path:
+        wire.add_wire_point(WirePoint(*grid.coordinates(index)))
 
-            # If this new route to neighbor is cheaper, update
-            if g_cost < costs.get(neighbor, float('inf')):
-                costs[neighbor] = g_cost
-                parents[neighbor] = current
-                heapq.heappush(q, (f_cost, neighbor))
+    # After final route is known, add each segment to the grid
+    wirepoints = wire.give_wirepoints()
+    for i in range(len(wirepoints) - 1):
+        grid.add_segment(wirepoints[i], wirepoints[i + 1])  # Mark the segment as occupied
 
-    # If the priority queue empties out and we never found a path:
-    return None
+    # Add to dict to update cost calculations
+    grid.set_point_value(wire, 50) # The penalty for intersections tuned during experimental phase
+    grid.add_wire_dict(wire)
+    return wire
 
 
-def dfs_algorithm(node1: Node, node2: Node, grid: Grid_3D, nodes_csv_path: str, netlist_csv_path: str) -> Wire|None:
+def lay_solution(wires: list[Wire], grid: Grid_3D) -> None:
+    """
+    Clears the grid and lays the given (already routed) wires on it again.
+    """
+    grid.clear_wires()
+    grid.apply_costs_around_nodes()
+    for wire in wires:
+        wirepoints = wire.give_wirepoints()
+        for i in range(len(wirepoints) - 1):
+            grid.add_segment(wirepoints[i], wirepoints[i + 1])
+        grid.add_wire_dict(wire)
+        grid.set_point_value(wire, 50)
+        grid.add_wire_list(wire)
+
+
+def dfs_algorithm(node1: Node, node2: Node, grid: Grid_3D) -> Wire|None:
     """
     Depth-First Search (DFS) algorithm with backtracking for routing wires.
+    The neighbour closest to the end node (Manhattan distance) is tried first, so a wire heads
+    for its end instead of wandering through the grid; equally close neighbours keep the order
+    of the directions.
     """
-    wire = Wire(start_node=node1, end_node=node2, nodes_csv_path=nodes_csv_path, netlist_csv_path=netlist_csv_path)
+    wire = Wire(start_node=node1, end_node=node2, context=grid.give_context())
     x_1, y_1, z_1 = node1.give_x(), node1.give_y(), node1.give_z()
     x_2, y_2, z_2 = node2.give_x(), node2.give_y(), node2.give_z()
 
@@ -231,10 +142,7 @@ def dfs_algorithm(node1: Node, node2: Node, grid: Grid_3D, nodes_csv_path: str,
             # Add each segment to the grid
             wirepoints = wire.give_wirepoints()
             for i in range(len(wirepoints) - 1):
-                segment = Segment(wirepoints[i], wirepoints[i + 1])
-                grid.add_wire_segment(segment)
-            final_segment = Segment(wirepoints[-1], WirePoint(x_2, y_2, z_2))
-            grid.add_wire_segment(final_segment)
+                grid.add_segment(wirepoints[i], wirepoints[i + 1])
 
             # Update the grid
             grid.add_wire_dict(wire)
@@ -243,12 +151,17 @@ def dfs_algorithm(node1: Node, node2: Node, grid: Grid_3D, nodes_csv_path: str,
         # Else, check surroundings for next step
         surroundings = []
         for x_neighbour, y_neighbour, z_neighbour in [(-1, 0, 0), (1, 0, 0), (0, -1, 0), (0, 1, 0), (0, 0, -1), (0, 0, 1)]:
-            surrounding = WirePoint(x + x_neighbour, y + y_neighbour, z + z_neighbour)
-            segment = Segment(current, surrounding)
+            nx, ny, nz = x + x_neighbour, y + y_neighbour, z + z_neighbour
+            if not grid.check_step(x, y, z, nx, ny, nz):
+                continue
 
-            if (surrounding not in visited and grid.check_obstacle(surrounding, segment)):
+            surrounding = WirePoint(nx, ny, nz)
+            if surrounding not in visited:
                 surroundings.append(surrounding)
 
+        # The last point added is tried first, so the closest one goes on the stack last
+        surroundings.sort(key=lambda point: -(abs(point.give_x() - x_2) + abs(point.give_y() - y_2) + abs(point.give_z() - z_2)))
+
         # Add surroundings to the points and mark their parent
         for surrounding in surroundings:
             if surrounding not in parents:
@@ -259,13 +172,13 @@ def dfs_algorithm(node1: Node, node2: Node, grid: Grid_3D, nodes_csv_path: str,
     return None
 
 
-def manhattan_wire(node1: Node, node2: Node, grid: Grid_3D, nodes_csv_path: str, netlist_csv_path: str) -> Wire|None:
+def manhattan_wire(node1: Node, node2: Node, grid: Grid_3D) -> Wire|None:
     """
     Creates a wire based on the Manhattan distance between node1 and node2.
     Ensures strictly Manhattan movement, with only one coordinate changing at a time.
     Avoids overlap with existing wires by dynamically rerouting and resolving conflicts.
     """
-    wire = Wire(start_node=node1, end_node=node2, nodes_csv_path=nodes_csv_path, netlist_csv_path=netlist_csv_path)
+    wire = Wire(start_node=node1, end_node=node2, context=grid.give_context())
 
     x1, y1 = node1.give_x(), node1.give_y()
     x2, y2 = node2.give_x(), node2.give_y()
@@ -288,7 +201,7 @@ def manhattan_wire(node1: Node, node2: Node, grid: Grid_3D, nodes_csv_path: str,
         next_point = move_one_step(x1, x2, y1, 'x', z)
         wire.add_wire_point(next_point)
 
-        if z >= 7:
+        if z >= grid.height - 1:
             break
         
         if not grid.check_valid_addition(wire):
@@ -318,7 +231,7 @@ def manhattan_wire(node1: Node, node2: Node, grid: Grid_3D, nodes_csv_path: str,
         next_point = move_one_step(y1, y2, x2, 'y', z)
         wire.add_wire_point(next_point)
 
-        if z >= 7:
+        if z >= grid.height - 1:
             break
 
         if not grid.check_valid_addition(wire):
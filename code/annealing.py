@@ -0,0 +1,103 @@
+import math
+import random
+import time
+
+import numpy as np
+
+from code.classes.grid_class import Grid_3D
+from code.classes.wire_class import Wire
+from code.algorithms import route_with_kernel, lay_solution
+
+
+def simulated_annealing(
+    wires: list[Wire],
+    grid: Grid_3D,
+    iterations: int = 1000,
+    time_limit: float = None,
+    start_temperature: float = 300,
+    end_temperature: float = 1,
+    intersection_penalty: float = 300,
+    noise: float = 5,
+    legal_only: bool = True,
+    unrouted_penalty: float = 1000,
+    seed: int = None,
+) -> tuple[list[Wire], dict]:
+    """
+    Improves a routed solution with simulated annealing. Every step rips up one random wire and
+    reroutes it with A* on a perturbed cost field: the base cost field, intersection_penalty for every
+    wire already in a cell and random noise (up to noise) per cell. The step is accepted or rejected on
+    the change of the cost C = n + 300k, which the grid keeps up to date, so no full recount is needed.
+
+    The temperature cools down geometrically from start_temperature to end_temperature over the
+    iterations or the time_limit (seconds), whichever runs out first. Either may be None, not both.
+
+    With legal_only a reroute that fails is rejected, so every solution is a complete one. Without it
+    the net stays unrouted for a while, at unrouted_penalty per net, which lets the wires around it
+    move first. Every step is a grid transaction, a rejected step is rolled back.
+    The best complete solution is left on the grid.
+    Returns:
+      (wires, stats)
+    """
+    if iterations is None and time_limit is None:
+        raise ValueError("Give a maximum amount of iterations, a time limit or both.")
+    if len(wires) == 0:
+        raise ValueError("No wires given.")
+
+    rng = random.Random(seed)
+    noise_rng = np.random.default_rng(seed)
+
+    lay_solution(wires, grid)
+    base = grid.base_cost_field().reshape(-1)
+    nets = [(wire.start_node, wire.end_node) for wire in wires]
+    wires = list(wires)
+
+    def energy() -> float:
+        return grid.cost() + unrouted_penalty * sum(wire is None for wire in wires)
+
+    current = energy()
+    best_cost, best_wires = grid.cost(), list(wires)
+    stats = {'start_cost': best_cost, 'iterations': 0, 'accepted': 0, 'improved': 0}
+
+    start_time = time.time()
+    while True:
+        # Progress through the budget, the temperature follows it
+        progress = 0
+        if iterations is not None:
+            progress = stats['iterations'] / iterations
+        if time_limit is not None:
+            progress = max(progress, (time.time() - start_time) / time_limit)
+        if progress >= 1:
+            break
+        temperature = start_temperature * (end_temperature / start_temperature) ** progress
+        stats['iterations'] += 1
+
+        k = rng.randrange(len(wires))
+        old_wire = wires[k]
+        grid.begin()
+        if old_wire is not None:
+            grid.remove_wire(old_wire)
+
+        values = base + intersection_penalty * grid.flat_point_counts() + noise_rng.random(grid.size) * noise
+        new_wire = route_with_kernel(*nets[k], grid, heuristic=True, values=values.tolist())
+
+        if new_wire is None and legal_only:
+            grid.rollback()
+            continue
+
+        wires[k] = new_wire
+        delta = energy() - current
+        if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+            grid.commit()
+            current += delta
+            stats['accepted'] += 1
+            if all(wire is not None for wire in wires) and grid.cost() < best_cost:
+                best_cost, best_wires = grid.cost(), list(wires)
+                stats['improved'] += 1
+        else:
+            wires[k] = old_wire
+            grid.rollback()
+
+    lay_solution(best_wires, grid)
+    stats['cost'] = grid.cost()
+    stats['time'] = time.time() - start_time
+    return best_wires, stats
@@ -0,0 +1,297 @@
+import contextlib
+import io
+import os
+import random
+import time
+
+from code.algorithms import KERNEL_ROUTERS, bidirectional_a_star_algorithm, dfs_algorithm, lay_solution
+from code.annealing import simulated_annealing
+from code.classes.checkpoint_class import Checkpoint
+from code.classes.grid_class import LAYERS, initialise_grid
+from code.classes.qtable_class import QTable
+from code.classes.result_class import RoutingResult
+from code.engine import run_multiple_runs, run_single_run, run_pathfinder, plot_wires_3d
+from code.functions import find_chip, choose_algorithm, choose_sorting_method, set_q_table
+from code.imports import load_chip_context
+from code.parallel import run_multiple_runs_parallel
+from code.pathfinder import pathfinder_routing
+from code.prefix_trie import run_multiple_runs_trie
+from code.solution import load_solution, save_solution
+from code.speculative import SpeculativeRouter
+
+
+def route(
+    chip,
+    netlist,
+    algorithm: str = 'a',
+    sort: str = 'r',
+    iterations: int = 1,
+    seed: int = None,
+    workers: int = 1,
+    prune: bool = False,
+    share_prefixes: bool = False,
+    anneal: int = 0,
+    anneal_time: float = None,
+    q_table: QTable = None,
+    dfs_nodes: int = 1000,
+    dfs_depth: int = None,
+    buckets: bool = False,
+    speculative: int = 0,
+    save: str = None,
+    checkpoint: str = None,
+    checkpoint_interval: float = 60,
+    resume: str = None,
+    layers: int = LAYERS,
+    backend: str = 'dense',
+    base_path: str = os.path.join('.', 'gates_netlists'),
+    plot: bool = False,
+    verbose: bool = False,
+) -> RoutingResult:
+    """
+    Routes a netlist of a chip, the same run as main.py does but without any questions.
+    The algorithm and sort are the letters (or names) main.py asks for, chip may be None, as the
+    netlist decides the chip. Besides netlists 1-9 of the course, any netlist in base_path can be
+    routed, like the chips of code.generate (see find_chip()). A single run (iterations=1) routes the netlist in the chosen order;
+    multiple runs try iterations orderings, PathFinder uses iterations as its maximum amount of rounds.
+    The other options are those of the command line of main.py. The engine only prints if verbose
+    is True and only plots (and imports matplotlib) if plot is True.
+    The best grid is saved to save (.npz or .csv, see code/solution.py). A multiple run also keeps
+    its best grid so far in the file checkpoint, written at most once per checkpoint_interval seconds.
+    With resume (a checkpoint or saved grid of the same netlist) a multiple run starts from that grid:
+    it is the best grid so far, and it is returned if none of the orderings beats it.
+    The grid has layers layers and keeps its wires in the dense or the sparse backend (see Grid_3D).
+    With buckets Lee searches with a bucket queue instead of a heap, the wires are the same.
+    With speculative workers Lee, A* and bidirectional A* search the next nets of an ordering ahead in
+    that many processes (see code/speculative.py), the wires are the same. It doesn't combine with
+    workers or shared prefixes, which already spread the orderings themselves.
+    prune only works for Lee, A* and bidirectional A* in a sequential run without shared prefixes and
+    Q-learning can't run with workers, other combinations raise a ValueError. A pruned ordering counts
+    as a try that didn't succeed.
+    Returns:
+      a RoutingResult with the best grid, its grid holds the best wires
+    """
+    netlist = str(netlist)
+    netlist_chip = find_chip(netlist, base_path)
+    if netlist_chip is None:
+        raise ValueError(f"Netlist {netlist} does not exist in {base_path}.")
+    if chip is not None and str(chip) != netlist_chip:
+        raise ValueError(f"Netlist {netlist} belongs to chip {netlist_chip}, not to chip {chip}.")
+    chip = netlist_chip
+
+    functie = choose_algorithm(algorithm)
+    if functie is None:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    if iterations < 1:
+        raise ValueError("The amount of iterations must be positive.")
+    if prune and share_prefixes:
+        raise ValueError("Pruning can't be combined with shared prefixes.")
+    if prune and workers > 1:
+        raise ValueError("Pruning only works in a single process, it can't be combined with workers.")
+    if prune and functie not in KERNEL_ROUTERS:
+        raise ValueError("Pruning only works for Lee, A* and bidirectional A*.")
+    if workers > 1 and iterations > 1 and sort.lower() in ('q', 'q-learning', 'q learning'):
+        raise ValueError("Q-learning changes its orderings while running, it can't be combined with workers.")
+    if speculative < 0:
+        raise ValueError("The amount of speculative workers can't be negative.")
+    if speculative > 0 and functie not in KERNEL_ROUTERS:
+        raise ValueError("Speculative routing only works for Lee, A* and bidirectional A*.")
+    if speculative > 0 and (workers > 1 or share_prefixes):
+        raise ValueError("Speculative routing can't be combined with workers or shared prefixes.")
+    if resume is not None and (iterations == 1 or functie == pathfinder_routing):
+        raise ValueError("Only a multiple run of an ordering based algorithm can be resumed.")
+
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with output, contextlib.ExitStack() as resources:
+        return _route(
+            resources, chip, netlist, functie, algorithm.lower(), sort.lower(), iterations, seed, workers, prune,
+            share_prefixes, anneal, anneal_time, q_table, dfs_nodes, dfs_depth, buckets, speculative, save,
+            checkpoint, checkpoint_interval, resume, layers, backend, base_path, plot
+        )
+
+
+def _route(resources, chip, netlist, functie, algorithm, sort_method, iterations, seed, workers, prune, share_prefixes, anneal,
+           anneal_time, q_table, dfs_nodes, dfs_depth, buckets, speculative, save, checkpoint, checkpoint_interval,
+           resume, layers, backend, base_path, plot) -> RoutingResult:
+    """
+    Does the run of route(), the arguments are checked already. The worker processes of speculative
+    routing are stopped when resources closes.
+    """
+    if seed is not None:
+        random.seed(seed)
+
+    nodes_csv_path = os.path.join(base_path, f'chip_{chip}', f'print_{chip}.csv')
+    netlist_csv_path = os.path.join(base_path, f'chip_{chip}', f'netlist_{netlist}.csv')
+
+    context = load_chip_context(nodes_csv_path, netlist_csv_path)
+    nodes_list = context.give_nodes()
+    netlist_connections = list(context.give_netlist())
+
+    grid, grid_width, grid_length = initialise_grid(context, algorithm, layers, backend)
+    grid.give_search_kernel().use_buckets = buckets
+
+    # The workers build their own grid, so they start before the clock like the grid does
+    router = None
+    if speculative > 0:
+        router = resources.enter_context(
+            SpeculativeRouter(context, algorithm, functie, speculative, layers, backend, buckets)
+        )
+    start_time = time.time()
+
+    def result(success, cost, wires, tries, successful, stats=None) -> RoutingResult:
+        if save is not None and success:
+            save_solution(save, wires, context, chip, netlist, cost)
+            print(f"Saved the grid to {save}")
+        return RoutingResult(
+            chip, netlist, algorithm, sort_method, iterations, success, cost, wires,
+            tries, successful, time.time() - start_time, grid, stats
+        )
+
+    # PathFinder settles the order of the nets itself, multiple runs set its maximum amount of rounds
+    if functie == pathfinder_routing:
+        max_rounds = iterations if iterations > 1 else 30
+        success, wires, stats = run_pathfinder(
+            netlist_connections, nodes_list, grid, grid_width, grid_length, max_rounds=max_rounds, plot=plot
+        )
+        print(f"PathFinder took {time.time() - start_time:.2f} seconds")
+        return result(success, grid.cost() if success else None, wires if success else None, 1, int(success), stats)
+
+    sort = choose_sorting_method(sort_method, netlist_connections, nodes_list, iterations)
+    if sort is None:
+        raise ValueError(f"Unknown sorting method: {sort_method}")
+
+    print("Starting algorithm...")
+
+    # -----------------------------------------------------------
+    # Single run
+    # -----------------------------------------------------------
+    if iterations == 1:
+        # Random sorting gives a list with one ordering, the other methods the ordering itself
+        ordering = list(sort[0]) if isinstance(sort[0][0], tuple) else list(sort)
+
+        # Count what the one-directional search would have expanded, to report the savings
+        # (speculated nets are searched by the workers, so they are only counted without them)
+        kernel = grid.give_search_kernel()
+        compare = functie == bidirectional_a_star_algorithm and router is None
+        if compare:
+            kernel.compare_unidirectional = True
+
+        success, wires = run_single_run(
+            functie, ordering, nodes_list, grid, grid_width, grid_length, plot=plot,
+            dfs_nodes=dfs_nodes, dfs_depth=dfs_depth, speculative=router
+        )
+        cost = grid.cost() if success else None
+        print(f"Single run took {time.time() - start_time:.2f} seconds")
+
+        stats = {}
+        if router is not None:
+            stats['speculative'] = _speculative_stats(router)
+        if compare:
+            saved = kernel.unidirectional_expansions - kernel.bidirectional_expansions
+            print(f"Bidirectional A* expanded {kernel.bidirectional_expansions} cells, "
+                  f"one-directional A* would have expanded {kernel.unidirectional_expansions} "
+                  f"(saved {saved})")
+            stats.update({'bidirectional_expansions': kernel.bidirectional_expansions,
+                          'unidirectional_expansions': kernel.unidirectional_expansions})
+        return result(success, cost, wires if success else None, 1, int(success), stats)
+
+    # -----------------------------------------------------------
+    # Multiple runs
+    # -----------------------------------------------------------
+    if sort == 'q':
+        set_q_table(q_table if q_table is not None else QTable())
+
+    if checkpoint is not None:
+        checkpoint = Checkpoint(checkpoint, context, chip, netlist, checkpoint_interval)
+
+    # A resumed grid is the best grid so far, only better grids replace it
+    cost_start = float('inf')
+    if resume is not None:
+        resumed_wires, resumed_grid, info = load_solution(resume, base_path, layers)
+        if str(info['chip']) != chip or str(info['netlist']) != netlist:
+            raise ValueError(f"{resume} holds a grid of netlist {info['netlist']}, not of netlist {netlist}.")
+        cost_start = resumed_grid.cost()
+        print(f"Resuming from {resume}, the grid costs: {cost_start}")
+
+    # Q-learning changes its orderings while running, so it doesn't share prefixes
+    all_wire_runs = []
+    prune_stats = {'pruned_orderings': 0, 'skipped_routings': 0} if prune else None
+    if share_prefixes and sort != 'q' and functie != dfs_algorithm:
+        wires_cost_min, successful_grid, tries, cost_min = run_multiple_runs_trie(
+            nodes_list, grid, cost_start, 0, 0, all_wire_runs, functie, sort, checkpoint=checkpoint
+        )
+    elif workers > 1:
+        wires_cost_min, successful_grid, tries, cost_min = run_multiple_runs_parallel(
+            context, algorithm, cost_start, 0, 0, all_wire_runs, functie, sort, workers,
+            seed=seed if seed is not None else 0, checkpoint=checkpoint, layers=layers, backend=backend,
+            dfs_nodes=dfs_nodes, dfs_depth=dfs_depth, buckets=buckets
+        )
+    else:
+        wires_cost_min, successful_grid, tries, cost_min = run_multiple_runs(
+            iterations, netlist_connections, nodes_list, grid, cost_start, 0, 0, all_wire_runs,
+            functie, sort, prune_stats=prune_stats, checkpoint=checkpoint,
+            dfs_nodes=dfs_nodes, dfs_depth=dfs_depth, speculative=router
+        )
+
+    print(f"Total time for {iterations} iterations: {time.time() - start_time:.2f} seconds")
+
+    # Pruned orderings could no longer beat the best grid, they count as tries that didn't succeed
+    stats = {}
+    if prune_stats is not None:
+        print(f"Pruned orderings: {prune_stats['pruned_orderings']} | "
+              f"Net routings skipped: {prune_stats['skipped_routings']} of {tries * len(netlist_connections)}")
+        stats.update(prune_stats)
+    if router is not None:
+        stats['speculative'] = _speculative_stats(router)
+
+    if tries > 0:
+        success_percentage = (successful_grid / tries) * 100
+        print(f"{success_percentage}% of the grids were successful")
+
+    if wires_cost_min is None and resume is not None:
+        wires_cost_min, cost_min = resumed_wires, cost_start
+        print("No grid beat the resumed grid.")
+
+    if wires_cost_min is None:
+        print("No successful grid found.")
+        return result(False, None, None, tries, successful_grid, stats)
+
+    print(f"The grid with minimal cost costs: {cost_min}")
+
+    # The grid holds the wires of the ordering that was routed last (or none, with workers), so the
+    # best wires are laid on it again
+    lay_solution(wires_cost_min, grid)
+
+    if anneal > 0 or anneal_time is not None:
+        wires_cost_min, anneal_stats = simulated_annealing(
+            wires_cost_min,
+            grid,
+            iterations=anneal if anneal > 0 else None,
+            time_limit=anneal_time,
+            seed=seed
+        )
+        print(f"Simulated annealing took {anneal_stats['iterations']} steps ({anneal_stats['time']:.2f} seconds), "
+              f"the grid now costs: {anneal_stats['cost']}")
+        cost_min = anneal_stats['cost']
+        stats['annealing'] = anneal_stats
+        if checkpoint is not None:
+            checkpoint.update(wires_cost_min, cost_min)
+
+    if checkpoint is not None:
+        checkpoint.flush()
+
+    if plot:
+        plot_wires_3d(wires_cost_min, grid_width, grid_length, grid.height)
+
+    return result(True, cost_min, wires_cost_min, tries, successful_grid, stats)
+
+
+def _speculative_stats(router: SpeculativeRouter) -> dict:
+    """
+    Prints how many nets the workers of speculative routing searched ahead.
+    Returns:
+      the statistics of the router
+    """
+    stats = router.give_stats()
+    print(f"Speculative searches: {stats['speculated']} | Laid as searched: {stats['used']} | "
+          f"Crossed by a later wire: {stats['conflicts']}")
+    return stats
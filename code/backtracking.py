@@ -0,0 +1,125 @@
+from code.classes.grid_class import Grid_3D
+from code.classes.nodes_class import Node
+from code.classes.wire_class import Wire
+from code.algorithms import dfs_algorithm
+
+
+def blocking_edges(node: Node, grid: Grid_3D) -> tuple[int, set[int]]:
+    """
+    Flood fills the cells a wire from node can reach, with the same steps as the DFS router.
+    Returns:
+      (size of the region, flat indices of the occupied edges on its border)
+    """
+    start = (node.give_x(), node.give_y(), node.give_z())
+    seen = {start}
+    stack = [start]
+    edges = set()
+    node_cells = grid.node_cell_lookup()
+    while stack:
+        x, y, z = stack.pop()
+        for dx, dy, dz in ((-1, 0, 0), (1, 0, 0), (0, -1, 0), (0, 1, 0), (0, 0, -1), (0, 0, 1)):
+            neighbour = (x + dx, y + dy, z + dz)
+            if neighbour in seen:
+                continue
+            if grid.check_step(x, y, z, *neighbour):
+                seen.add(neighbour)
+                stack.append(neighbour)
+            elif grid.in_bounds(*neighbour) and not node_cells[grid.index(*neighbour)]:
+                # Not out of the grid and not a node, so a wire is in the way
+                edges.add(grid.edge_index(x, y, z, *neighbour))
+    return len(seen), edges
+
+
+def wire_edges(wire: Wire, grid: Grid_3D) -> set[int]:
+    """
+    Returns the flat indices of the edges a wire occupies.
+    """
+    wirepoints = wire.give_wirepoints()
+    return {grid.edge_index(*wirepoints[i].give_place(), *wirepoints[i + 1].give_place()) for i in range(len(wirepoints) - 1)}
+
+
+def backtracking_dfs(
+    ordering: list[tuple[int, int]],
+    nodes_list: list[Node],
+    grid: Grid_3D,
+    max_nodes: int = 1000,
+    max_depth: int|None = None,
+) -> tuple[bool, list[Wire], dict]:
+    """
+    Routes an ordering of the netlist with the DFS router and backtracks with conflict-directed jumps.
+    Every laid net is a level of the search and its own grid transaction. When a net can't be laid,
+    the region its node can still reach is flood filled and the wires on the border of that region
+    are the conflict set. The search jumps back to the most recent level in the conflict set, undoing
+    every wire after it, and lays the failed net at that level, before the blocking wire. A net is
+    put on the same level (below the same prefix) at most once, if all blockers have already been
+    tried the jump goes to the next most recent one.
+
+    max_nodes is the budget of net routings. max_depth limits the amount of jumps that are active on
+    the current path (levels where a net was moved forward), None means no limit.
+    Returns:
+      (success, wires, stats), on failure the wires of the deepest state are left on the grid
+    """
+    if len(ordering) == 0:
+        raise ValueError("No netlist given.")
+
+    grid.clear_wires()
+
+    order = [tuple(connection) for connection in ordering]
+    levels = [] # (wire, edges, jumped) per laid net
+    tried = [set()] # nets that were laid on a level, below the current prefix
+    stats = {'routings': 0, 'backjumps': 0, 'max_jump': 0}
+    success = False
+    jump_level = None # level the last failed net was moved to
+
+    while stats['routings'] < max_nodes:
+        position = len(levels)
+        if position == len(order):
+            success = True
+            break
+
+        node1_id, node2_id = order[position]
+        node1, node2 = nodes_list[node1_id - 1], nodes_list[node2_id - 1]
+        tried[position].add(order[position])
+
+        grid.begin()
+        wire = dfs_algorithm(node1, node2, grid)
+        stats['routings'] += 1
+        if wire is not None:
+            grid.add_wire_list(wire)
+            levels.append((wire, wire_edges(wire, grid), position == jump_level))
+            tried.append(set())
+            continue
+        grid.rollback()
+
+        # The conflict set, from the smallest region around the two nodes
+        region1, edges1 = blocking_edges(node1, grid)
+        region2, edges2 = blocking_edges(node2, grid)
+        edges = edges1 if region1 <= region2 else edges2
+        conflicts = [level for level, (_, wire_set, _) in enumerate(levels) if not wire_set.isdisjoint(edges)]
+
+        # Jump to the most recent blocking level where the failed net was not tried yet
+        failed = order[position]
+        targets = [level for level in reversed(conflicts) if failed not in tried[level]]
+        if not targets:
+            break
+        target = targets[0]
+        if max_depth is not None and sum(jumped for _, _, jumped in levels[:target]) >= max_depth:
+            break
+
+        for _ in range(position - target):
+            grid.rollback()
+        del levels[target:]
+        del tried[target + 1:]
+        order.remove(failed)
+        order.insert(target, failed)
+        jump_level = target
+
+        stats['backjumps'] += 1
+        stats['max_jump'] = max(stats['max_jump'], position - target)
+
+    # Keep the wires of the state the search ended in
+    for _ in levels:
+        grid.commit()
+
+    stats['ordering'] = order
+    return success, [wire for wire, _, _ in levels], stats
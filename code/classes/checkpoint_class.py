@@ -0,0 +1,47 @@
+import time
+
+from code.classes.chip_class import ChipContext
+from code.classes.wire_class import Wire
+from code.solution import save_solution
+
+
+class Checkpoint:
+    """
+    Keeps the best solution of a run on disk while the run goes on. A better solution is written
+    at most once per interval (seconds), so a run that is stopped loses at most one interval of
+    work. flush() writes the last improvement when the run is done.
+    """
+    def __init__(self, path: str, context: ChipContext, chip, netlist, interval: float = 60) -> None:
+        self.path = path
+        self.context = context
+        self.chip = chip
+        self.netlist = netlist
+        self.interval = interval
+        self.writes = 0
+        self._best_cost = float('inf')
+        self._pending = None # (wires, cost) that is not written yet
+        self._last_write = time.time()
+
+
+    def update(self, wires: list[Wire]|None, cost: float) -> None:
+        """
+        Records the best solution so far, it is written if the interval has passed.
+        """
+        if wires is not None and cost < self._best_cost:
+            self._best_cost = cost
+            self._pending = (list(wires), cost)
+        if self._pending is not None and time.time() - self._last_write >= self.interval:
+            self.flush()
+
+
+    def flush(self) -> None:
+        """
+        Writes the best solution if it has not been written yet.
+        """
+        if self._pending is None:
+            return
+        wires, cost = self._pending
+        save_solution(self.path, wires, self.context, self.chip, self.netlist, cost)
+        self._pending = None
+        self._last_write = time.time()
+        self.writes += 1
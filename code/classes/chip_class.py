@@ -0,0 +1,79 @@
+from collections import Counter
+from types import MappingProxyType
+
+from code.classes.nodes_class import Node
+
+
+class ChipContext:
+    """
+    Read-only description of a chip and the netlist that has to be routed on it.
+    It is built once per chip/netlist combination (see load_chip_context in code/imports.py)
+    and shared by the grid, the routers and every wire.
+    """
+    def __init__(self, nodes: list[Node], netlist: list[tuple[int, int]], nodes_csv_path: str = None, netlist_csv_path: str = None) -> None:
+        self._nodes = tuple(nodes)
+        self._netlist = tuple(netlist)
+        self._node_counts = MappingProxyType(Counter(node_id for connection in self._netlist for node_id in connection))
+        self._node_positions = MappingProxyType({
+            (node.give_x(), node.give_y()): node_id
+            for node_id, node in enumerate(self._nodes, start=1)
+        })
+        self.nodes_csv_path = nodes_csv_path
+        self.netlist_csv_path = netlist_csv_path
+
+
+    def __reduce__(self):
+        """
+        Pickles the context for worker processes. A context loaded from csv files is
+        loaded again (once per process) from the same files, otherwise the nodes and netlist are sent.
+        """
+        if self.nodes_csv_path is not None and self.netlist_csv_path is not None:
+            return (_load_from_csv, (self.nodes_csv_path, self.netlist_csv_path))
+        return (ChipContext, (list(self._nodes), list(self._netlist)))
+
+
+    def __repr__(self):
+        return f"ChipContext(nodes={len(self._nodes)}, nets={len(self._netlist)})"
+
+
+    def give_nodes(self) -> tuple[Node, ...]:
+        """
+        Returns the nodes (gates) of the chip, node id i is found at index i - 1.
+        """
+        return self._nodes
+
+
+    def give_node(self, node_id: int) -> Node:
+        """
+        Returns the node belonging to a node id of the netlist.
+        """
+        return self._nodes[node_id - 1]
+
+
+    def give_netlist(self) -> tuple[tuple[int, int], ...]:
+        """
+        Returns the netlist as tuples of node ids.
+        """
+        return self._netlist
+
+
+    def give_node_counts(self) -> MappingProxyType:
+        """
+        Returns how many times each node id appears in the netlist.
+        """
+        return self._node_counts
+
+
+    def give_node_id(self, x: int, y: int) -> int|None:
+        """
+        Returns the id of the node placed on (x, y) of the base layer, or None if there is no node.
+        """
+        return self._node_positions.get((x, y))
+
+
+def _load_from_csv(nodes_csv_path: str, netlist_csv_path: str) -> ChipContext:
+    """
+    Unpickles a context through the cached loader, so every process shares one instance.
+    """
+    from code.imports import load_chip_context
+    return load_chip_context(nodes_csv_path, netlist_csv_path)
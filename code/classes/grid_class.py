@@ -1,35 +1,224 @@
 from collections import Counter
 
+import numpy as np
+
 from code.classes.nodes_class import Node
+from code.classes.chip_class import ChipContext
 from code.classes.wire_class import Wire, WirePoint
-from code.imports import import_netlist, import_nodes
 from code.classes.segment_class import Segment
+from code.classes.search_class import SearchKernel
+from code.classes.sparse_class import SparseArray, SparseCostField
+
+# Layers of a chip: the base layer and 7 layers up (set by the rules of the case)
+LAYERS = 8
+
+# Storage of the occupied cells and segments, see Grid_3D
+BACKENDS = ('dense', 'sparse')
+
+# Offsets (dx, dy, dz) of the cells within 3 steps of a node that lie on or above its layer,
+# and the amount of steps to each of them
+NODE_STENCIL_OFFSETS = np.array([
+    (dx, dy, dz)
+    for dx in range(-3, 4) for dy in range(-3, 4) for dz in range(0, 4)
+    if 0 < abs(dx) + abs(dy) + dz <= 3
+], dtype=np.int64)
+NODE_STENCIL_STEPS = np.abs(NODE_STENCIL_OFFSETS).sum(axis=1)
+
+
+# Kinds of entries in the undo log of a transaction, see Grid_3D.begin()
+_UNDO_POINT = 0     # (kind, flat index, old count)
+_UNDO_VALUE = 1     # (kind, flat index, old value)
+_UNDO_EDGE = 2      # (kind, flat edge index, old occupation)
+_UNDO_IRREGULAR = 3 # (kind, segment key, was in the set)
+_UNDO_APPEND = 4    # (kind,) a wire was appended to the wire list
+_UNDO_REMOVE = 5    # (kind, position, wire) a wire was removed from the wire list
+_UNDO_PENALTY = 6   # (kind, wire, old penalty or None)
+_UNDO_FIELD = 7     # (kind, copy of the cost field, old penalties)
+_UNDO_CLEAR = 8     # (kind, copy of everything clear_wires() resets)
+
 
 class Grid_3D:
-    def __init__(self, n, m, nodes_csv_path, netlist_csv_path):
-        """
-        Generates a grid of n x m x 8. 
-        """
+    def __init__(self, n, m, context: ChipContext, height: int = LAYERS, backend: str = 'dense'):
+        """
+        Generates a grid of n x m x height. 
+
+        With the dense backend the cost field is stored as a contiguous numpy array of shape 
+        (n, m, height). A cell can also be addressed by its flat index, see index(). The occupancy 
+        counts are an array of the same shape and the occupied segments a boolean edge array per 
+        axis, see edge_index(). The sparse backend keeps the occupied cells and segments and the 
+        gates in a SparseArray, and the cost field in a SparseCostField that only stores the cells 
+        that differ from the base field. Its memory grows with the wires instead of the cells of 
+        the chip; the routing is the same with both.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}, choose from {', '.join(BACKENDS)}.")
+        if height < 1:
+            raise ValueError("A grid needs at least one layer.")
         self.n = n
         self.m = m
-        self.height = 8 # 1st base layer and 7 dimensions up (set by the rules of the case)
+        self.height = height # 1st base layer and the layers above it
+        self.size = self.n * self.m * self.height
+        self.backend = backend
         self._wires = []
         self._lines_count = 0
-        self._wires_segments = set()
-        self._nodes = import_nodes(nodes_csv_path)
-        self._netlist = import_netlist(netlist_csv_path)
-        self.nodes_csv_path = nodes_csv_path
+        self._intersections = 0 # Running total, kept up to date by add_wire_dict() and remove_wire()
+        self._irregular_segments = set() # Segments that don't fit in the edge array, see add_segment()
+        self._context = context
+        self._nodes = context.give_nodes()
+        self._netlist = context.give_netlist()
         self.failed_wires = 0
         self.total_wires = 0
-        self._point_dict = {
-            (x, y, z): 0
-            for x in range(self.n)
-            for y in range(self.m)
-            for z in range(self.height)
-        }
-        self.grid_values = {
-            (x, y, z): 0 for x in range(self.n) for y in range(self.m) for z in range(self.height)
-        }
+        if backend == 'dense':
+            self.grid_values = np.zeros((self.n, self.m, self.height), dtype=np.float64)
+            self._point_dict = np.zeros((self.n, self.m, self.height), dtype=np.int32)
+            self._edges = np.zeros((3, self.n, self.m, self.height), dtype=bool)
+        else:
+            self.grid_values = SparseCostField(self.n, self.m, self.height)
+            self._point_dict = SparseArray(self.size, np.int32)
+            self._edges = SparseArray(3 * self.size, bool)
+
+        # Flat views on the arrays above, they share the same memory (a sparse array is flat already)
+        self._flat_point_dict = self._point_dict.reshape(-1) if backend == 'dense' else self._point_dict
+        self._flat_grid_values = self.grid_values.reshape(-1) if backend == 'dense' else self.grid_values
+        self._value_bounds = None # (min, max) of the cost field, see value_bounds()
+        self._base_cost_fields = {} # Base cost field per set of costs, see base_cost_field()
+        self._base_rings = {} # Cells and costs of the rings around busy nodes per set of costs
+        self._flat_edges = self._edges.reshape(-1) if backend == 'dense' else self._edges
+
+        # Gate lookups: the id of the gate on each base layer cell (0 if there is none) 
+        # and a mask over all cells, so a blocked cell test is a single read
+        if backend == 'dense':
+            self._node_ids = np.zeros(self.n * self.m, dtype=np.int32)
+            self._flat_node_cells = np.zeros(self.size, dtype=bool)
+        else:
+            self._node_ids = SparseArray(self.n * self.m, np.int32)
+            self._flat_node_cells = SparseArray(self.size, bool)
+        for node_id, node in enumerate(self._nodes, start=1):
+            if self.in_bounds(node.give_x(), node.give_y(), 0):
+                self._node_ids[node.give_x() * self.m + node.give_y()] = node_id
+                self._flat_node_cells[self.index(node.give_x(), node.give_y(), 0)] = True
+        self._search_kernel = None
+
+        # Intersection penalty put in the cost field per wire, so remove_wire() can take it out again
+        self._wire_penalties = {}
+
+        # Undo log of the running transactions and the snapshot at the start of each, see begin()
+        self._undo_log = None
+        self._transactions = []
+
+    def index(self, x: int, y: int, z: int) -> int:
+        """
+        Returns the flat index of the cell (x, y, z). The flat index follows the
+        (x, y, z) ordering of the cells.
+        """
+        return (x * self.m + y) * self.height + z
+
+    def coordinates(self, index: int) -> tuple[int, int, int]:
+        """
+        Returns the (x, y, z) coordinates of a flat index.
+        """
+        xy, z = divmod(index, self.height)
+        x, y = divmod(xy, self.m)
+        return (x, y, z)
+
+    def in_bounds(self, x: int, y: int, z: int) -> bool:
+        """
+        Checks if the coordinates lie within the grid.
+        """
+        return 0 <= x < self.n and 0 <= y < self.m and 0 <= z < self.height
+
+    def edge_index(self, x1: int, y1: int, z1: int, x2: int, y2: int, z2: int) -> int:
+        """
+        Returns the flat index of the edge between two neighbouring cells in the edge array.
+        An edge is stored at its lowest cell, in the block of the axis it runs along.
+        Returns -1 if the cells are not neighbours within the grid.
+        """
+        if not (self.in_bounds(x1, y1, z1) and self.in_bounds(x2, y2, z2)):
+            return -1
+
+        dx, dy, dz = x2 - x1, y2 - y1, z2 - z1
+        if abs(dx) + abs(dy) + abs(dz) != 1:
+            return -1
+
+        axis = 0 if dx else (1 if dy else 2)
+        return axis * self.size + self.index(min(x1, x2), min(y1, y2), min(z1, z2))
+
+    def flat_values(self) -> np.ndarray:
+        """
+        Returns the cost field as a flat array, indexed with index().
+        Like flat_point_counts(), the sparse backend returns a copy.
+        """
+        if self.backend == 'dense':
+            return self._flat_grid_values
+        return self._flat_grid_values.toarray()
+
+    def value_bounds(self) -> tuple[float, float]:
+        """
+        Returns the lowest and highest value of the cost field. They are computed once per cost
+        field, every change to the field resets them.
+        """
+        if self._value_bounds is None:
+            values = self._flat_grid_values
+            if self.backend == 'dense':
+                self._value_bounds = (float(values.min()), float(values.max()))
+            else:
+                lowest, highest = values.bounds()
+                self._value_bounds = (float(lowest), float(highest))
+        return self._value_bounds
+
+    def flat_point_counts(self) -> np.ndarray:
+        """
+        Returns the amount of wires per cell as a flat array, indexed with index().
+        The dense backend returns its own array, which follows the grid; the sparse backend
+        returns a copy, so it has to be asked for again after the wires change.
+        """
+        if self.backend == 'dense':
+            return self._flat_point_dict
+        return self._flat_point_dict.toarray()
+
+    def flat_edges(self) -> np.ndarray:
+        """
+        Returns the occupied segments as a flat boolean array, indexed with edge_index().
+        Like flat_point_counts(), the sparse backend returns a copy.
+        """
+        if self.backend == 'dense':
+            return self._flat_edges
+        return self._flat_edges.toarray()
+
+    def point_count_lookup(self):
+        """
+        Returns the amount of wires per cell for reads of single cells by flat index, without 
+        a copy: a memoryview of the dense array or the sparse array itself.
+        """
+        if self.backend == 'dense':
+            return memoryview(self._flat_point_dict)
+        return self._flat_point_dict
+
+    def edge_lookup(self):
+        """
+        Returns the occupied segments for reads of single edges by flat edge index, like
+        point_count_lookup().
+        """
+        if self.backend == 'dense':
+            return memoryview(self._flat_edges)
+        return self._flat_edges
+
+    def flat_node_cells(self) -> np.ndarray:
+        """
+        Returns the mask of cells taken by a node as a flat array, indexed with index().
+        Like flat_point_counts(), the sparse backend returns a copy.
+        """
+        if self.backend == 'dense':
+            return self._flat_node_cells
+        return self._flat_node_cells.toarray()
+
+    def node_cell_lookup(self):
+        """
+        Returns the mask of cells taken by a node for reads of single cells, like point_count_lookup().
+        """
+        if self.backend == 'dense':
+            return memoryview(self._flat_node_cells)
+        return self._flat_node_cells
 
     def set_point_value(self, wire: Wire, intersection_penalty: int):
         """
@@ -41,18 +230,29 @@ class Grid_3D:
             z (int): Z-coordinate of the point.
             value (int): The value to set for the point.
         """
+        log = self._undo_log
+        values = self._flat_grid_values
+        self._value_bounds = None
         wirepoints = wire.give_wirepoints()
         for wirepoint in wirepoints:
             location = wirepoint.give_place()
-            self.grid_values[location] += intersection_penalty
+            index = self.index(*location)
+            if log is not None:
+                log.append((_UNDO_VALUE, index, values[index]))
+            values[index] += intersection_penalty
+
+        old_penalty = self._wire_penalties.get(wire)
+        if log is not None:
+            log.append((_UNDO_PENALTY, wire, old_penalty))
+        self._wire_penalties[wire] = (old_penalty or 0) + intersection_penalty
 
-    def return_point_dict(self):
+    def return_point_dict(self) -> np.ndarray:
         """
-        Returns the point dict.
+        Returns the array with the amount of wires running through each point.
         """
-        return self._point_dict
+        return self.flat_point_counts().reshape(self.n, self.m, self.height)
 
-    def get_point_value(self, point: WirePoint) -> int:
+    def get_point_value(self, point: WirePoint) -> float:
         """
         Gets the value of a specific point in the grid.
 
@@ -62,10 +262,11 @@ class Grid_3D:
             z (int): Z-coordinate of the point.
 
         Returns:
-            int: The value of the point.
+            float: The value of the point.
         """
-        if 0 <= point.give_x() < self.n and 0 <= point.give_y() < self.m and 0 <= point.give_z() < self.height:
-            return self.grid_values[(point.give_x(), point.give_y(), point.give_z())]
+        x, y, z = point.give_place()
+        if self.in_bounds(x, y, z):
+            return float(self._flat_grid_values[self.index(x, y, z)])
         else:
             raise ValueError("Point is out of grid bounds.")
         
@@ -96,195 +297,292 @@ class Grid_3D:
 
     def apply_costs_around_nodes(self, biggest_1step_cost=50, biggest_2step_cost=20, biggest_3step_cost=10, big_1step_cost=35, big_2step_cost=15, big_3step_cost=5, medium_1step_cost=25, medium_2step_cost=5, small_1step_cost=5):
         """
-        1) Apply extra cost around nodes that appear frequently in the netlist.
-        2) Then, ALSO make outer cells cheaper and center cells more expensive.
+        Sets the cost field to the base cost field of the chip, see base_cost_field().
         The values of the variables are based on the findings of the experiment phase of the project.
         """
+        # The penalties of the wires are gone with the old field
+        if self._undo_log is not None:
+            self._undo_log.append((_UNDO_FIELD, self.grid_values.copy(), self._wire_penalties))
+        self._wire_penalties = {}
+        self._value_bounds = None
+        costs = (biggest_1step_cost, biggest_2step_cost, biggest_3step_cost,
+                 big_1step_cost, big_2step_cost, big_3step_cost,
+                 medium_1step_cost, medium_2step_cost, small_1step_cost)
+        if self.backend == 'dense':
+            np.copyto(self.grid_values, self.base_cost_field(*costs))
+        else:
+            self.grid_values.reset(*self._base_ring(costs))
 
-        # Count how many times each node appears in the netlist
-        node_counts = Counter([node for pair in self._netlist for node in pair])
+    def base_cost_field(self, biggest_1step_cost=50, biggest_2step_cost=20, biggest_3step_cost=10, big_1step_cost=35, big_2step_cost=15, big_3step_cost=5, medium_1step_cost=25, medium_2step_cost=5, small_1step_cost=5) -> np.ndarray:
+        """
+        Returns the (read-only) base cost field for the given costs. It does not depend on
+        the wires, so it is only computed the first time a set of costs is asked for.
+        """
+        costs = (biggest_1step_cost, biggest_2step_cost, biggest_3step_cost,
+                 big_1step_cost, big_2step_cost, big_3step_cost,
+                 medium_1step_cost, medium_2step_cost, small_1step_cost)
+        field = self._base_cost_fields.get(costs)
+        if field is None:
+            field = self._compute_base_cost_field(*costs)
+            field.setflags(write=False)
+            self._base_cost_fields[costs] = field
+        return field
 
-        # For each node, set certain rings of cells around it to a higher cost
-        for node in self._nodes:
-            x, y, z = node.give_x(), node.give_y(), 0
-            
-            # If node used >=5 times, apply very big cost
-            if node_counts[node] >= 5 or (node_counts[node] >= 4 and self.count_neighbors(x,y,z) <= 4) or (node_counts[node] >= 3 and self.count_neighbors(x,y,z) <= 3):
-                for dx, dy, dz, cost in [
-                    (0, 0, 1, biggest_1step_cost),  # Above
-                    (0, -1, 0, biggest_1step_cost), (0, 1, 0, biggest_1step_cost),  # Vertical neighbors
-                    (-1, 0, 0, biggest_1step_cost), (1, 0, 0, biggest_1step_cost),  # Horizontal neighbors
-
-                    (0, 0, 2, biggest_2step_cost),  # Two steps above
-                    (0, -2, 0, biggest_2step_cost), (0, 2, 0, biggest_2step_cost),  # Two steps vertical
-                    (-2, 0, 0, biggest_2step_cost), (2, 0, 0, biggest_2step_cost),  # Two steps horizontal
-                    (-1, -1, 0, biggest_2step_cost), (-1, 1, 0, biggest_2step_cost), (1, 1, 0, biggest_2step_cost), (1, -1, 0, biggest_2step_cost), # Non direct neighbors bottom layer
-                    (1, 0, 1, biggest_2step_cost), (-1, 0, 1, biggest_2step_cost), (0, -1, 1, biggest_2step_cost), (0, 1, 1, biggest_2step_cost), # One horizontal one vertical
-
-                    # Now all points with a distance of 3 steps
-                    # Pure axis-aligned points
-                    (3, 0, 0, biggest_3step_cost), (-3, 0, 0, biggest_3step_cost), (0, 3, 0, biggest_3step_cost), (0, -3, 0, biggest_3step_cost), (0, 0, 3, biggest_3step_cost),
-
-                    # Two-axis combinations
-                    (2, 1, 0, biggest_3step_cost), (2, -1, 0, biggest_3step_cost), (2, 0, 1, biggest_3step_cost),
-                    (-2, 1, 0, biggest_3step_cost), (-2, -1, 0, biggest_3step_cost), (-2, 0, 1, biggest_3step_cost),
-                    (1, 2, 0, biggest_3step_cost), (1, -2, 0, biggest_3step_cost), (0, 2, 1, biggest_3step_cost),
-                    (-1, 2, 0, biggest_3step_cost), (-1, -2, 0, biggest_3step_cost), (0, -2, 1, biggest_3step_cost),
-                    (1, 0, 2, biggest_3step_cost), (-1, 0, 2, biggest_3step_cost), (0, 1, 2, biggest_3step_cost), (0, -1, 2, biggest_3step_cost),
-
-                    # Three-axis combinations
-                    (1, 1, 1, biggest_3step_cost), (1, -1, 1, biggest_3step_cost), (-1, 1, 1, biggest_3step_cost), (-1, -1, 1, biggest_3step_cost)
-                    ]:
-                    nx, ny, nz = x + dx, y + dy, z + dz
-                    if 0 <= nx < self.n and 0 <= ny < self.m and 0 <= nz < self.height:
-                        self.grid_values[(nx, ny, nz)] = cost
-
-            # If node used >=4 times, apply big cost
-            if node_counts[node] >= 4 or (node_counts[node] >= 3 and self.count_neighbors(x,y,z) <= 4) or (node_counts[node] >= 2 and self.count_neighbors(x,y,z) <= 3):
-                for dx, dy, dz, cost in [
-                    (0, 0, 1, big_1step_cost),  # Above
-                    (0, -1, 0, big_1step_cost), (0, 1, 0, big_1step_cost),  # Vertical neighbors
-                    (-1, 0, 0, big_1step_cost), (1, 0, 0, big_1step_cost),  # Horizontal neighbors
-
-                    (0, 0, 2, big_2step_cost),  # Two steps above
-                    (0, -2, 0, big_2step_cost), (0, 2, 0, big_2step_cost),  # Two steps vertical
-                    (-2, 0, 0, big_2step_cost), (2, 0, 0, big_2step_cost),  # Two steps horizontal
-                    (-1, -1, 0, big_2step_cost), (-1, 1, 0, big_2step_cost), (1, 1, 0, big_2step_cost), (1, -1, 0, big_2step_cost), # Non direct neighbors bottom layer
-                    (1, 0, 1, big_2step_cost), (-1, 0, 1, big_2step_cost), (0, -1, 1, big_2step_cost), (0, 1, 1, big_2step_cost), # One horizontal one vertical
-
-                    # Now all points with a distance of 3 steps
-                    # Pure axis-aligned points
-                    (3, 0, 0, big_3step_cost), (-3, 0, 0, big_3step_cost), (0, 3, 0, big_3step_cost), (0, -3, 0, big_3step_cost), (0, 0, 3, big_3step_cost),
-
-                    # Two-axis combinations
-                    (2, 1, 0, big_3step_cost), (2, -1, 0, big_3step_cost), (2, 0, 1, big_3step_cost),
-                    (-2, 1, 0, big_3step_cost), (-2, -1, 0, big_3step_cost), (-2, 0, 1, big_3step_cost),
-                    (1, 2, 0, big_3step_cost), (1, -2, 0, big_3step_cost), (0, 2, 1, big_3step_cost),
-                    (-1, 2, 0, big_3step_cost), (-1, -2, 0, big_3step_cost), (0, -2, 1, big_3step_cost),
-                    (1, 0, 2, big_3step_cost), (-1, 0, 2, big_3step_cost), (0, 1, 2, big_3step_cost), (0, -1, 2, big_3step_cost),
-
-                    # Three-axis combinations
-                    (1, 1, 1, big_3step_cost), (1, -1, 1, big_3step_cost), (-1, 1, 1, big_3step_cost), (-1, -1, 1, big_3step_cost)
-                    ]:
-                    nx, ny, nz = x + dx, y + dy, z + dz
-                    if 0 <= nx < self.n and 0 <= ny < self.m and 0 <= nz < self.height:
-                        self.grid_values[(nx, ny, nz)] = cost
-
-            # If node used >=3 times, apply medium ring
-            elif node_counts[node] >= 3 or (node_counts[node] >= 2 and self.count_neighbors(x,y,z) <= 3):
-                for dx, dy, dz, cost in [
-                    (0, 0, 1, medium_1step_cost),  # Above
-                    (0, -1, 0, medium_1step_cost), (0, 1, 0, medium_1step_cost),  # Vertical neighbors
-                    (-1, 0, 0, medium_1step_cost), (1, 0, 0, medium_1step_cost),  # Horizontal neighbors
-
-                    (0, 0, 2, medium_2step_cost),  # Two steps above
-                    (0, -2, 0, medium_2step_cost), (0, 2, 0, medium_2step_cost),  # Two steps vertical
-                    (-2, 0, 0, medium_2step_cost), (2, 0, 0, medium_2step_cost),  # Two steps horizontal
-                    (-1, -1, 0, medium_2step_cost), (-1, 1, 0, medium_2step_cost), (1, 1, 0, medium_2step_cost), (1, -1, 0, medium_2step_cost), # Non direct neighbors bottom layer
-                    (1, 0, 1, medium_2step_cost), (-1, 0, 1, medium_2step_cost), (0, -1, 1, medium_2step_cost), (0, 1, 1, medium_2step_cost) # One horizontal one vertical
-                ]:
-                    nx, ny, nz = x + dx, y + dy, z + dz
-                    if 0 <= nx < self.n and 0 <= ny < self.m and 0 <= nz < self.height:
-                        self.grid_values[(nx, ny, nz)] = cost
-
-        # If node used >=2 times, apply a small ring
-            elif node_counts[node] >= 2:
-                for dx, dy, dz, cost in [
-                    (0, 0, 1, small_1step_cost),  # Above
-                    (0, -1, 0, small_1step_cost), (0, 1, 0, small_1step_cost),  # Vertical neighbors
-                    (-1, 0, 0, small_1step_cost), (1, 0, 0, small_1step_cost)  # Horizontal neighbors
-                ]:
-                    nx, ny, nz = x + dx, y + dy, z + dz
-                    if 0 <= nx < self.n and 0 <= ny < self.m and 0 <= nz < self.height:
-                        self.grid_values[(nx, ny, nz)] = cost
+    def _base_ring(self, costs: tuple) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the rings of extra cost around busy nodes for a set of costs, they are only
+        computed the first time.
+        Returns:
+          (flat indices of the cells, their extra cost)
+        """
+        ring = self._base_rings.get(costs)
+        if ring is None:
+            ring = self._compute_base_ring(*costs)
+            self._base_rings[costs] = ring
+        return ring
 
+    def _compute_base_cost_field(self, *costs) -> np.ndarray:
+        """
+        Computes the dense base cost field for a set of costs:
+        1) Apply extra cost around nodes that appear frequently in the netlist.
+        2) Then, ALSO make outer cells cheaper and center cells more expensive.
+        """
+        field = np.zeros((self.n, self.m, self.height), dtype=np.float64)
+
+        # -----------------------------------------------------
+        # 1) RINGS OF EXTRA COST AROUND BUSY NODES
+        # -----------------------------------------------------
+
+        cells, values = self._base_ring(costs)
+        field.reshape(-1)[cells] = values
 
         # -----------------------------------------------------
         # 2) MAKE OUTER CELLS CHEAPER AND CENTER CELLS PRICIER
         # -----------------------------------------------------
-        
-        for x in range(self.n):
-            for y in range(self.m):
-                for z in range(self.height):
-                    dist_to_edge = min(
-                        x,               # distance from left edge
-                        self.n - 1 - x,  # distance from right edge
-                        y,               # distance from top edge
-                        self.m - 1 - y,  # distance from bottom edge
-                    )
-
-                    cost_bump = dist_to_edge * 0.1
-                    
-                    if z == 0:
-                        cost_bump += 5
-                    elif z == 1:
-                        cost_bump += 4
-                    elif z == 2:
-                        cost_bump += 3
-                    elif z == 3:
-                        cost_bump += 2
-                    elif z == 4:
-                        cost_bump += 1
-                    elif z == 5:
-                        cost_bump += 0
-                    elif z == 6:
-                        cost_bump += 0
-
-                    self.grid_values[(x, y, z)] += cost_bump
-        
 
+        xs, ys = np.arange(self.n), np.arange(self.m)
+        dist_to_edge = np.minimum(
+            np.minimum(xs, self.n - 1 - xs)[:, None], # distance from left and right edge
+            np.minimum(ys, self.m - 1 - ys)[None, :], # distance from top and bottom edge
+        )
+        layer_bump = np.maximum(5 - np.arange(self.height), 0) # 5 on the base layer, 1 less per layer up
+
+        field += dist_to_edge[:, :, None] * 0.1 + layer_bump[None, None, :]
+
+        return field
+
+    def _compute_base_ring(self, biggest_1step_cost, biggest_2step_cost, biggest_3step_cost, big_1step_cost, big_2step_cost, big_3step_cost, medium_1step_cost, medium_2step_cost, small_1step_cost) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Computes the rings of extra cost around the nodes that appear frequently in the netlist.
+        """
+        # Count how many times each node appears in the netlist
+        node_counts = Counter([node for pair in self._netlist for node in pair])
+
+        positions = np.array([(node.give_x(), node.give_y(), 0) for node in self._nodes], dtype=np.int64).reshape(-1, 3)
+        counts = np.array([node_counts[node] for node in self._nodes], dtype=np.int64)
+
+        # Neighbours of a node on the base layer: the cell above (if there is a layer above) and 
+        # the in-grid cells beside it
+        neighbours = (int(self.height > 1) + (positions[:, 0] > 0) + (positions[:, 0] < self.n - 1)
+                        + (positions[:, 1] > 0) + (positions[:, 1] < self.m - 1))
 
+        # The tiers in the order they are written, a later tier of the same node overwrites an earlier one
+        biggest = (counts >= 5) | ((counts >= 4) & (neighbours <= 4)) | ((counts >= 3) & (neighbours <= 3))
+        big = (counts >= 4) | ((counts >= 3) & (neighbours <= 4)) | ((counts >= 2) & (neighbours <= 3))
+        medium = ~big & ((counts >= 3) | ((counts >= 2) & (neighbours <= 3)))
+        small = ~big & ~medium & (counts >= 2)
+        tiers = [
+            (biggest, (biggest_1step_cost, biggest_2step_cost, biggest_3step_cost)),
+            (big, (big_1step_cost, big_2step_cost, big_3step_cost)),
+            (medium, (medium_1step_cost, medium_2step_cost)),
+            (small, (small_1step_cost,)),
+        ]
+
+        cells, values, order = [], [], []
+        for tier, (node_mask, step_costs) in enumerate(tiers):
+            in_stencil = NODE_STENCIL_STEPS <= len(step_costs)
+            offsets = NODE_STENCIL_OFFSETS[in_stencil]
+            costs = np.array((0,) + step_costs, dtype=np.float64)[NODE_STENCIL_STEPS[in_stencil]]
+            node_indices = np.flatnonzero(node_mask)
+
+            # Every cell of the stencil placed on every node of the tier
+            points = (positions[node_indices, None, :] + offsets[None, :, :]).reshape(-1, 3)
+            inside = ((points >= 0) & (points < (self.n, self.m, self.height))).all(axis=1)
+            cells.append((points[inside, 0] * self.m + points[inside, 1]) * self.height + points[inside, 2])
+            values.append(np.broadcast_to(costs, (len(node_indices), len(costs))).reshape(-1)[inside])
+            order.append(np.repeat(node_indices * len(tiers) + tier, len(costs))[inside])
+
+        cells, values, order = np.concatenate(cells), np.concatenate(values), np.concatenate(order)
+
+        # A cell gets the cost of the last write to it: the last node, and the last tier of that node.
+        # Sorted by cell and then by write, the last entry of each cell wins
+        writes = np.lexsort((order, cells))
+        cells, values = cells[writes], values[writes]
+        last = np.append(cells[1:] != cells[:-1], True) if len(cells) else np.zeros(0, dtype=bool)
+        return cells[last], values[last]
+
+    def begin(self) -> None:
+        """
+        Starts a transaction: from now on every change to the grid is recorded in an undo log,
+        until commit() keeps the changes or rollback() undoes them. Transactions can be nested.
+        """
+        if self._undo_log is None:
+            self._undo_log = []
+        self._transactions.append(self.snapshot())
+
+    def commit(self) -> None:
+        """
+        Ends the innermost transaction and keeps its changes.
+        """
+        if not self._transactions:
+            raise RuntimeError("There is no transaction to commit.")
+        self._transactions.pop()
+        if not self._transactions:
+            self._undo_log = None
+
+    def rollback(self) -> None:
+        """
+        Undoes every change of the innermost transaction and ends it.
+        """
+        if not self._transactions:
+            raise RuntimeError("There is no transaction to roll back.")
+        self.restore(self._transactions.pop())
+        if not self._transactions:
+            self._undo_log = None
+
+    def snapshot(self) -> tuple:
+        """
+        Returns a snapshot of the grid inside a transaction: the length of the undo log and the totals.
+        Taking one costs nothing, restore() only undoes the changes made after it. A snapshot stays 
+        valid until the grid is restored to an earlier snapshot or its transaction ends.
+        """
+        if self._undo_log is None:
+            raise RuntimeError("Snapshots can only be taken inside a transaction, see begin().")
+        return (len(self._undo_log), self._lines_count, self._intersections, self.failed_wires, self.total_wires)
+
+    def restore(self, snapshot: tuple) -> None:
+        """
+        Puts the grid back in the state of a snapshot, by undoing the changes made after it.
+        The arrays are changed in place, so their flat views (and the search kernel) stay valid.
+        """
+        length, lines_count, intersections, failed_wires, total_wires = snapshot
+        log = self._undo_log
+        if log is None or length > len(log):
+            raise RuntimeError("The snapshot is no longer valid.")
+
+        while len(log) > length:
+            self._undo(log.pop())
+        self._value_bounds = None
+
+        self._lines_count = lines_count
+        self._intersections = intersections
+        self.failed_wires = failed_wires
+        self.total_wires = total_wires
+
+    def _undo(self, entry: tuple) -> None:
+        """
+        Undoes one entry of the undo log.
+        """
+        kind = entry[0]
+        if kind == _UNDO_POINT:
+            self._flat_point_dict[entry[1]] = entry[2]
+        elif kind == _UNDO_VALUE:
+            self._flat_grid_values[entry[1]] = entry[2]
+        elif kind == _UNDO_EDGE:
+            self._flat_edges[entry[1]] = entry[2]
+        elif kind == _UNDO_IRREGULAR:
+            if entry[2]:
+                self._irregular_segments.add(entry[1])
+            else:
+                self._irregular_segments.discard(entry[1])
+        elif kind == _UNDO_APPEND:
+            self._wires.pop()
+        elif kind == _UNDO_REMOVE:
+            self._wires.insert(entry[1], entry[2])
+        elif kind == _UNDO_PENALTY:
+            if entry[2] is None:
+                self._wire_penalties.pop(entry[1], None)
+            else:
+                self._wire_penalties[entry[1]] = entry[2]
+        elif kind == _UNDO_FIELD:
+            _copy_into(self.grid_values, entry[1])
+            self._wire_penalties = entry[2]
+        elif kind == _UNDO_CLEAR:
+            _, point_dict, grid_values, edges, irregular_segments, wires, wire_penalties = entry
+            _copy_into(self._point_dict, point_dict)
+            _copy_into(self.grid_values, grid_values)
+            _copy_into(self._edges, edges)
+            self._irregular_segments = irregular_segments
+            self._wires = wires
+            self._wire_penalties = wire_penalties
 
     def clear_wires(self):
         """
         Re-initializes the grid's data structures to clear all wires.
         """
+        if self._undo_log is not None:
+            self._undo_log.append((
+                _UNDO_CLEAR, self._point_dict.copy(), self.grid_values.copy(), self._edges.copy(),
+                self._irregular_segments, self._wires, self._wire_penalties
+            ))
+        self._wire_penalties = {}
         self._wires = []
         self._lines_count = 0
-        self._wires_segments = set()
+        self._intersections = 0
+        self._edges.fill(False)
+        self._irregular_segments = set()
         self.failed_wires = 0
         self.total_wires = 0
-        self._point_dict = {
-            (x, y, z): 0
-            for x in range(self.n)
-            for y in range(self.m)
-            for z in range(self.height)
-        }
-        self.grid_values = {
-            (x, y, z): 0 for x in range(self.n) for y in range(self.m) for z in range(self.height)
-        }
+        self._point_dict.fill(0)
+        self.grid_values.fill(0)
+        self._value_bounds = None
 
     def remove_wire(self, wire: Wire) -> None:
         """
         Removes a wire from the grid and updates the grid's data structures.
+        It undoes exactly what laying the wire did: the point counts of add_wire_dict(), 
+        the penalty of set_point_value() and the segments.
         """
-        # Get the wirepoints from the wire
+        log = self._undo_log
         wirepoints = wire.give_wirepoints()
-
-        # Iterate through the wirepoints and update the grid values and point dictionary
-        for point in wirepoints:
-            x, y, z = point.give_x(), point.give_y(), point.give_z()
-
-            # Update the grid values to default (1 in this case)
-            self.grid_values[(x, y, z)] = 1
-
-            # Decrease the count in the point dictionary
-            if (x, y, z) in self._point_dict:
-                self._point_dict[(x, y, z)] -= 1
-                if self._point_dict[(x, y, z)] < 0:
-                    self._point_dict[(x, y, z)] = 0
-
-        # Remove segments associated with the wire from the segment set
+        values = self._flat_grid_values
+        point_dict = self._flat_point_dict
+
+        # Take the intersection penalty of the wire out of the cost field again
+        penalty = self._wire_penalties.pop(wire, None)
+        if penalty is not None:
+            self._value_bounds = None
+            if log is not None:
+                log.append((_UNDO_PENALTY, wire, penalty))
+            for point in wirepoints:
+                index = self.index(*point.give_place())
+                if log is not None:
+                    log.append((_UNDO_VALUE, index, values[index]))
+                values[index] -= penalty
+
+        # Decrease the count in the point array (the end node was not counted), a cell used 
+        # more than once loses an intersection
+        for point in wirepoints[:-1]:
+            index = self.index(*point.give_place())
+            count = point_dict[index]
+            if count > 0:
+                if count > 1 and not self._flat_node_cells[index]:
+                    self._intersections -= 1
+                if log is not None:
+                    log.append((_UNDO_POINT, index, count))
+                point_dict[index] = count - 1
+
+        # Remove segments associated with the wire from the edge array
         for i in range(len(wirepoints) - 1):
-            start_point = wirepoints[i]
-            end_point = wirepoints[i + 1]
-            segment = Segment(start_point, end_point)
-            if segment in self._wires_segments:
-                self._wires_segments.remove(segment)
+            self.remove_segment(wirepoints[i], wirepoints[i + 1])
 
-        # Remove the wire from the list of wires
-        if wire in self._wires:
-            self._wires.remove(wire)
+        # Remove the wire from the list of wires, searched from the end as the last wire is removed most
+        for position in range(len(self._wires) - 1, -1, -1):
+            if self._wires[position] is wire:
+                del self._wires[position]
+                if log is not None:
+                    log.append((_UNDO_REMOVE, position, wire))
+                break
 
         # Update line count
         self._lines_count -= len(wirepoints) - 1
@@ -319,6 +617,8 @@ class Grid_3D:
         Add a wire to the list of wires
         """
         self._wires.append(wire)
+        if self._undo_log is not None:
+            self._undo_log.append((_UNDO_APPEND,))
 
 
     def return_wire_list(self) -> list[Wire]:
@@ -333,37 +633,100 @@ class Grid_3D:
         Adds a wire to the wirepoint dictionary and updates the segment set.
         """
 
+        log = self._undo_log
         wirepoints = wire.give_wirepoints()
         for i in range(len(wirepoints) - 1):
             start_point = wirepoints[i]
             x, y, z = start_point.give_place()
-            self._point_dict[(x, y, z)] += 1
+            index = self.index(x, y, z)
+
+            # A cell that is already used becomes an intersection, nodes don't count
+            count = self._flat_point_dict[index]
+            if count > 0 and not self._flat_node_cells[index]:
+                self._intersections += 1
+            if log is not None:
+                log.append((_UNDO_POINT, index, count))
+            self._flat_point_dict[index] = count + 1
 
-        
         self._lines_count += len(wirepoints) - 1
 
 
+    def _segment_key(self, start: WirePoint, finish: WirePoint) -> tuple:
+        """
+        Returns an order independent key of a segment for the set of irregular segments.
+        """
+        return tuple(sorted((start.give_place(), finish.give_place())))
+
+
+    def add_segment(self, start: WirePoint, finish: WirePoint) -> None:
+        """
+        Marks the segment between two wirepoints as occupied.
+        Segments between two neighbouring cells are stored in the edge array, other segments 
+        (e.g. the jumps the Manhattan router can make) are kept in a small fallback set.
+        """
+        edge = self.edge_index(*start.give_place(), *finish.give_place())
+        if edge >= 0:
+            if self._undo_log is not None:
+                self._undo_log.append((_UNDO_EDGE, edge, self._flat_edges[edge]))
+            self._flat_edges[edge] = True
+        else:
+            key = self._segment_key(start, finish)
+            if self._undo_log is not None:
+                self._undo_log.append((_UNDO_IRREGULAR, key, key in self._irregular_segments))
+            self._irregular_segments.add(key)
+
+
+    def remove_segment(self, start: WirePoint, finish: WirePoint) -> None:
+        """
+        Marks the segment between two wirepoints as free.
+        """
+        edge = self.edge_index(*start.give_place(), *finish.give_place())
+        if edge >= 0:
+            if self._undo_log is not None:
+                self._undo_log.append((_UNDO_EDGE, edge, self._flat_edges[edge]))
+            self._flat_edges[edge] = False
+        else:
+            key = self._segment_key(start, finish)
+            if self._undo_log is not None:
+                self._undo_log.append((_UNDO_IRREGULAR, key, key in self._irregular_segments))
+            self._irregular_segments.discard(key)
+
+
+    def check_segment_free(self, start: WirePoint, finish: WirePoint) -> bool:
+        """
+        Checks if the segment between two wirepoints is not used by a wire.
+        """
+        edge = self.edge_index(*start.give_place(), *finish.give_place())
+        if edge >= 0:
+            return not self._flat_edges[edge]
+        return self._segment_key(start, finish) not in self._irregular_segments
+
+
     def add_wire_segment(self, segment: Segment) -> None:
         """
-        Adds a segment to the set of segments.
+        Marks a segment as occupied.
         """
-        self._wires_segments.add(segment)
+        self.add_segment(segment.segment_start, segment.segment_finish)
 
     
     def add_entire_wire_segments(self, wire: Wire) -> None:
         """
         Adds the entire segment set of a wire to the grid. 
         """
-        segments = wire.give_segments()
-        self._wires_segments.update(segments)
+        for segment in wire.give_segments():
+            self.add_segment(segment.segment_start, segment.segment_finish)
 
 
     def remove_nodes_pointdict(self):
         """
-        Removes the nodes from the point dictionary, to make sure they don't count as intersections
+        Removes the nodes from the point array, to make sure they don't count as intersections
         """
+        point_dict = self._flat_point_dict
         for node in self._nodes:
-            self._point_dict[(node.give_x(), node.give_y(), 0)] = 0
+            index = self.index(node.give_x(), node.give_y(), 0)
+            if self._undo_log is not None:
+                self._undo_log.append((_UNDO_POINT, index, point_dict[index]))
+            point_dict[index] = 0
 
 
     def distance_nodes(self, node1: Node, node2: Node) -> int:
@@ -378,28 +741,60 @@ class Grid_3D:
     def check_wire_overlap(self, current_wire) -> bool:
         """
         Checks if the wire does not run over another wire in any direction.
-        Uses the precomputed set of segments for efficient checks.
+        Uses the edge array for efficient checks.
         """
-        if len(self._wires_segments) == 0:
+        wirepoints = current_wire.give_wirepoints()
+        return self.check_segment_free(wirepoints[-3], wirepoints[-2])
+    
+
+    def check_not_through_node(self, point: WirePoint, wire: Wire = None) -> bool:
+        """
+        Checks if a wirepoint doesn't have the same coordinates as a node.
+        If a wire is given, the start and end node of that wire are allowed.
+        """
+        x, y, z = point.give_place()
+        if not self.in_bounds(x, y, z) or not self._flat_node_cells[self.index(x, y, z)]:
             return True
-        
-        current_segment = Segment(current_wire.give_wirepoints()[-3], current_wire.give_wirepoints()[-2])
 
-        if current_segment in self._wires_segments:
+        if wire is None:
             return False
-            
-        return True
-    
 
-    def check_not_through_node(self, point: WirePoint) -> bool:
+        return (x, y) in ((wire.start_node.give_x(), wire.start_node.give_y()),
+                          (wire.end_node.give_x(), wire.end_node.give_y()))
+
+
+    def is_node_cell(self, x: int, y: int, z: int) -> bool:
         """
-        Checks if a wirepoint doesn't have the same coordinates as a node
+        Checks if a node is placed on the given coordinates, which have to lie within the grid.
         """
-        for node in self._nodes:
-            if (point.give_x(), point.give_y(), point.give_z()) == (node.give_x(), node.give_y(), node.give_z()):
-                return False
+        return self._flat_node_cells[self.index(x, y, z)]
+
+
+    def give_node_id(self, x: int, y: int) -> int:
+        """
+        Returns the id of the node on (x, y) of the base layer, or 0 if there is no node.
+        """
+        return int(self._node_ids[x * self.m + y])
 
-        return True    
+
+    def check_step(self, x: int, y: int, z: int, nx: int, ny: int, nz: int) -> bool:
+        """
+        Checks if a wire can step from the cell (x, y, z) to its neighbour (nx, ny, nz),
+        without creating any objects. Used for the neighbour probes of the routers.
+        """
+        if not self.in_bounds(nx, ny, nz):
+            return False
+
+        index = self.index(nx, ny, nz)
+        if self._flat_node_cells[index]:
+            return False
+
+        # Both cells are neighbours, so the edge is stored at the lowest of the two
+        if nx != x:
+            return not self._flat_edges[min(index, self.index(x, y, z))]
+        if ny != y:
+            return not self._flat_edges[self.size + min(index, self.index(x, y, z))]
+        return not self._flat_edges[2 * self.size + min(index, self.index(x, y, z))]
 
     def check_obstacle(self, point: WirePoint, segment: Segment) -> bool:
         """
@@ -421,23 +816,16 @@ class Grid_3D:
     def check_wire_overlap_point(self, segment: Segment) -> bool:  
         """
         Checks if the wire does not run over another wire in any direction.
-        Uses the precomputed set of segments for efficient checks.
+        Uses the edge array for efficient checks.
         """
-        if segment in self._wires_segments:
-            return False
-            
-        return True
+        return self.check_segment_free(segment.segment_start, segment.segment_finish)
 
 
     def check_in_grid(self, point: WirePoint) -> bool:
         """
         Checks if a given point exists in the grid
         """
-        wire_point = point
-        if (wire_point.give_x(), wire_point.give_y(), wire_point.give_z()) not in self._point_dict:
-            return False
-        
-        return True
+        return self.in_bounds(point.give_x(), point.give_y(), point.give_z())
 
 
     def check_valid_addition(self, current_wire: Wire) -> bool:
@@ -451,7 +839,7 @@ class Grid_3D:
 
         #Checks if the wirepoint is in the grid.
         wire_point = current_wire.give_wirepoints()[-2]
-        if (wire_point.give_x(), wire_point.give_y(), wire_point.give_z()) not in self._point_dict:
+        if not self.check_in_grid(wire_point):
             return False
 
         #Checks if the wirepoint does not run over another wire.
@@ -459,7 +847,7 @@ class Grid_3D:
             return False
                 
         #Checks if the wirepoint does not go through node.
-        if not current_wire.check_not_through_node():
+        if not self.check_not_through_node(wire_point, current_wire):
             return False
 
         return True
@@ -467,42 +855,100 @@ class Grid_3D:
 
     def total_intersections(self) -> int:
         """
-        Calculates the total intersections based on if the value of the point dict is larger than 1.
+        Returns the total intersections: every extra use of a cell that is not a node.
+        """
+        return self._intersections
+
+
+    def count_intersections(self) -> int:
+        """
+        Recounts the total intersections from the point array, total_intersections() 
+        should always give the same number.
         """
         self.remove_nodes_pointdict()
-        intersections = 0
-        for value in self._point_dict.values():
-            if value > 1:
-                intersections += (value - 1)
-        return intersections
+        counts = self._flat_point_dict
+        if self.backend == 'sparse':
+            counts = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+        return int((counts[counts > 1] - 1).sum())
     
 
-    def give_nodes(self) -> list[Node]:
+    def give_nodes(self) -> tuple[Node, ...]:
         """
-        Returns the list of nodes.
+        Returns the nodes of the chip.
         """
         return self._nodes
 
 
+    def give_search_kernel(self) -> SearchKernel:
+        """
+        Returns the search kernel of the grid, its buffers are reused by every search.
+        """
+        if self._search_kernel is None:
+            self._search_kernel = SearchKernel(self)
+        return self._search_kernel
+
+
+    def give_context(self) -> ChipContext:
+        """
+        Returns the chip context the grid was built for.
+        """
+        return self._context
+
+
     def cost(self) -> int:
         """
         Calculates the total cost:
         - 300 per intersection
         - 1 per line
         """
-        intersections = self.total_intersections()
-        return intersections * 300 + self._lines_count
+        return self._intersections * 300 + self._lines_count
+
+
+    def delta_cost(self, wire: Wire, remove: bool = False) -> int:
+        """
+        Returns how much the cost would change if the wire was added to the grid
+        (or removed from it), without changing the grid.
+        """
+        wirepoints = wire.give_wirepoints()
+
+        # Same points as add_wire_dict() and remove_wire() use
+        uses = Counter(self.index(*point.give_place()) for point in wirepoints[:-1])
+
+        intersections = 0
+        for index, times in uses.items():
+            if self._flat_node_cells[index]:
+                continue
+            count = int(self._flat_point_dict[index])
+            new_count = max(count - times, 0) if remove else count + times
+            intersections += max(new_count - 1, 0) - max(count - 1, 0)
+
+        lines = len(wirepoints) - 1
+        if remove:
+            lines = -min(lines, self._lines_count)
+
+        return intersections * 300 + lines
     
         
-def initialise_grid(nodes_list, nodes_csv_path, algorithm: str, netlist_csv_path):
+def _copy_into(target, source) -> None:
+    """
+    Copies the contents of an array of either backend into target, in place.
+    """
+    if isinstance(target, SparseArray):
+        target.copy_from(source)
+    else:
+        np.copyto(target, source)
+
+
+def initialise_grid(context: ChipContext, algorithm: str, layers: int = LAYERS, backend: str = 'dense'):
+    nodes_list = context.give_nodes()
     grid_width = max(node.give_x() for node in nodes_list) + 2 # +1 for the 0-indexing and +1 for the last node
     grid_length = max(node.give_y() for node in nodes_list) + 2 # +1 for the 0-indexing and +1 for the last node
-    grid = Grid_3D(grid_width, grid_length, nodes_csv_path=nodes_csv_path, netlist_csv_path=netlist_csv_path)
+    grid = Grid_3D(grid_width, grid_length, context, layers, backend)
     for node in nodes_list:
         grid.place_node(node)
 
     ## For a* based algorithms, apply costs to certain points
-    if algorithm.lower() == 'lee' or algorithm.lower() == 'l' or algorithm.lower() == 'a' or algorithm.lower() == 'a*':
+    if algorithm.lower() in ('lee', 'l', 'a', 'a*', 'b', 'bidirectional a*', 'p', 'pathfinder'):
         grid.apply_costs_around_nodes(biggest_1step_cost=0, biggest_2step_cost=0, biggest_3step_cost=0, big_1step_cost=0, big_2step_cost=0, big_3step_cost=0, medium_1step_cost=0, medium_2step_cost=0, small_1step_cost=0)
 
     return grid, grid_width, grid_length
\ No newline at end of file
@@ -0,0 +1,115 @@
+import json
+from collections import OrderedDict
+
+
+class QTable:
+    """
+    Q-values of the Q-learning ordering mode, stored per state: state -> {action: value}.
+    At most max_states states are kept, the least recently used state is dropped first.
+    With compact=True a state (an ordering of the netlist) is stored as a short hash instead
+    of the full ordering.
+    """
+    def __init__(self, max_states: int = 10000, compact: bool = False) -> None:
+        if max_states < 1:
+            raise ValueError("The Q-table must be able to hold at least one state.")
+        self.max_states = max_states
+        self.compact = compact
+        self._states = OrderedDict()
+
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+    def encode_state(self, ordering) -> tuple|str:
+        """
+        Returns the key of an ordering of the netlist.
+        """
+        state = tuple(tuple(connection) for connection in ordering)
+        if self.compact:
+            import hashlib
+            return hashlib.blake2b(repr(state).encode(), digest_size=12).hexdigest()
+        return state
+
+
+    def give_actions(self, state) -> dict:
+        """
+        Returns the action values of a state (empty if the state is unknown).
+        """
+        actions = self._states.get(state)
+        if actions is None:
+            return {}
+        self._states.move_to_end(state)
+        return actions
+
+
+    def best_action(self, state) -> tuple[int, int]|None:
+        """
+        Returns the action with the highest value in a state, or None if the state is unknown.
+        """
+        actions = self.give_actions(state)
+        if not actions:
+            return None
+        return max(actions, key=actions.get)
+
+
+    def update(self, state, action: tuple[int, int], reward: float, next_state, alpha: float, gamma: float) -> None:
+        """
+        Updates the value of an action according to the Q-learning formula.
+        """
+        next_actions = self.give_actions(next_state)
+        next_max = max(next_actions.values(), default=0)
+
+        actions = self._states.get(state)
+        if actions is None:
+            actions = self._states[state] = {}
+            if len(self._states) > self.max_states:
+                self._states.popitem(last=False)
+        else:
+            self._states.move_to_end(state)
+
+        old_value = actions.get(action, 0)
+        actions[action] = old_value + alpha * (reward + gamma * next_max - old_value)
+
+
+    def save(self, path: str) -> None:
+        """
+        Saves the table as json, the least recently used state first.
+        """
+        data = {
+            'max_states': self.max_states,
+            'compact': self.compact,
+            'states': [
+                [state, [[i, j, value] for (i, j), value in actions.items()]]
+                for state, actions in self._states.items()
+            ],
+        }
+        with open(path, 'w') as file:
+            json.dump(data, file)
+
+
+    @classmethod
+    def load(cls, path: str, max_states: int = None, compact: bool = None) -> 'QTable':
+        """
+        Loads a table saved with save(). A max_states or compact that is given replaces the saved 
+        setting: the least recently used states are dropped down to max_states, and the states of 
+        a full table are hashed if compact is set. A compact table can't be turned back into a 
+        full one, the orderings are gone.
+        """
+        with open(path) as file:
+            data = json.load(file)
+
+        if compact is not None and not compact and data['compact']:
+            raise ValueError(f"The Q-table in {path} is compact, it can't be loaded as a full table.")
+
+        table = cls(data['max_states'] if max_states is None else max_states,
+                    data['compact'] if compact is None else compact)
+        for state, actions in data['states']:
+            if not data['compact']:
+                state = table.encode_state(state)
+            table._states[state] = {(i, j): value for i, j, value in actions}
+
+        # The states were saved least recently used first
+        while len(table._states) > table.max_states:
+            table._states.popitem(last=False)
+        return table
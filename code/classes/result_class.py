@@ -0,0 +1,75 @@
+from code.classes.grid_class import Grid_3D
+from code.classes.wire_class import Wire
+
+
+class RoutingResult:
+    """
+    Outcome of a call to route(): the best grid that was found and how the run went.
+    The wires are those of the best grid and grid is the grid the run used, with those wires
+    laid on it. If no grid was successful, grid holds the wires of the last routed ordering.
+    """
+    def __init__(
+        self,
+        chip: str,
+        netlist: str,
+        algorithm: str,
+        sort: str,
+        iterations: int,
+        success: bool,
+        cost: int|None,
+        wires: list[Wire]|None,
+        tries: int,
+        successful: int,
+        time: float,
+        grid: Grid_3D,
+        stats: dict = None,
+    ) -> None:
+        self.chip = chip
+        self.netlist = netlist
+        self.algorithm = algorithm
+        self.sort = sort
+        self.iterations = iterations
+        self.success = success
+        self.cost = cost
+        self.wires = wires
+        self.tries = tries
+        self.successful = successful
+        self.time = time
+        self.grid = grid
+        self.stats = stats if stats is not None else {}
+
+
+    def __repr__(self):
+        return (f"RoutingResult(netlist={self.netlist}, algorithm={self.algorithm!r}, sort={self.sort!r}, "
+                f"success={self.success}, cost={self.cost}, tries={self.tries}, time={self.time:.2f})")
+
+
+    def give_cost(self) -> int|None:
+        """
+        Returns the cost of the best grid, None if no grid was successful.
+        """
+        return self.cost
+
+
+    def give_wires(self) -> list[Wire]|None:
+        """
+        Returns the wires of the best grid, None if no grid was successful.
+        """
+        return self.wires
+
+
+    def success_rate(self) -> float:
+        """
+        Returns the fraction of the attempted orderings that were routed successfully.
+        """
+        return self.successful / self.tries if self.tries else 0.0
+
+
+    def plot(self) -> None:
+        """
+        Plots the wires of the best grid in 3D.
+        """
+        if self.wires is None:
+            raise ValueError("No successful grid to plot.")
+        from code.visualisation.visualisation import plot_wires_3d
+        plot_wires_3d(self.wires, self.grid.n, self.grid.m, self.grid.height)
@@ -0,0 +1,608 @@
+from heapq import heapify, heappop, heappush
+
+import numpy as np
+
+# Width of a bucket in the bucket queue of search_buckets(). The cost field consists of integer
+# node costs, 0.1 steps towards the edges and the intersection penalty, so one bucket per 0.1.
+BUCKETS_PER_UNIT = 10
+
+# The six directions in the order the routers have always probed them: -x, +x, -y, +y, -z, +z
+DIRECTIONS = [(-1, 0, 0), (1, 0, 0), (0, -1, 0), (0, 1, 0), (0, 0, -1), (0, 0, 1)]
+
+
+class SearchKernel:
+    """
+    Shortest path search on the flat cell indices of a Grid_3D, shared by the A* and Lee routers.
+    The g-cost, parent direction and closed arrays are allocated once and reused for every search;
+    a generation counter marks which entries belong to the current search, so nothing is cleared.
+    On a grid with the sparse backend the buffers are dicts that only hold the cells of the current
+    search and are emptied when the next one starts, and the coordinates and open directions of a
+    cell are computed when they are read.
+    """
+    def __init__(self, grid) -> None:
+        self.grid = grid
+        size = grid.size
+        self._size = size
+        self._sparse = grid.backend == 'sparse'
+
+        # For every direction: its bit, the flat offset, the start of its axis block in the edge
+        # array and whether the neighbour (instead of the current cell) is the lowest cell of the edge
+        strides = (grid.m * grid.height, grid.height, 1)
+        self._directions = []
+        for d, step in enumerate(DIRECTIONS):
+            axis = d // 2
+            sign = step[axis]
+            self._directions.append((1 << d, sign * strides[axis], axis * size, sign < 0, d))
+
+        if self._sparse:
+            self._xs = _CellCoordinate(grid.m * grid.height, grid.n)
+            self._ys = _CellCoordinate(grid.height, grid.m)
+            self._zs = _CellCoordinate(1, grid.height)
+            self._open_dirs = _OpenDirections(grid, self._directions)
+        else:
+            # Coordinates of every flat index, used for the heuristic and the path
+            xs, ys, zs = np.unravel_index(np.arange(size), (grid.n, grid.m, grid.height))
+            self._xs, self._ys, self._zs = xs.tolist(), ys.tolist(), zs.tolist()
+
+            # Bitmask per cell of the directions that stay inside the grid and don't enter a gate
+            node_cells = grid.flat_node_cells()
+            open_dirs = np.zeros(size, dtype=np.uint8)
+            for d, (dx, dy, dz) in enumerate(DIRECTIONS):
+                inside = ((xs + dx >= 0) & (xs + dx < grid.n) & (ys + dy >= 0) & (ys + dy < grid.m) &
+                          (zs + dz >= 0) & (zs + dz < grid.height))
+                neighbours = np.where(inside, np.arange(size) + self._directions[d][1], 0)
+                open_dirs |= (inside & ~node_cells[neighbours]).astype(np.uint8) << d
+            self._open_dirs = open_dirs.tolist()
+
+        # Reusable buffers: g-cost, generation of the g-cost, closed and parent direction per cell
+        self._g, self._g_stamp, self._closed, self._parent = self._new_buffers()
+        self._goal = _SearchBuffer() if self._sparse else [0] * size
+        self._generation = 0
+
+        # Ring of buckets of search_buckets(), grown when a cost field needs more buckets
+        self._ring = []
+
+        # If set, Lee's searches use search_buckets() instead of the heap of search(), route(buckets=True)
+        # and main.py --buckets set it. The paths are the same, but measured on the chips of the case
+        # the bucket queue is not faster, so the heap stays the default.
+        self.use_buckets = False
+
+        # Buffers of the backward half of the bidirectional search, allocated on first use
+        self._backward_buffers = None
+
+        # Statistics of the last search and over all searches
+        self.last_expansions = 0
+        self.expansions = 0
+
+        # If set to a list, every search appends the cells it expands to it (see code/speculative.py)
+        self.expanded = None
+
+        # If set, every bidirectional search also runs the one-directional A* search to count
+        # how many expansions it saves. This doubles the search time, so it is meant for reports.
+        self.compare_unidirectional = False
+        self.unidirectional_expansions = 0
+        self.bidirectional_expansions = 0
+
+
+    def _new_buffers(self) -> tuple:
+        """
+        Returns new g-cost, generation, closed and parent buffers over all cells.
+        """
+        size = self._size
+        if self._sparse:
+            return (_SearchBuffer(), _SearchBuffer(), _SearchBuffer(), _SearchBuffer())
+        return ([0] * size, [0] * size, [0] * size, bytearray(size))
+
+
+    def _next_generation(self) -> int:
+        """
+        Starts a new search. The sparse buffers are emptied, so they only hold the cells of one search.
+        Returns:
+          the generation of the new search
+        """
+        self._generation += 1
+        if self._sparse:
+            buffers = (self._g, self._g_stamp, self._closed, self._goal, self._parent) + (self._backward_buffers or ())
+            for buffer in buffers:
+                buffer.clear()
+        return self._generation
+
+
+    def cost_values(self) -> list[float]:
+        """
+        Returns a snapshot of the cost field as a flat list, the field doesn't change during a search.
+        The sparse backend returns its SparseCostField itself, a read of a cell gives its value.
+        """
+        if self._sparse:
+            return self.grid.grid_values
+        return self.grid.flat_values().tolist()
+
+
+    def _prepare_goal(self, end: int) -> bool:
+        """
+        Marks the free neighbours of the end cell as goal for the current generation.
+        A neighbour is free if it lies in the grid and no wire runs through it.
+        Returns False if there is no free neighbour at all.
+        """
+        generation = self._generation
+        point_counts = self.grid.point_count_lookup()
+        xs, ys, zs = self._xs, self._ys, self._zs
+        grid = self.grid
+        found = False
+        for dx, dy, dz in DIRECTIONS:
+            x, y, z = xs[end] + dx, ys[end] + dy, zs[end] + dz
+            if not grid.in_bounds(x, y, z):
+                continue
+            neighbour = grid.index(x, y, z)
+            if point_counts[neighbour] == 0:
+                self._goal[neighbour] = generation
+                found = True
+        return found
+
+
+    def search(self, start: int, end: int, heuristic: bool = True, values: list[float] = None) -> list[int]|None:
+        """
+        Searches the cheapest path from the start cell to a free neighbour of the end cell.
+        Every step costs the cost-field value of the cell that is entered. With heuristic=True
+        the Manhattan distance to the end cell is added (A*), otherwise it is Dijkstra (Lee).
+        Heap entries are (priority, flat index) pairs, so equal priorities are resolved by the
+        lowest flat index, i.e. the lowest (x, y, z), just like the WirePoint ordering.
+
+        A different cost field (a flat list, like cost_values()) can be given with values.
+
+        Returns the flat indices of the path, without the start cell and ending at the
+        neighbour of the end cell, or None if the end cannot be reached.
+        """
+        generation = self._next_generation()
+        self.last_expansions = 0
+        if not self._prepare_goal(end):
+            return None
+
+        size = self._size
+        values = self.cost_values() if values is None else values
+        edges = self.grid.edge_lookup()
+        open_dirs = self._open_dirs
+        directions = self._directions
+        g, g_stamp, closed, goal, parent = self._g, self._g_stamp, self._closed, self._goal, self._parent
+        xs, ys, zs = self._xs, self._ys, self._zs
+        x_end, y_end, z_end = xs[end], ys[end], zs[end]
+
+        g[start] = 0
+        g_stamp[start] = generation
+        queue = [(0, start)]
+        expansions = 0
+        expanded = self.expanded
+
+        while queue:
+            current = heappop(queue)[1]
+            if closed[current] == generation:
+                continue
+            closed[current] = generation
+            expansions += 1
+            if expanded is not None:
+                expanded.append(current)
+
+            if goal[current] == generation:
+                self.last_expansions = expansions
+                self.expansions += expansions
+                return self._reconstruct(start, current)
+
+            g_current = g[current]
+            mask = open_dirs[current]
+            for bit, offset, edge_block, neighbour_is_lowest, d in directions:
+                if not mask & bit:
+                    continue
+                neighbour = current + offset
+                if edges[edge_block + (neighbour if neighbour_is_lowest else current)]:
+                    continue
+                if closed[neighbour] == generation:
+                    continue
+
+                g_cost = g_current + values[neighbour]
+                if g_stamp[neighbour] == generation and g_cost >= g[neighbour]:
+                    continue
+
+                g[neighbour] = g_cost
+                g_stamp[neighbour] = generation
+                parent[neighbour] = d
+                if heuristic:
+                    h_cost = abs(xs[neighbour] - x_end) + abs(ys[neighbour] - y_end) + abs(zs[neighbour] - z_end)
+                    heappush(queue, (g_cost + h_cost, neighbour))
+                else:
+                    heappush(queue, (g_cost, neighbour))
+
+        self.last_expansions = expansions
+        self.expansions += expansions
+        return None
+
+
+    def search_bidirectional(self, start: int, end: int) -> list[int]|None:
+        """
+        Bidirectional A*: searches forward from the start cell and backward from the free
+        neighbours of the end cell until both searches meet. The cost of a path is the same as
+        in search(), the sum of the cost-field values of the cells that are entered.
+
+        Both searches use the same (average) potential: half the difference between the Manhattan
+        distances to the end and to the start, scaled by the cheapest cell of the cost field. This 
+        potential is consistent, so the search can stop as soon as the lowest priorities of both 
+        sides add up to the cheapest meeting found. The returned path is a cheapest path.
+        """
+        if self.compare_unidirectional:
+            self.search(start, end, heuristic=True)
+            self.unidirectional_expansions += self.last_expansions
+
+        generation = self._next_generation()
+        self.last_expansions = 0
+        if not self._prepare_goal(end):
+            return None
+
+        # The start itself lies next to the end, no wirepoints are needed
+        if self._goal[start] == generation:
+            return []
+
+        if self._backward_buffers is None:
+            self._backward_buffers = self._new_buffers()
+
+        size = self._size
+        values = self.cost_values()
+        min_value = max(self.grid.value_bounds()[0], 0)
+
+        def potential(cell):
+            to_end = max(abs(xs[cell] - x_end) + abs(ys[cell] - y_end) + abs(zs[cell] - z_end) - 1, 0)
+            to_start = abs(xs[cell] - x_start) + abs(ys[cell] - y_start) + abs(zs[cell] - z_start)
+            return (to_end - to_start) * min_value / 2
+        edges = self.grid.edge_lookup()
+        open_dirs = self._open_dirs
+        directions = self._directions
+        xs, ys, zs = self._xs, self._ys, self._zs
+        goal = self._goal
+        g_f, stamp_f, closed_f, parent_f = self._g, self._g_stamp, self._closed, self._parent
+        g_b, stamp_b, closed_b, parent_b = self._backward_buffers
+        x_end, y_end, z_end = xs[end], ys[end], zs[end]
+        x_start, y_start, z_start = xs[start], ys[start], zs[start]
+
+        # Forward search
+        g_f[start] = 0
+        stamp_f[start] = generation
+        queue_f = [(potential(start), start)]
+
+        # Backward search, starting from every free neighbour of the end (stepping onto the end is free).
+        # Other nodes next to the end can't be part of a path, so they are no starting points
+        queue_b = []
+        for dx, dy, dz in DIRECTIONS:
+            x, y, z = x_end + dx, y_end + dy, z_end + dz
+            if not self.grid.in_bounds(x, y, z):
+                continue
+            cell = self.grid.index(x, y, z)
+            if goal[cell] == generation and not self.grid.is_node_cell(x, y, z):
+                g_b[cell] = 0
+                stamp_b[cell] = generation
+                heappush(queue_b, (-potential(cell), cell))
+
+        best_cost = float('inf')
+        meeting = None
+        expansions = 0
+        expanded = self.expanded
+
+        while queue_f and queue_b:
+            if queue_f[0][0] + queue_b[0][0] >= best_cost:
+                break
+
+            if queue_f[0][0] <= queue_b[0][0]:
+                # Expand forward, entering a neighbour costs its value
+                current = heappop(queue_f)[1]
+                if closed_f[current] == generation:
+                    continue
+                closed_f[current] = generation
+                expansions += 1
+                if expanded is not None:
+                    expanded.append(current)
+
+                g_current = g_f[current]
+                mask = open_dirs[current]
+                for bit, offset, edge_block, neighbour_is_lowest, d in directions:
+                    if not mask & bit:
+                        continue
+                    neighbour = current + offset
+                    if edges[edge_block + (neighbour if neighbour_is_lowest else current)]:
+                        continue
+                    if closed_f[neighbour] == generation:
+                        continue
+
+                    g_cost = g_current + values[neighbour]
+                    if stamp_f[neighbour] == generation and g_cost >= g_f[neighbour]:
+                        continue
+
+                    g_f[neighbour] = g_cost
+                    stamp_f[neighbour] = generation
+                    parent_f[neighbour] = d
+                    if stamp_b[neighbour] == generation and g_cost + g_b[neighbour] < best_cost:
+                        best_cost = g_cost + g_b[neighbour]
+                        meeting = neighbour
+
+                    heappush(queue_f, (g_cost + potential(neighbour), neighbour))
+            else:
+                # Expand backward, stepping back from a cell costs the value of that cell
+                current = heappop(queue_b)[1]
+                if closed_b[current] == generation:
+                    continue
+                closed_b[current] = generation
+                expansions += 1
+                if expanded is not None:
+                    expanded.append(current)
+
+                g_cost = g_b[current] + values[current]
+                mask = open_dirs[current]
+                for bit, offset, edge_block, neighbour_is_lowest, d in directions:
+                    if not mask & bit:
+                        continue
+                    neighbour = current + offset
+                    if edges[edge_block + (neighbour if neighbour_is_lowest else current)]:
+                        continue
+                    if closed_b[neighbour] == generation:
+                        continue
+                    if stamp_b[neighbour] == generation and g_cost >= g_b[neighbour]:
+                        continue
+
+                    g_b[neighbour] = g_cost
+                    stamp_b[neighbour] = generation
+                    parent_b[neighbour] = d
+                    if stamp_f[neighbour] == generation and g_f[neighbour] + g_cost < best_cost:
+                        best_cost = g_f[neighbour] + g_cost
+                        meeting = neighbour
+
+                    heappush(queue_b, (g_cost - potential(neighbour), neighbour))
+
+        self.last_expansions = expansions
+        self.expansions += expansions
+        self.bidirectional_expansions += expansions
+        if meeting is None:
+            return None
+
+        # Forward half up to the meeting cell, then follow the backward parents to the end
+        path = self._reconstruct(start, meeting)
+        current = meeting
+        while goal[current] != generation or g_b[current] != 0:
+            current -= directions[parent_b[current]][1]
+            path.append(current)
+        return path
+
+
+    def search_buckets(self, start: int, end: int) -> list[int]|None:
+        """
+        Same search and result as search(start, end, heuristic=False), but with a bucket queue
+        (Dial's algorithm) instead of one binary heap over all cells.
+
+        The g-costs are bounded by the largest value in the cost field, so only a ring of 
+        max value * BUCKETS_PER_UNIT + 3 buckets is needed. A cell is put in bucket 
+        round(g * BUCKETS_PER_UNIT); this is monotone in g, so all buckets before the current one
+        are empty. Cells for later buckets are simply appended, a bucket is turned into a heap 
+        once it is reached. That keeps the (g, flat index) order of search(), so the floating 
+        point rounding of the costs decides ties exactly as before.
+
+        If the cost field is all zero every cell has g = 0 and search() expands the cells in 
+        flat index order. That is not the order of a FIFO queue, so a plain heap of flat 
+        indices is used instead of a deque.
+        """
+        min_value, max_value = self.grid.value_bounds()
+        if min_value < 0:
+            return self.search(start, end, heuristic=False)
+
+        generation = self._next_generation()
+        self.last_expansions = 0
+        if not self._prepare_goal(end):
+            return None
+
+        if max_value == 0:
+            return self._search_zero_cost(start, generation)
+
+        values = self.cost_values()
+        edges = self.grid.edge_lookup()
+        open_dirs = self._open_dirs
+        directions = self._directions
+        g, g_stamp, closed, goal, parent = self._g, self._g_stamp, self._closed, self._goal, self._parent
+
+        ring_size = int(max_value * BUCKETS_PER_UNIT + 0.5) + 3
+        if len(self._ring) < ring_size:
+            self._ring.extend([] for _ in range(ring_size - len(self._ring)))
+        ring = self._ring
+        bucket = 0
+        queued = 1
+
+        g[start] = 0
+        g_stamp[start] = generation
+        ring[0].append((0, start))
+        expansions = 0
+        expanded = self.expanded
+
+        slot = ring[0]
+        while queued:
+            if not slot:
+                bucket += 1
+                slot = ring[bucket % ring_size]
+                while not slot:
+                    bucket += 1
+                    slot = ring[bucket % ring_size]
+                heapify(slot)
+            current = heappop(slot)[1]
+            queued -= 1
+
+            if closed[current] == generation:
+                continue
+            closed[current] = generation
+            expansions += 1
+            if expanded is not None:
+                expanded.append(current)
+
+            if goal[current] == generation:
+                self.last_expansions = expansions
+                self.expansions += expansions
+
+                # Empty the ring for the next search, all queued cells lie within one ring from here
+                if queued:
+                    for slot in ring[:ring_size]:
+                        slot.clear()
+                return self._reconstruct(start, current)
+
+            g_current = g[current]
+            mask = open_dirs[current]
+            for bit, offset, edge_block, neighbour_is_lowest, d in directions:
+                if not mask & bit:
+                    continue
+                neighbour = current + offset
+                if edges[edge_block + (neighbour if neighbour_is_lowest else current)]:
+                    continue
+                if closed[neighbour] == generation:
+                    continue
+
+                g_cost = g_current + values[neighbour]
+                if g_stamp[neighbour] == generation and g_cost >= g[neighbour]:
+                    continue
+
+                g[neighbour] = g_cost
+                g_stamp[neighbour] = generation
+                parent[neighbour] = d
+                target = int(g_cost * BUCKETS_PER_UNIT + 0.5)
+                if target == bucket:
+                    heappush(slot, (g_cost, neighbour))
+                else:
+                    ring[target % ring_size].append((g_cost, neighbour))
+                queued += 1
+
+        self.last_expansions = expansions
+        self.expansions += expansions
+        return None
+
+
+    def _search_zero_cost(self, start: int, generation: int) -> list[int]|None:
+        """
+        search_buckets() for a cost field without costs: every g is 0, so a cell is queued at most 
+        once and the cells are expanded in flat index order.
+        """
+        edges = self.grid.edge_lookup()
+        open_dirs = self._open_dirs
+        directions = self._directions
+        g_stamp, closed, goal, parent = self._g_stamp, self._closed, self._goal, self._parent
+
+        g_stamp[start] = generation
+        queue = [start]
+        expansions = 0
+        expanded = self.expanded
+
+        while queue:
+            current = heappop(queue)
+            closed[current] = generation
+            expansions += 1
+            if expanded is not None:
+                expanded.append(current)
+
+            if goal[current] == generation:
+                self.last_expansions = expansions
+                self.expansions += expansions
+                return self._reconstruct(start, current)
+
+            mask = open_dirs[current]
+            for bit, offset, edge_block, neighbour_is_lowest, d in directions:
+                if not mask & bit:
+                    continue
+                neighbour = current + offset
+                if g_stamp[neighbour] == generation:
+                    continue
+                if edges[edge_block + (neighbour if neighbour_is_lowest else current)]:
+                    continue
+
+                g_stamp[neighbour] = generation
+                parent[neighbour] = d
+                heappush(queue, neighbour)
+
+        self.last_expansions = expansions
+        self.expansions += expansions
+        return None
+
+
+    def _reconstruct(self, start: int, current: int) -> list[int]:
+        """
+        Walks back over the parent directions from current to start.
+        """
+        directions = self._directions
+        path = []
+        while current != start:
+            path.append(current)
+            current -= directions[self._parent[current]][1]
+        path.reverse()
+        return path
+
+
+    def coordinates(self, index: int) -> tuple[int, int, int]:
+        """
+        Returns the (x, y, z) coordinates of a flat index.
+        """
+        return (self._xs[index], self._ys[index], self._zs[index])
+
+
+
+class _SearchBuffer(dict):
+    """
+    Buffer of the search kernel on a sparse grid, a cell that is not stored reads as 0.
+    """
+    __slots__ = ()
+
+    def __missing__(self, index: int) -> int:
+        return 0
+
+
+class _CellCoordinate:
+    """
+    One coordinate of the flat indices of a grid, computed when it is read: index // stride % extent.
+    Stands in for the coordinate lists of the dense search kernel.
+    """
+    __slots__ = ('stride', 'extent')
+
+    def __init__(self, stride: int, extent: int) -> None:
+        self.stride = stride
+        self.extent = extent
+
+
+    def __getitem__(self, index: int) -> int:
+        return index // self.stride % self.extent
+
+
+class _OpenDirections:
+    """
+    Bitmask of the directions that stay inside the grid and don't enter a gate, computed per
+    cell when it is read. Stands in for the mask list of the dense search kernel.
+    """
+    __slots__ = ('n', 'm', 'height', 'offsets', 'node_cells')
+
+    def __init__(self, grid, directions: list[tuple]) -> None:
+        self.n, self.m, self.height = grid.n, grid.m, grid.height
+        self.offsets = [(bit, offset) for bit, offset, _, _, _ in directions]
+        self.node_cells = grid.node_cell_lookup()
+
+
+    def __getitem__(self, index: int) -> int:
+        xy, z = divmod(index, self.height)
+        x, y = divmod(xy, self.m)
+
+        # The bits follow DIRECTIONS: -x, +x, -y, +y, -z, +z
+        mask = 63
+        if x == 0:
+            mask &= ~1
+        if x == self.n - 1:
+            mask &= ~2
+        if y == 0:
+            mask &= ~4
+        if y == self.m - 1:
+            mask &= ~8
+        if z == 0:
+            mask &= ~16
+        if z == self.height - 1:
+            mask &= ~32
+
+        # The gates lie on the base layer, so only the cells on it and just above it can have one next to them
+        if z <= 1:
+            node_cells = self.node_cells
+            for bit, offset in self.offsets:
+                if mask & bit and node_cells[index + offset]:
+                    mask &= ~bit
+        return mask
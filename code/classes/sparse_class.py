@@ -0,0 +1,194 @@
+from collections import Counter
+
+import numpy as np
+
+
+class SparseArray(dict):
+    """
+    Flat array of a given size that only stores its nonzero entries, indexed like the flat numpy
+    arrays of Grid_3D. Reading an index that is not stored gives 0 (or False), writing 0 removes
+    the entry, so the memory grows with the amount of nonzero entries and not with the size.
+    """
+    __slots__ = ('size', 'dtype')
+
+    def __init__(self, size: int, dtype=np.int32) -> None:
+        super().__init__()
+        self.size = size
+        self.dtype = np.dtype(dtype)
+
+
+    def __missing__(self, index: int):
+        return False if self.dtype == np.bool_ else 0
+
+
+    def __setitem__(self, index: int, value) -> None:
+        if value:
+            super().__setitem__(index, value)
+        else:
+            self.pop(index, None)
+
+
+    def fill(self, value) -> None:
+        """
+        Sets every entry to value, which has to be 0 (or False).
+        """
+        if value:
+            raise ValueError("A sparse array can only be filled with 0.")
+        self.clear()
+
+
+    def copy(self) -> 'SparseArray':
+        """
+        Returns a copy of the array.
+        """
+        array = SparseArray(self.size, self.dtype)
+        dict.update(array, self)
+        return array
+
+
+    def copy_from(self, other: 'SparseArray') -> None:
+        """
+        Makes the array equal to other, in place.
+        """
+        self.clear()
+        dict.update(self, other)
+
+
+    def toarray(self) -> np.ndarray:
+        """
+        Returns the array as a dense flat numpy array.
+        """
+        array = np.zeros(self.size, dtype=self.dtype)
+        if self:
+            array[np.fromiter(self.keys(), dtype=np.int64, count=len(self))] = list(self.values())
+        return array
+
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The (approximate) memory of the stored entries in bytes, like numpy's nbytes.
+        """
+        return self.__sizeof__()
+
+
+class SparseCostField(SparseArray):
+    """
+    Cost field of the sparse backend, indexed like the flat cost field of Grid_3D. Only the cells
+    whose value differs from the base value are stored: the rings around busy nodes and the cells
+    with an intersection penalty. The base value of a cell is computed when it is read, it is the
+    edge and layer part of the base cost field (see Grid_3D.base_cost_field()), or 0 after fill(0).
+    """
+    __slots__ = ('n', 'm', 'height', 'base')
+
+    def __init__(self, n: int, m: int, height: int) -> None:
+        super().__init__(n * m * height, np.float64)
+        self.n = n
+        self.m = m
+        self.height = height
+        self.base = False
+
+
+    def base_value(self, index: int) -> float:
+        """
+        Returns the value of a cell that is not stored, computed like the dense base cost field.
+        """
+        if not self.base:
+            return 0.0
+        xy, z = divmod(index, self.height)
+        x, y = divmod(xy, self.m)
+        dist_to_edge = min(x, self.n - 1 - x, y, self.m - 1 - y)
+        return dist_to_edge * 0.1 + max(5 - z, 0)
+
+
+    def __missing__(self, index: int) -> float:
+        return self.base_value(index)
+
+
+    def __setitem__(self, index: int, value) -> None:
+        if value != self.base_value(index):
+            dict.__setitem__(self, index, value)
+        else:
+            self.pop(index, None)
+
+
+    def fill(self, value) -> None:
+        """
+        Sets every cell to value, which has to be 0.
+        """
+        super().fill(value)
+        self.base = False
+
+
+    def reset(self, cells: np.ndarray, values: np.ndarray) -> None:
+        """
+        Sets the field to the base cost field: the base values plus values on cells.
+        """
+        self.clear()
+        self.base = True
+        for index, value in zip(cells.tolist(), values.tolist()):
+            self[index] = value + self.base_value(index)
+
+
+    def copy(self) -> 'SparseCostField':
+        """
+        Returns a copy of the field.
+        """
+        field = SparseCostField(self.n, self.m, self.height)
+        field.base = self.base
+        dict.update(field, self)
+        return field
+
+
+    def copy_from(self, other: 'SparseCostField') -> None:
+        """
+        Makes the field equal to other, in place.
+        """
+        super().copy_from(other)
+        self.base = other.base
+
+
+    def toarray(self) -> np.ndarray:
+        """
+        Returns the field as a dense flat numpy array.
+        """
+        array = np.zeros(self.size, dtype=np.float64)
+        if self.base:
+            xs, ys = np.arange(self.n), np.arange(self.m)
+            dist_to_edge = np.minimum(np.minimum(xs, self.n - 1 - xs)[:, None], np.minimum(ys, self.m - 1 - ys)[None, :])
+            layer_bump = np.maximum(5 - np.arange(self.height), 0)
+            array += (dist_to_edge[:, :, None] * 0.1 + layer_bump[None, None, :]).reshape(-1)
+        if self:
+            array[np.fromiter(self.keys(), dtype=np.int64, count=len(self))] = list(self.values())
+        return array
+
+
+    def bounds(self) -> tuple[float, float]:
+        """
+        Returns the lowest and highest value of the field: the stored values and the base values
+        that are left on at least one cell that is not stored.
+        """
+        lowest, highest = min(self.values(), default=float('inf')), max(self.values(), default=float('-inf'))
+        if len(self) == self.size:
+            return lowest, highest
+        if not self.base:
+            return min(lowest, 0.0), max(highest, 0.0)
+
+        # The amount of cells per base value, and how many of them are stored
+        cells = Counter()
+        for distance in range(min((self.n - 1) // 2, (self.m - 1) // 2) + 1):
+            layer_cells = self._cells_at_distance(distance)
+            for z in range(self.height):
+                cells[distance * 0.1 + max(5 - z, 0)] += layer_cells
+        stored = Counter(self.base_value(index) for index in self)
+        left = [value for value, count in cells.items() if stored[value] < count]
+        return min(lowest, min(left)), max(highest, max(left))
+
+
+    def _cells_at_distance(self, distance: int) -> int:
+        """
+        Returns the amount of cells of a layer at the given distance from the edge.
+        """
+        def at_least(k: int) -> int:
+            return max(self.n - 2 * k, 0) * max(self.m - 2 * k, 0)
+        return at_least(distance) - at_least(distance + 1)
@@ -1,5 +1,5 @@
 from code.classes.nodes_class import Node
-from code.imports import import_nodes, import_netlist
+from code.classes.chip_class import ChipContext
 
 class WirePoint:
     """
@@ -62,12 +62,11 @@ class Wire:
     A class to combine wirepoints in order to form a wire.
     """
 
-    def __init__(self, start_node: Node, end_node: Node, nodes_csv_path: str, netlist_csv_path: str) -> None:
+    def __init__(self, start_node: Node, end_node: Node, context: ChipContext) -> None:
         self.start_node = start_node
         self.end_node = end_node
         self._wirepoints = [WirePoint(self.start_node.give_x(), self.start_node.give_y(), 0), WirePoint(self.end_node.give_x(), self.end_node.give_y(), 0)]
-        self._nodes = import_nodes(nodes_csv_path)
-        self._netlist = import_netlist(netlist_csv_path)
+        self._context = context # Shared by all wires of the chip, not copied
         self._segments = set()
 
 
@@ -75,27 +74,14 @@ class Wire:
         """
         Returns the netlist of the wire.
         """
-        return self._netlist
+        return self._context.give_netlist()
     
     
     def count_nodes_connections(self) -> dict[int, int]:
         """
         Counts the amount of times a node appears in the netlist.
         """
-        _node_count_dict = {}
-
-        for connection in self._netlist:
-            if connection[0] in _node_count_dict:
-                _node_count_dict[connection[0]] += 1
-            else:
-                _node_count_dict[connection[0]] = 1
-
-            if connection[1] in _node_count_dict:
-                _node_count_dict[connection[1]] += 1
-            else:
-                _node_count_dict[connection[1]] = 1
-        
-        return _node_count_dict
+        return dict(self._context.give_node_counts())
     
     def give_segments(self) -> set:
         """
@@ -110,7 +96,7 @@ class Wire:
         """
         from code.classes.segment_class import Segment
         
-        self._wirepoints.remove(self._wirepoints[-1])
+        self._wirepoints.pop() # The end node, always the last wirepoint
         self._segments.add(Segment(self._wirepoints[-1], wire_point))
         self._wirepoints.append(wire_point)
         self._wirepoints.append(WirePoint(self.end_node.give_x(), self.end_node.give_y(), 0))
@@ -171,13 +157,12 @@ class Wire:
         if self._wirepoints[-2].give_z() != 0:
             return True
         
-        for node in self._nodes:
-            if (((self._wirepoints[-2].give_x(),self._wirepoints[-2].give_y()) == (node.give_x(),node.give_y())) and 
-                ((self._wirepoints[-2].give_x(),self._wirepoints[-2].give_y()) != (self.end_node.give_x(), self.end_node.give_y())) and
-                ((self._wirepoints[-2].give_x(),self._wirepoints[-2].give_y()) != (self.start_node.give_x(), self.start_node.give_y()))):
-                return False
-        
-        return True
+        place = (self._wirepoints[-2].give_x(), self._wirepoints[-2].give_y())
+        if self._context.give_node_id(*place) is None:
+            return True
+
+        return (place == (self.end_node.give_x(), self.end_node.give_y()) or
+                place == (self.start_node.give_x(), self.start_node.give_y()))
     
 
     def pop_wire_point(self) -> None:
@@ -2,8 +2,90 @@ import time
 import random
 
 from code.functions import state_to_tuple, choose_action, update_q_table
-from code.algorithms import dfs_algorithm, manhattan_wire
-from code.visualisation.visualisation import plot_wires_3d
+from code.algorithms import KERNEL_ROUTERS, dfs_algorithm, manhattan_wire
+from code.pathfinder import pathfinder_routing
+from code.backtracking import backtracking_dfs
+from code.classes.grid_class import LAYERS
+
+
+def route_ordering(
+    functie, ordering, nodes_list, grid, cost_bound=None, prune_stats=None, dfs_nodes=1000, dfs_depth=None,
+    routing_stats=None, speculative=None
+):
+    """
+    Routes every connection of one ordering of the netlist on a cleared grid.
+
+    With a cost_bound the ordering is abandoned (not successful) as soon as the cost of the
+    wires so far plus a lower bound for the remaining wires (their Manhattan distances) reaches
+    the bound, because the cost only grows when wires are added. The skipped routings are counted
+    in prune_stats. An ordering that routed its last net is never pruned, it is a finished grid.
+    Only the routers of the search kernel are pruned: a Manhattan wire that stops at the top layer
+    can be shorter than the distance between its nodes, so the bound doesn't hold for it.
+    DFS backtracks while routing (see backtracking_dfs()) and is never pruned,
+    dfs_nodes and dfs_depth are the budgets of its search.
+    If a routing_stats dict is given, the net routings that were done are added to its 'routings',
+    a failed or pruned ordering stops before its remaining nets.
+    With a SpeculativeRouter (see code/speculative.py) its workers search the next nets ahead,
+    the wires are the same.
+    Returns:
+      (success, wires)
+    """
+    if len(ordering) == 0:
+        raise ValueError("No netlist given.")
+
+    # DFS runs without costs, if a wire can't be laid the search jumps back to a wire in the way
+    if functie == dfs_algorithm:
+        success, laid_wires, stats = backtracking_dfs(ordering, nodes_list, grid, dfs_nodes, dfs_depth)
+        if routing_stats is not None:
+            routing_stats['routings'] += stats['routings']
+        return success, laid_wires
+
+    grid.clear_wires()
+
+    grid.apply_costs_around_nodes()
+    if speculative is not None:
+        speculative.begin_ordering(ordering, grid)
+
+    if functie not in KERNEL_ROUTERS:
+        cost_bound = None
+    remaining_length = remaining_lengths(ordering, nodes_list) if cost_bound is not None else None
+    last = len(ordering) - 1
+
+    for position, (node1_id, node2_id) in enumerate(ordering):
+        if speculative is not None:
+            wire = speculative.route_net(position)
+        else:
+            wire = functie(nodes_list[node1_id - 1], nodes_list[node2_id - 1], grid)
+        if routing_stats is not None:
+            routing_stats['routings'] += 1
+
+        # The Manhattan router always returns a wire, it counts its failures on the grid
+        if wire is None and functie != manhattan_wire:
+            return False, grid.return_wire_list()
+        grid.add_wire_list(wire)
+
+        if cost_bound is not None and position < last and grid.cost() + remaining_length[position] >= cost_bound:
+            prune_stats['pruned_orderings'] += 1
+            prune_stats['skipped_routings'] += len(ordering) - position - 1
+            return False, grid.return_wire_list()
+
+    if functie == manhattan_wire:
+        return grid.failed_wires == 0, grid.return_wire_list()
+    return True, grid.return_wire_list()
+
+
+def remaining_lengths(ordering, nodes_list):
+    """
+    Returns for every position in the ordering the sum of the Manhattan distances of the
+    connections after it, the least amount of lines the rest of the ordering can add.
+    """
+    remaining = [0] * len(ordering)
+    total = 0
+    for position in range(len(ordering) - 1, -1, -1):
+        remaining[position] = total
+        node1, node2 = nodes_list[ordering[position][0] - 1], nodes_list[ordering[position][1] - 1]
+        total += abs(node1.give_x() - node2.give_x()) + abs(node1.give_y() - node2.give_y())
+    return remaining
 
 
 def run_multiple_runs(
@@ -15,13 +97,24 @@ def run_multiple_runs(
     successful_grid,
     tries,
     all_wire_runs,
-    nodes_csv_path,
-    netlist_csv_path,
     functie, 
-    sort
+    sort,
+    prune_stats=None,
+    checkpoint=None,
+    dfs_nodes=1000,
+    dfs_depth=None,
+    routing_stats=None,
+    speculative=None
 ):
     """
     Executes multiple runs of the chosen algorithm.
+    If a prune_stats dict is given, orderings of the netlist that can no longer beat the best
+    grid so far are abandoned early, see route_ordering(). Only Lee, A* and bidirectional A* are
+    pruned, Q-learning runs are not. A pruned ordering counts as a try that didn't succeed.
+    If a Checkpoint is given, the best grid so far is kept on disk with it.
+    dfs_nodes and dfs_depth are the budgets of the backtracking search of DFS, see backtracking_dfs().
+    If a routing_stats dict is given, the net routings that were done are counted in it.
+    A SpeculativeRouter (see code/speculative.py) routes the orderings of Lee, A* and bidirectional A*.
     Returns:
       (wires_cost_min, successful_grid, tries, cost_min)
     """
@@ -40,26 +133,10 @@ def run_multiple_runs(
                 netlist_new[i], netlist_new[j] = netlist_new[j], netlist_new[i]
                 next_state = state_to_tuple(netlist)
 
-                grid.clear_wires()
-                success = True
-                laid_wires = []
-
-                for node1_id, node2_id in netlist_new:
-                    node1 = nodes_list[node1_id - 1]
-                    node2 = nodes_list[node2_id - 1]
-
-                    wire_laid = True
-                    while wire_laid:
-                        # Find a path
-                        wire = functie(node1, node2, grid, nodes_csv_path, netlist_csv_path)
-                        if wire is not None:
-                            laid_wires.append(wire)
-                            wire_laid = False
-
-                        else:
-                            last_wire = laid_wires.pop()
-                            grid.remove_wire(last_wire)
-                            wire_laid = False
+                success, laid_wires = route_ordering(
+                    functie, netlist_new, nodes_list, grid, dfs_nodes=dfs_nodes, dfs_depth=dfs_depth,
+                    routing_stats=routing_stats
+                )
 
                 if success:
                     reward = 1 / grid.cost()
@@ -78,6 +155,8 @@ def run_multiple_runs(
                 iteration_time = iteration_end_time - iteration_start_time
                 print(f"Iteration {h+1} took {iteration_time:.2f} seconds")
                 print(f"Amount of solutions attempted: {tries} | Best cost so far: {cost_min}")
+                if checkpoint is not None:
+                    checkpoint.update(wires_cost_min, cost_min)
 
         # -------------------------------------------------------
         # functie == dfs_algorithm and sort != 'q'
@@ -86,37 +165,13 @@ def run_multiple_runs(
             for h, netlists in enumerate(sort):
                 iteration_start_time = time.time()
 
-                grid.clear_wires()
-                success = True
-
-                if len(netlists) == 0:
-                    raise ValueError("No netlist given.")
-
-                laid_wires = []
-
-                for i in range(len(netlists)):
-                    node1_id, node2_id = netlists[i]
-                    node1 = nodes_list[node1_id - 1]
-                    node2 = nodes_list[node2_id - 1]
-
-                    wire_laid = True
-                    while wire_laid:
-                        # Find a path
-                        wire = functie(node1, node2, grid, nodes_csv_path, netlist_csv_path)
-                        if wire is not None:
-                            laid_wires.append(wire)
-                            wire_laid = False
-                            
-                        else:
-                            last_wire = laid_wires.pop()
-                            grid.remove_wire(last_wire)
-                            wire_laid = False
-
-                    if not success:
-                        break
+                success, laid_wires = route_ordering(
+                    functie, netlists, nodes_list, grid, dfs_nodes=dfs_nodes, dfs_depth=dfs_depth,
+                    routing_stats=routing_stats
+                )
 
                 if success:
-                    all_wire_runs.append(grid._wires)
+                    all_wire_runs.append(laid_wires)
                     successful_grid += 1
                     if cost_min > grid.cost():
                         cost_min = grid.cost()
@@ -127,8 +182,8 @@ def run_multiple_runs(
                 iteration_time = iteration_end_time - iteration_start_time
                 print(f"Iteration {h+1} took {iteration_time:.2f} seconds")
                 print(f"Amount of solutions attempted: {tries} | Best cost so far: {cost_min}")
-
-                grid.remove_nodes_pointdict()
+                if checkpoint is not None:
+                    checkpoint.update(wires_cost_min, cost_min)
 
         # -------------------------------------------------------
         # sort == 'q' and functie != dfs_algorithm
@@ -144,20 +199,9 @@ def run_multiple_runs(
                 netlist_new[i], netlist_new[j] = netlist_new[j], netlist_new[i]
                 next_state = state_to_tuple(netlist_new)
 
-                laid_wires = []
-                grid.clear_wires()
-                grid.apply_costs_around_nodes()
-
-                success = True
-
-                for node1_id, node2_id in netlist_new:
-                    node1 = nodes_list[node1_id - 1]
-                    node2 = nodes_list[node2_id - 1]
-                    wire = functie(node1, node2, grid, nodes_csv_path, netlist_csv_path)
-                    laid_wires.append(wire)
-                    if wire is None:
-                        success = False
-                        break
+                success, laid_wires = route_ordering(
+                    functie, netlist_new, nodes_list, grid, routing_stats=routing_stats, speculative=speculative
+                )
 
                 if success:
                     reward = 1 / grid.cost()
@@ -176,6 +220,8 @@ def run_multiple_runs(
                 iteration_time = iteration_end_time - iteration_start_time
                 print(f"Iteration {h+1} took {iteration_time:.2f} seconds")
                 print(f"Amount of solutions attempted: {tries} | Best cost so far: {cost_min}")
+                if checkpoint is not None:
+                    checkpoint.update(wires_cost_min, cost_min)
 
         # -------------------------------------------------------
         # sort != 'q' and functie == manhattan_wire
@@ -185,38 +231,22 @@ def run_multiple_runs(
             for h, netlists in enumerate(sort):
                 iteration_start_time = time.time()
 
-                grid.clear_wires()
-                grid.apply_costs_around_nodes()
-
-                success = False
-
-                if len(netlists) == 0:
-                    raise ValueError("No netlist given.")
-
-                for i in range(len(netlists)):
-                    node1_id, node2_id = netlists[i]
-                    node1 = nodes_list[node1_id - 1]
-                    node2 = nodes_list[node2_id - 1]
-
-                    wire = functie(node1, node2, grid, nodes_csv_path, netlist_csv_path)
-                    grid.add_wire_list(wire)
-                
-                if grid.failed_wires == 0:
-                    success = True
+                success, wires = route_ordering(functie, netlists, nodes_list, grid, routing_stats=routing_stats)
 
                 if success:
-                    all_wire_runs.append(grid._wires)
+                    all_wire_runs.append(wires)
                     successful_grid += 1
                     if cost_min > grid.cost():
                         cost_min = grid.cost()
-                        wires_cost_min = grid._wires
-                        working_list = netlists
+                        wires_cost_min = wires
 
                 tries += 1
                 iteration_end_time = time.time()
                 iteration_time = iteration_end_time - iteration_start_time
                 print(f"Iteration {h+1} took {iteration_time:.2f} seconds")
                 print(f"Amount of solutions attempted: {tries} | Best cost so far: {cost_min}")
+                if checkpoint is not None:
+                    checkpoint.update(wires_cost_min, cost_min)
 
         # -------------------------------------------------------
         # sort == 'q' and functie == manhattan_wire
@@ -231,21 +261,7 @@ def run_multiple_runs(
                 netlist_new[i], netlist_new[j] = netlist_new[j], netlist_new[i]
                 next_state = state_to_tuple(netlist_new)
 
-                laid_wires = []
-                grid.clear_wires()
-                grid.apply_costs_around_nodes()
-
-                success = False
-
-                for node1_id, node2_id in netlist_new:
-                    node1 = nodes_list[node1_id - 1]
-                    node2 = nodes_list[node2_id - 1]
-
-                    wire = functie(node1, node2, grid, nodes_csv_path, netlist_csv_path)
-                    laid_wires.append(wire)
-
-                if grid.failed_wires == 0:
-                    success = True
+                success, laid_wires = route_ordering(functie, netlist_new, nodes_list, grid, routing_stats=routing_stats)
 
                 if success:
                     reward = 1 / grid.cost()
@@ -264,6 +280,8 @@ def run_multiple_runs(
                 iteration_time = iteration_end_time - iteration_start_time
                 print(f"Iteration {h+1} took {iteration_time:.2f} seconds")
                 print(f"Amount of solutions attempted: {tries} | Best cost so far: {cost_min}")
+                if checkpoint is not None:
+                    checkpoint.update(wires_cost_min, cost_min)
 
 
         # -------------------------------------------------------
@@ -273,41 +291,26 @@ def run_multiple_runs(
             for h, netlists in enumerate(sort):
                 iteration_start_time = time.time()
 
-                grid.clear_wires()
-                grid.apply_costs_around_nodes()
-
-                success = True
-
-                if len(netlists) == 0:
-                    raise ValueError("No netlist given.")
-
-                for i in range(len(netlists)):
-                    node1_id, node2_id = netlists[i]
-                    node1 = nodes_list[node1_id - 1]
-                    node2 = nodes_list[node2_id - 1]
-
-                    wire = functie(node1, node2, grid, nodes_csv_path, netlist_csv_path)
-                    grid.add_wire_list(wire)
-
-                    if wire is None:
-                        success = False
-                        break
+                success, wires = route_ordering(
+                    functie, netlists, nodes_list, grid,
+                    cost_bound=cost_min if prune_stats is not None else None, prune_stats=prune_stats,
+                    routing_stats=routing_stats, speculative=speculative
+                )
 
                 if success:
-                    all_wire_runs.append(grid._wires)
+                    all_wire_runs.append(wires)
                     successful_grid += 1
                     if cost_min > grid.cost():
                         cost_min = grid.cost()
-                        wires_cost_min = grid._wires
-                        working_list = netlists
+                        wires_cost_min = wires
 
                 tries += 1
                 iteration_end_time = time.time()
                 iteration_time = iteration_end_time - iteration_start_time
                 print(f"Iteration {h+1} took {iteration_time:.2f} seconds")
                 print(f"Amount of solutions attempted: {tries} | Best cost so far: {cost_min}")
-
-                grid.remove_nodes_pointdict()
+                if checkpoint is not None:
+                    checkpoint.update(wires_cost_min, cost_min)
 
     return wires_cost_min, successful_grid, tries, cost_min
 
@@ -318,53 +321,37 @@ def run_single_run(
     grid,
     grid_width,
     grid_length,
-    nodes_csv_path,
-    netlist_csv_path
+    plot=True,
+    dfs_nodes=1000,
+    dfs_depth=None,
+    speculative=None,
     ):
     """
-    Executes a single run of the chosen algorithm.
+    Executes a single run of the chosen algorithm, the wires are plotted if plot is True.
+    dfs_nodes and dfs_depth are the budgets of the backtracking search of DFS.
+    A SpeculativeRouter (see code/speculative.py) routes the nets of Lee, A* and bidirectional A*.
+    Returns:
+      (success, wires)
     """
     # -------------------------------------------------------
     # DFS-algorithm
     # -------------------------------------------------------
     if functie.__name__ == 'dfs_algorithm':
 
-        wires = []
-        laid_wires = []
-        success_for_this_run = True
-
         if len(netlist) > 0:
-            for i, (node1_id, node2_id) in enumerate(netlist):
-                node1 = nodes_list[node1_id - 1]
-                node2 = nodes_list[node2_id - 1]
-                
-                wire_laid = True
-                while wire_laid:
-                    wire = functie(node1, node2, grid, nodes_csv_path, netlist_csv_path)
-                    if wire is not None:
-                        wires.append(wire)
-                        laid_wires.append(wire)
-                        wire_laid = False
-
-                    if laid_wires:
-                        last_wire = laid_wires.pop()
-                        grid.remove_wire(last_wire)
-                        wire_laid = False
-
-                    else:
-                        success_for_this_run = False
-                        print("Backtracking failed, no more wires to remove.")
-                        break
-
-                if not success_for_this_run:
-                    break
+            success_for_this_run, wires, stats = backtracking_dfs(netlist, nodes_list, grid, dfs_nodes, dfs_depth)
+            print(f"Net routings: {stats['routings']} | Backjumps: {stats['backjumps']} | "
+                  f"Longest jump: {stats['max_jump']} wires")
 
             if success_for_this_run:
                 print(f"The total cost for this grid is: {grid.cost()}")
-                plot_wires_3d(wires, grid_width, grid_length)
+                if plot:
+                    plot_wires_3d(wires, grid_width, grid_length, grid.height)
                 grid.remove_nodes_pointdict()
             else:
+                print(f"Backtracking failed, {len(wires)} of {len(netlist)} wires laid.")
                 print("Routing failed for the current netlist.")
+            return success_for_this_run, wires
         else:
             raise ValueError("No netlist given.")
 
@@ -380,17 +367,19 @@ def run_single_run(
                 node1 = nodes_list[node1_id - 1]
                 node2 = nodes_list[node2_id - 1]
 
-                wire = functie(node1, node2, grid, nodes_csv_path, netlist_csv_path)
+                wire = functie(node1, node2, grid)
                 grid.add_wire_list(wire)
             
             if grid.failed_wires == 0:
                 cost_grid = grid.cost()
                 print(f"The total cost for this grid is: {cost_grid}")
-                plot_wires_3d(wires, grid_width, grid_length)
+                if plot:
+                    plot_wires_3d(wires, grid_width, grid_length, grid.height)
 
             else: 
                 print("Routing failed for the current netlist.")
             grid.remove_nodes_pointdict()
+            return grid.failed_wires == 0, list(wires)
         else:
             raise ValueError("No netlist given.")
 
@@ -401,17 +390,62 @@ def run_single_run(
         
         if len(netlist) >= 1:
             wires = grid.return_wire_list()
+            if speculative is not None:
+                speculative.begin_ordering(netlist, grid, cleared=False)
             for i in range(len(netlist)):
                 node1_id, node2_id = netlist[i]
                 node1 = nodes_list[node1_id - 1]
                 node2 = nodes_list[node2_id - 1]
 
-                wire = functie(node1, node2, grid, nodes_csv_path, netlist_csv_path)
+                if speculative is not None:
+                    wire = speculative.route_net(i)
+                else:
+                    wire = functie(node1, node2, grid)
                 grid.add_wire_list(wire)
 
             print(f"The total cost for this grid is: {grid.cost()}")
-            plot_wires_3d(wires, grid_width, grid_length)
+            if plot:
+                plot_wires_3d(wires, grid_width, grid_length, grid.height)
             grid.remove_nodes_pointdict()
+            return None not in wires, list(wires)
         else:
             raise ValueError("No netlist given.")
-    
\ No newline at end of file
+    
+
+
+def run_pathfinder(
+    netlist,
+    nodes_list,
+    grid,
+    grid_width,
+    grid_length,
+    max_rounds=30,
+    plot=True
+    ):
+    """
+    Executes the negotiated congestion router, it routes every net once and then
+    reroutes the nets in crowded cells for at most max_rounds rounds.
+    Returns:
+      (success, wires, stats)
+    """
+    success, wires, stats = pathfinder_routing(netlist, nodes_list, grid, max_rounds=max_rounds)
+
+    for rounds, cost in enumerate(stats['cost_per_round']):
+        print(f"Round {rounds}: cost {cost}")
+    print(f"Rip-up and reroute rounds: {stats['rounds']} | Net routings: {stats['routings']}")
+
+    if success:
+        print(f"The total cost for this grid is: {grid.cost()}")
+        if plot:
+            plot_wires_3d(wires, grid_width, grid_length, grid.height)
+    else:
+        print("Routing failed for the current netlist.")
+    return success, wires, stats
+
+
+def plot_wires_3d(wires, grid_width, grid_length, layers=LAYERS):
+    """
+    Plots the wires, matplotlib is only imported when something is plotted.
+    """
+    from code.visualisation import visualisation
+    visualisation.plot_wires_3d(wires, grid_width, grid_length, layers)
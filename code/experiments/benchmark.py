@@ -0,0 +1,257 @@
+"""
+Benchmark of the algorithm x sorting method x netlist matrix, run in one process.
+
+Run from the main directory, for example:
+    python -m code.experiments.benchmark --netlists 1,2,3 --algorithms m,l,a --sorts r,b,d,q \
+        --iterations 100 --repeat 3 --json code/experiments/results.json --csv code/experiments/results.csv
+
+With --baseline the results are compared with an earlier json file, configurations that got slower,
+more expensive or less successful than the threshold allows are reported as regressions (exit code 1).
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+from code.classes.grid_class import initialise_grid
+from code.classes.qtable_class import QTable
+from code.engine import run_multiple_runs
+from code.functions import choose_algorithm, choose_sorting_method, set_q_table
+from code.imports import load_chip_context
+from code.pathfinder import pathfinder_routing
+
+ALGORITHMS = ('m', 'd', 'l', 'a', 'b', 'p')
+SORTS = ('r', 'b', 'd', 'q')
+
+CSV_FIELDS = [
+    'netlist', 'algorithm', 'sort', 'iterations', 'repeat', 'wall_time', 'wall_time_min',
+    'per_net_time', 'expansions', 'success_rate', 'best_cost', 'mean_best_cost',
+]
+
+
+def chip_paths(netlist: int, base_path: str = 'gates_netlists') -> tuple[str, str]:
+    """
+    Returns the paths of the chip and netlist csv files of a netlist (1-9).
+    """
+    chip = (netlist - 1) // 3
+    return (
+        os.path.join(base_path, f'chip_{chip}', f'print_{chip}.csv'),
+        os.path.join(base_path, f'chip_{chip}', f'netlist_{netlist}.csv'),
+    )
+
+
+def run_once(algorithm: str, sort: str, netlist, nodes_list, grid, iterations: int) -> dict:
+    """
+    Runs one configuration once, the output of the engine is discarded.
+    Returns:
+      a dict with the wall time, net routings, expansions, success rate and best cost of the run
+    """
+    functie = choose_algorithm(algorithm)
+    kernel = grid.give_search_kernel()
+    expansions = kernel.expansions
+
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if functie == pathfinder_routing:
+            success, _, stats = pathfinder_routing(netlist, nodes_list, grid, max_rounds=iterations)
+            successful_grid, tries, cost_min = int(success), 1, grid.cost() if success else float('inf')
+            routings = stats['routings']
+        else:
+            sorted_netlist = choose_sorting_method(sort, netlist, nodes_list, iterations)
+            if sorted_netlist == 'q':
+                set_q_table(QTable())
+            # Failed orderings stop at the first net that can't be laid, so the routings are counted
+            routing_stats = {'routings': 0}
+            _, successful_grid, tries, cost_min = run_multiple_runs(
+                iterations, netlist, nodes_list, grid, float('inf'), 0, 0, [], functie, sorted_netlist,
+                routing_stats=routing_stats
+            )
+            routings = routing_stats['routings']
+    wall_time = time.perf_counter() - start_time
+
+    return {
+        'wall_time': wall_time,
+        'per_net_time': wall_time / max(routings, 1),
+        'expansions': kernel.expansions - expansions,
+        'success_rate': successful_grid / tries if tries else 0.0,
+        'best_cost': cost_min if successful_grid else None,
+    }
+
+
+def benchmark(netlists, algorithms, sorts, iterations: int = 100, repeat: int = 3, warmup: int = 1, seed: int = 0,
+              buckets: bool = False) -> list[dict]:
+    """
+    Runs every configuration warmup times without measuring and then repeat times.
+    Every run is seeded with its own seed, so the orderings of a configuration are the
+    same between benchmarks with the same seed. With buckets Lee searches with the bucket queue.
+    Returns:
+      a list with a result dict per configuration
+    """
+    if iterations < 2:
+        raise ValueError("The benchmark needs at least 2 iterations, like a multiple run.")
+
+    results = []
+    for netlist_number in netlists:
+        context = load_chip_context(*chip_paths(netlist_number))
+        nodes_list = context.give_nodes()
+        netlist = list(context.give_netlist())
+
+        for algorithm in algorithms:
+            grid, _, _ = initialise_grid(context, algorithm)
+            grid.give_search_kernel().use_buckets = buckets
+
+            # The orderings don't matter to PathFinder
+            for sort in (sorts if algorithm != 'p' else ['-']):
+                print(f"Running: netlist {netlist_number} | algorithm {algorithm} | sort {sort}", file=sys.stderr)
+                runs = []
+                for run in range(warmup + repeat):
+                    random.seed(f"{seed}-{netlist_number}-{algorithm}-{sort}-{run}")
+                    result = run_once(algorithm, sort, netlist, nodes_list, grid, iterations)
+                    if run >= warmup:
+                        runs.append(result)
+
+                costs = [run['best_cost'] for run in runs if run['best_cost'] is not None]
+                results.append({
+                    'netlist': netlist_number,
+                    'algorithm': algorithm,
+                    'sort': sort,
+                    'iterations': iterations,
+                    'repeat': repeat,
+                    'wall_time': statistics.median(run['wall_time'] for run in runs),
+                    'wall_time_min': min(run['wall_time'] for run in runs),
+                    'per_net_time': statistics.median(run['per_net_time'] for run in runs),
+                    'expansions': statistics.mean(run['expansions'] for run in runs),
+                    'success_rate': statistics.mean(run['success_rate'] for run in runs),
+                    'best_cost': min(costs) if costs else None,
+                    'mean_best_cost': statistics.mean(costs) if costs else None,
+                })
+    return results
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float = 0.2) -> list[str]:
+    """
+    Compares results with the results of a baseline run. A configuration regressed if its wall time
+    or best cost grew by more than threshold (a fraction), or its success rate dropped by more than it.
+    Returns:
+      a line per regression
+    """
+    def key(result: dict) -> tuple:
+        return result['netlist'], result['algorithm'], result['sort'], result['iterations']
+
+    baseline = {key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        old = baseline.get(key(result))
+        if old is None:
+            continue
+        name = "netlist {} | algorithm {} | sort {}".format(*key(result)[:3])
+
+        if result['wall_time'] > old['wall_time'] * (1 + threshold):
+            regressions.append(f"{name}: wall time {old['wall_time']:.3f}s -> {result['wall_time']:.3f}s")
+        if old['best_cost'] is not None and (result['best_cost'] is None or result['best_cost'] > old['best_cost'] * (1 + threshold)):
+            regressions.append(f"{name}: best cost {old['best_cost']} -> {result['best_cost']}")
+        if result['success_rate'] < old['success_rate'] - threshold:
+            regressions.append(f"{name}: success rate {old['success_rate']:.1%} -> {result['success_rate']:.1%}")
+    return regressions
+
+
+def write_json(path: str, results: list[dict], settings: dict) -> None:
+    """
+    Writes the results with the settings and the machine they were measured on.
+    """
+    data = {
+        'settings': settings,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'results': results,
+    }
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=1)
+
+
+def write_csv(path: str, results: list[dict]) -> None:
+    """
+    Writes the results as a csv file, one row per configuration.
+    """
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for result in results:
+            writer.writerow({field: result[field] for field in CSV_FIELDS})
+
+
+def parse_arguments(argv=None):
+    def letters(value: str) -> list[str]:
+        return [letter.strip().lower() for letter in value.split(',') if letter.strip()]
+
+    parser = argparse.ArgumentParser(description="Benchmark the algorithms, sorting methods and netlists.")
+    parser.add_argument('--netlists', default='1,2,3,4,5,6,7,8,9', help="netlists to run (default: 1-9)")
+    parser.add_argument('--algorithms', default='m,d,l,a', help="algorithms to run, letters of main.py (default: m,d,l,a)")
+    parser.add_argument('--sorts', default='r,b,d,q', help="sorting methods to run (default: r,b,d,q)")
+    parser.add_argument('--iterations', type=int, default=100, help="orderings per run (default: 100)")
+    parser.add_argument('--repeat', type=int, default=3, help="measured runs per configuration (default: 3)")
+    parser.add_argument('--warmup', type=int, default=1, help="unmeasured runs per configuration (default: 1)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the orderings (default: 0)")
+    parser.add_argument('--buckets', action='store_true', help="search Lee's wires with the bucket queue")
+    parser.add_argument('--json', default=None, metavar='PATH', help="write the results as json")
+    parser.add_argument('--csv', default=None, metavar='PATH', help="write the results as csv")
+    parser.add_argument('--baseline', default=None, metavar='PATH', help="json results to compare with")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="allowed relative slowdown or cost increase, and drop in success rate (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    args.netlists = [int(netlist) for netlist in letters(args.netlists)]
+    args.algorithms = letters(args.algorithms)
+    args.sorts = letters(args.sorts)
+    for algorithm in args.algorithms:
+        if algorithm not in ALGORITHMS:
+            parser.error(f"unknown algorithm: {algorithm}")
+    for sort in args.sorts:
+        if sort not in SORTS:
+            parser.error(f"unknown sorting method: {sort}")
+    for netlist in args.netlists:
+        if not 1 <= netlist <= 9:
+            parser.error(f"netlists lie between 1-9: {netlist}")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_arguments(argv)
+    results = benchmark(
+        args.netlists, args.algorithms, args.sorts, args.iterations, args.repeat, args.warmup, args.seed, args.buckets
+    )
+
+    print(f"{'Netlist':<8}{'Algorithm':<10}{'Sort':<6}{'Best cost':>10}{'Time (s)':>10}{'Per net (ms)':>14}{'Success':>9}")
+    for result in results:
+        best_cost = '-' if result['best_cost'] is None else result['best_cost']
+        print(f"{result['netlist']:<8}{result['algorithm']:<10}{result['sort']:<6}{best_cost:>10}"
+              f"{result['wall_time']:>10.3f}{result['per_net_time'] * 1000:>14.3f}{result['success_rate']:>9.1%}")
+
+    settings = {key: getattr(args, key) for key in ('netlists', 'algorithms', 'sorts', 'iterations', 'repeat', 'warmup', 'seed', 'buckets')}
+    if args.json is not None:
+        write_json(args.json, results, settings)
+    if args.csv is not None:
+        write_csv(args.csv, results)
+
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions compared to {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Scaling benchmark: routes random chips of growing size (see code/generate.py) and measures
+how the time and memory of the grid and the routers grow with it.
+
+Run from the main directory, for example:
+    python -m code.experiments.scaling --sizes 20,50,100,200 --algorithms m,l,a,b --nets-limit 100 \
+        --json code/experiments/scaling.json
+
+Per size a chip of size x size is generated with gates and nets in proportion to its area, like the
+chips of the course (about 1 gate per 12 cells and 2 nets per gate). Every router routes the nets
+in one random ordering; a failed net is skipped, so all routers route the same amount of nets.
+Memory is measured with tracemalloc in separate runs, the times are measured without it.
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from code.classes.grid_class import BACKENDS, LAYERS, initialise_grid
+from code.functions import choose_algorithm
+from code.generate import generate_chip, write_chip
+from code.imports import load_chip_context
+
+ALGORITHMS = ('m', 'l', 'a', 'b')
+
+
+def array_bytes(grid) -> int:
+    """
+    Returns the bytes of the arrays of a grid and the buffers of its search kernel (numpy arrays,
+    sparse arrays, and the lists or dicts of the kernel), views are not counted twice.
+    """
+    objects = (grid, grid.give_search_kernel())
+    arrays = {
+        id(value): value for obj in objects for value in vars(obj).values()
+        if isinstance(value, (dict, list, bytearray)) or (isinstance(value, np.ndarray) and value.base is None)
+    }
+    return sum(array.nbytes if hasattr(array, 'nbytes') else sys.getsizeof(array) for array in arrays.values())
+
+
+def route_nets(functie, netlist, nodes_list, grid) -> tuple[int, int]:
+    """
+    Routes the nets one by one on the grid, a net that can't be routed is skipped.
+    Returns:
+      (routed nets, expansions of the search kernel)
+    """
+    kernel = grid.give_search_kernel()
+    expansions = kernel.expansions
+    grid.clear_wires()
+    grid.apply_costs_around_nodes()
+
+    routed = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for node1_id, node2_id in netlist:
+            wire = functie(nodes_list[node1_id - 1], nodes_list[node2_id - 1], grid)
+            if wire is not None:
+                grid.add_wire_list(wire)
+                routed += 1
+    return routed, kernel.expansions - expansions
+
+
+def timed(function, *args) -> tuple[object, float]:
+    """
+    Returns:
+      (function(*args), wall time in seconds)
+    """
+    start_time = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start_time
+
+
+def peak_memory(function, *args) -> int:
+    """
+    Runs function(*args) with tracemalloc, which slows Python code down a lot, so it's never timed.
+    Returns:
+      the peak of the memory allocated during the call in bytes
+    """
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def scaling_benchmark(
+    sizes: list[int],
+    algorithms: list[str],
+    gate_density: float = 1 / 12,
+    nets_per_gate: float = 2.0,
+    nets_limit: int = None,
+    memory_nets: int = 10,
+    seed: int = 0,
+    layers: int = LAYERS,
+    backend: str = 'dense',
+) -> list[dict]:
+    """
+    Generates a chip per size and routes (at most nets_limit of) its nets with every algorithm,
+    on grids with layers layers and the given backend (see Grid_3D).
+    The peak memory of routing is measured in a second run of the first memory_nets nets.
+    The chip of a size only depends on seed and the size, not on the other sizes that are run.
+    Returns:
+      a dict per size and algorithm with the times, memory and amount of routed nets
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for number, size in enumerate(sizes):
+            gates = max(2, int(gate_density * size * size))
+            nets = int(nets_per_gate * gates)
+            positions, netlist = generate_chip(size, size, gates, nets, seed=f"{seed}-{size}")
+            nodes_csv_path, netlist_csv_path = write_chip(directory, number, positions, netlist)
+
+            context = load_chip_context(nodes_csv_path, netlist_csv_path)
+            nodes_list = context.give_nodes()
+            ordering = list(context.give_netlist())
+            random.Random(seed).shuffle(ordering)
+            if nets_limit is not None:
+                ordering = ordering[:nets_limit]
+
+            for algorithm in algorithms:
+                functie = choose_algorithm(algorithm)
+                init_peak = peak_memory(initialise_grid, context, algorithm, layers, backend)
+                (grid, _, _), init_time = timed(initialise_grid, context, algorithm, layers, backend)
+                route_peak = peak_memory(route_nets, functie, ordering[:memory_nets], nodes_list, grid)
+                (routed, expansions), route_time = timed(route_nets, functie, ordering, nodes_list, grid)
+                results.append({
+                    'size': size,
+                    'gates': gates,
+                    'nets': len(ordering),
+                    'algorithm': algorithm,
+                    'init_time': init_time,
+                    'init_peak_bytes': init_peak,
+                    'grid_bytes': array_bytes(grid),
+                    'route_time': route_time,
+                    'per_net_time': route_time / len(ordering),
+                    'route_peak_bytes': route_peak,
+                    'routed': routed,
+                    'expansions': expansions,
+                    'cost': grid.cost(),
+                })
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure how the routers scale with the size of the chip.")
+    parser.add_argument('--sizes', default='20,50,100,200', help="comma separated chip sizes (default: 20,50,100,200)")
+    parser.add_argument('--algorithms', default=','.join(ALGORITHMS), help="comma separated algorithms (default: m,l,a,b)")
+    parser.add_argument('--gate-density', type=float, default=1 / 12, help="gates per cell (default: 1/12)")
+    parser.add_argument('--nets-per-gate', type=float, default=2.0, help="nets per gate (default: 2)")
+    parser.add_argument('--nets-limit', type=int, default=100, help="nets routed per chip (default: 100)")
+    parser.add_argument('--memory-nets', type=int, default=10, help="nets routed to measure the peak memory (default: 10)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the chips and orderings (default: 0)")
+    parser.add_argument('--layers', type=int, default=LAYERS, help=f"layers of the grids (default: {LAYERS})")
+    parser.add_argument('--backend', default='dense', choices=BACKENDS, help="storage of the wires (default: dense)")
+    parser.add_argument('--json', default=None, metavar='PATH', help="write the results as json")
+    args = parser.parse_args(argv)
+
+    results = scaling_benchmark(
+        [int(size) for size in args.sizes.split(',')],
+        args.algorithms.split(','),
+        args.gate_density,
+        args.nets_per_gate,
+        args.nets_limit,
+        args.memory_nets,
+        args.seed,
+        args.layers,
+        args.backend,
+    )
+
+    print(f"{'Size':>5}{'Nets':>7}{'Alg':>4}{'Init (s)':>10}{'Grid (MB)':>10}{'Route (s)':>11}"
+          f"{'Net (ms)':>10}{'Peak (MB)':>10}{'Routed':>8}{'Expansions':>12}")
+    for result in results:
+        print(f"{result['size']:>5}{result['nets']:>7}{result['algorithm']:>4}{result['init_time']:>10.3f}"
+              f"{result['grid_bytes'] / 2**20:>10.1f}{result['route_time']:>11.2f}"
+              f"{result['per_net_time'] * 1000:>10.2f}{result['route_peak_bytes'] / 2**20:>10.1f}"
+              f"{result['routed']:>8}{result['expansions']:>12}")
+
+    if args.json is not None:
+        with open(args.json, 'w') as file:
+            json.dump({'arguments': vars(args), 'results': results}, file, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
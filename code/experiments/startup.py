@@ -0,0 +1,81 @@
+"""
+Startup time benchmark: how long a fresh interpreter takes to import the code and to route
+a first netlist, as a scheduler that starts many short jobs would see it.
+
+Run from the main directory:
+    python -m code.experiments.startup --repeat 20 --json code/experiments/startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Every step is run in its own interpreter, the later steps include the earlier ones
+STEPS = {
+    'interpreter': "pass",
+    'import main': "import main",
+    'first route': "import main; from code.api import route; route(None, {netlist}, '{algorithm}', 'r', 1)",
+}
+
+
+def time_command(code: str, cwd: str) -> float:
+    """
+    Returns the wall time in seconds of running code in a new interpreter.
+    """
+    start_time = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start_time
+
+
+def heavy_modules(cwd: str) -> list[str]:
+    """
+    Returns which of the big optional libraries importing main.py loads.
+    """
+    code = "import sys, main; print(' '.join(m for m in ('numpy', 'pandas', 'matplotlib') if m in sys.modules))"
+    output = subprocess.run([sys.executable, '-c', code], cwd=cwd, check=True, capture_output=True, text=True)
+    return output.stdout.split()
+
+
+def startup_benchmark(repeat: int = 10, netlist: int = 1, algorithm: str = 'a', cwd: str = '.') -> dict:
+    """
+    Times every step repeat times, after one unmeasured run to warm up the file system cache.
+    Returns:
+      a dict per step with the median and minimum time in milliseconds
+    """
+    results = {}
+    for step, code in STEPS.items():
+        code = code.format(netlist=netlist, algorithm=algorithm)
+        time_command(code, cwd)
+        times = [time_command(code, cwd) * 1000 for _ in range(repeat)]
+        results[step] = {'median_ms': statistics.median(times), 'min_ms': min(times)}
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure the time from interpreter start to the first route.")
+    parser.add_argument('--repeat', type=int, default=10, help="measured runs per step (default: 10)")
+    parser.add_argument('--netlist', type=int, default=1, help="netlist of the first route (default: 1)")
+    parser.add_argument('--algorithm', default='a', help="algorithm of the first route (default: a)")
+    parser.add_argument('--json', default=None, metavar='PATH', help="write the results as json")
+    args = parser.parse_args(argv)
+
+    cwd = os.getcwd()
+    results = startup_benchmark(args.repeat, args.netlist, args.algorithm, cwd)
+
+    print(f"{'Step':<14}{'Median (ms)':>12}{'Min (ms)':>10}")
+    for step, result in results.items():
+        print(f"{step:<14}{result['median_ms']:>12.1f}{result['min_ms']:>10.1f}")
+    modules = heavy_modules(cwd)
+    print(f"Libraries loaded by importing main.py: {', '.join(modules) if modules else 'none'}")
+
+    if args.json is not None:
+        with open(args.json, 'w') as file:
+            json.dump({'repeat': args.repeat, 'results': results, 'modules': modules}, file, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,11 @@
-from code.algorithms import a_star_algorithm, dfs_algorithm, lee_algorithm, manhattan_wire
+from code.algorithms import a_star_algorithm, bidirectional_a_star_algorithm, dfs_algorithm, lee_algorithm, manhattan_wire
 from code.classes.nodes_class import Node
+from code.classes.qtable_class import QTable
+from code.pathfinder import pathfinder_routing
 
 import itertools
 import math
+import os
 import random
 
 # random.seed(43) # Used for running the experiments
@@ -162,14 +165,29 @@ def sort_multiple_netlist_distance(netlist: list[tuple], nodeslist: list[Node],
 alpha = 0.1
 gamma = 0.9
 epsilon = 0.2
-q_table = {}
+q_table = QTable()
+
+
+def set_q_table(table: QTable) -> None:
+    """
+    Replaces the Q-table, e.g. by a table loaded from an earlier run.
+    """
+    global q_table
+    q_table = table
+
+
+def give_q_table() -> QTable:
+    """
+    Returns the Q-table in use.
+    """
+    return q_table
 
 
 def state_to_tuple(state):
     """
-    Convert the netlist into a hashable tuple for the Q-table.
+    Convert the netlist into a hashable key for the Q-table.
     """
-    return tuple(state)
+    return q_table.encode_state(state)
 
 
 def choose_action(state, netlist: list[tuple]) -> int:
@@ -179,11 +197,10 @@ def choose_action(state, netlist: list[tuple]) -> int:
     if random.uniform(0, 1) < epsilon:
         i, j = random.sample(range(len(netlist)), 2)
     else:
-        possible_actions = [(s, a) for (s, a) in q_table if s == state]
-        if not possible_actions:
+        best_action = q_table.best_action(state)
+        if best_action is None:
             i, j = random.sample(range(len(netlist)), 2)
         else:
-            _, best_action = max(possible_actions, key=lambda x: q_table[x])
             i, j = best_action
 
     return i, j
@@ -192,28 +209,95 @@ def update_q_table(state, action, reward, next_state):
     """
     Update the Q-table according to the Q-learning formula.
     """
-    key = (state, action)
-    next_state_keys = [(next_state, a) for a in range(len(next_state))]
-    
-    next_max = max((q_table[k] for k in next_state_keys if k in q_table), default=0)
-
-    q_table[key] = q_table.get(key, 0) + alpha * (reward + gamma * next_max - q_table.get(key, 0))
+    q_table.update(state, action, reward, next_state, alpha, gamma)
 
 # ----------------------------------------
 # Setup functions
 # ----------------------------------------
 
+def choose_chip(netlist: str) -> str|None:
+    """
+    Returns the chip of a netlist (1-9), or None if there is no such netlist.
+    """
+    netlist = str(netlist).lower()
+    if netlist == '1' or netlist == '2' or netlist == '3':
+        return '0'
+    elif netlist == '4' or netlist == '5' or netlist == '6':
+        return '1'
+    elif netlist == '7' or netlist == '8' or netlist == '9':
+        return '2'
+    return None
+
+
+def find_chip(netlist: str, base_path: str) -> str|None:
+    """
+    Returns the chip of a netlist in base_path: the chip of the course for netlists 1-9, otherwise the
+    chip directory that holds netlist_<netlist>.csv (like the chips of code.generate), or None if
+    base_path has no such netlist.
+    """
+    netlist = str(netlist).lower()
+    chip = choose_chip(netlist)
+    if chip is not None and os.path.exists(os.path.join(base_path, f'chip_{chip}', f'netlist_{netlist}.csv')):
+        return chip
+
+    if not os.path.isdir(base_path):
+        return None
+    for directory in sorted(os.listdir(base_path)):
+        if directory.startswith('chip_') and os.path.exists(os.path.join(base_path, directory, f'netlist_{netlist}.csv')):
+            return directory[len('chip_'):]
+    return None
+
+
+def choose_algorithm(algorithm: str):
+    """
+    Returns the routing function of an answer to get_algorithms(), or None if it's not a valid answer.
+    """
+    algorithm = algorithm.lower()
+    if algorithm == 'm' or algorithm == 'manhattan':
+        return manhattan_wire
+    elif algorithm == 'd' or algorithm == 'depth first':
+        return dfs_algorithm
+    elif algorithm == 'l' or algorithm == 'lee':
+        return lee_algorithm
+    elif algorithm == 'a' or algorithm == 'a*':
+        return a_star_algorithm
+    elif algorithm == 'b' or algorithm == 'bidirectional a*':
+        return bidirectional_a_star_algorithm
+    elif algorithm == 'p' or algorithm == 'pathfinder':
+        return pathfinder_routing
+    return None
+
+
+def choose_sorting_method(ans: str, netlist, nodes_list, iter):
+    """
+    Returns the sorted netlist of an answer to get_sorting_method(), or None if it's not a valid answer.
+    A single run gets one ordering, multiple runs get a list of iter orderings (or 'q' for Q-learning).
+    """
+    ans = ans.lower()
+    if iter == 1:
+        if ans == 'r' or ans == 'random':
+            return random_permutations(netlist, int(iter))
+        elif ans == 'd' or ans == 'distance of a connection':
+            return sort_netlist_distance(netlist, nodes_list)
+        elif ans == 'b' or ans == 'busy nodes':
+            return sort_netlist_busy_nodes(netlist)
+    else:
+        if ans == 'r' or ans == 'random':
+            return random_permutations(netlist, int(iter))
+        elif ans == 'd' or ans == 'distance of a connection':
+            return sort_multiple_netlist_distance(netlist, nodes_list, int(iter))
+        elif ans == 'b' or ans == 'busy nodes':
+            return sort_multiple_netlist_busy_nodes(netlist, int(iter))
+        elif ans == 'q' or ans == 'q-learning' or ans == 'q learning':
+            return 'q'
+    return None
+
+
 def get_netlist():
     while True:
         netlist = input("What netlist do you want to use? Answer must lie between 1-9: ").lower()
-        if netlist == '1' or netlist == '2' or netlist == '3':
-            chip = '0'
-            break
-        elif netlist == '4' or netlist == '5' or netlist == '6':
-            chip = '1'
-            break
-        elif netlist == '7' or netlist == '8' or netlist == '9':
-            chip = '2'
+        chip = choose_chip(netlist)
+        if chip is not None:
             break
         else:
             print("Not a valid entry")
@@ -223,18 +307,9 @@ def get_netlist():
 
 def get_algorithms():
     while True:
-        algorithm = input("What algorithm do you want to use? Choose between Manhattan (M), Depth First (D), Lee (L) or A* (A): ").lower()
-        if algorithm == 'm' or algorithm == 'manhattan':
-            functie = manhattan_wire
-            break
-        elif algorithm == 'd' or algorithm == 'depth first':
-            functie = dfs_algorithm
-            break
-        elif algorithm == 'l' or algorithm == 'lee':
-            functie = lee_algorithm
-            break
-        elif algorithm == 'a' or algorithm == 'a*':
-            functie = a_star_algorithm
+        algorithm = input("What algorithm do you want to use? Choose between Manhattan (M), Depth First (D), Lee (L), A* (A), Bidirectional A* (B) or PathFinder (P): ").lower()
+        functie = choose_algorithm(algorithm)
+        if functie is not None:
             break
         else:
             print("Not a valid entry")
@@ -242,40 +317,24 @@ def get_algorithms():
     return functie, algorithm
 
 
-def get_sorting_method(netlist, nodes_list, iter):
-    if iter == 1:
-        while True:
+def get_sorting_answer(iter):
+    """
+    Asks for the sorting method until the answer is valid, see choose_sorting_method().
+    """
+    single = ('r', 'random', 'd', 'distance of a connection', 'b', 'busy nodes')
+    multiple = single + ('q', 'q-learning', 'q learning')
+    while True:
+        if iter == 1:
             ans = input("How do you want to sort the netlist? Choose between by: Random (R), Busy nodes (B) or Distance of a connection (D): ").lower()
-            if ans == 'r' or ans == 'random':
-                sort = random_permutations(netlist, int(iter))
-                break
-            elif ans == 'd' or ans == 'distance of a connection':
-                sort = sort_netlist_distance(netlist, nodes_list)
-                break
-            elif ans == 'b' or ans == 'busy nodes':
-                sort = sort_netlist_busy_nodes(netlist)
-                break
-            else:
-                print("Not a valid entry")
-    else:
-        while True:
+        else:
             ans = input("How do you want to sort the netlist? Choose between by: Random (R), Q-Learning (Q), Busy nodes (B) or Distance of a connection (D): ").lower()
-            if ans == 'r' or ans == 'random':
-                sort = random_permutations(netlist, int(iter))
-                break
-            elif ans == 'd' or ans == 'distance of a connection':
-                sort = sort_multiple_netlist_distance(netlist, nodes_list, int(iter))
-                break
-            elif ans == 'b' or ans == 'busy nodes':
-                sort = sort_multiple_netlist_busy_nodes(netlist, int(iter))
-                break
-            elif ans == 'q' or ans == 'q-learning' or ans == 'q learning':
-                sort = 'q'
-                break
-            else:
-                print("Not a valid entry")
-    
-    return sort
+        if ans in (single if iter == 1 else multiple):
+            return ans
+        print("Not a valid entry")
+
+
+def get_sorting_method(netlist, nodes_list, iter):
+    return choose_sorting_method(get_sorting_answer(iter), netlist, nodes_list, iter)
 
 
 def get_singular_multiple():
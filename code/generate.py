@@ -0,0 +1,146 @@
+"""
+Generator of random chips and netlists, written in the same csv layout as gates_netlists/.
+
+Run from the main directory, for example:
+    python -m code.generate --width 200 --length 200 --gates 2000 --nets 4000 --seed 1 --number 10 --out gates_netlists/random
+
+This writes print_10.csv and netlist_10.csv in gates_netlists/random/chip_10.
+"""
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+
+# A gate has 4 free sides on the base layer and one cell above it, so at most 5 wires
+MAX_GATE_DEGREE = 5
+
+
+def generate_chip(
+    width: int,
+    length: int,
+    gates: int,
+    nets: int,
+    max_degree: int = MAX_GATE_DEGREE,
+    skew: float = 0.0,
+    max_distance: int = None,
+    seed: int|str = None,
+) -> tuple[list[tuple[int, int]], list[tuple[int, int]]]:
+    """
+    Generates a random chip of width x length with gates on distinct cells and a netlist of distinct
+    nets between them. Like the chips of the course the gates keep a free border of one cell, so
+    the grid initialise_grid() makes is at most width x length.
+
+    The degree distribution of the gates is set by max_degree (wires per gate, at most 5) and skew:
+    gate i (in random order) is picked with weight 1 / (i + 1) ** skew, so 0 gives every gate the same
+    chance and higher values give a few busy gates. With max_distance both gates of a net lie within
+    that Manhattan distance of each other.
+    Returns:
+      (gate positions, netlist), node ids in the netlist start at 1
+    """
+    if width < 3 or length < 3:
+        raise ValueError("A chip needs at least 3 x 3 cells, the border stays free.")
+    if gates > (width - 2) * (length - 2):
+        raise ValueError(f"{gates} gates don't fit on a {width} x {length} chip.")
+    if not 1 <= max_degree <= MAX_GATE_DEGREE:
+        raise ValueError(f"A gate can have 1 to {MAX_GATE_DEGREE} wires.")
+    if nets > gates * max_degree // 2 or nets > gates * (gates - 1) // 2:
+        raise ValueError(f"{nets} nets don't fit on {gates} gates with at most {max_degree} wires each.")
+
+    rng = random.Random(seed)
+
+    # The last row and column also stay free
+    cells = rng.sample(range((width - 2) * (length - 2)), gates)
+    positions = [(1 + cell // (length - 2), 1 + cell % (length - 2)) for cell in cells]
+
+    cumulative = list(itertools.accumulate(1 / (i + 1) ** skew for i in range(gates)))
+    degree = [0] * gates
+    netlist = set()
+
+    def pick(near: int = None) -> int|None:
+        """
+        Draws a gate with room for another wire, with the weights of skew.
+        """
+        for _ in range(100):
+            gate = bisect.bisect_left(cumulative, rng.random() * cumulative[-1])
+            if degree[gate] < max_degree and (near is None or _fits(gate, near)):
+                return gate
+
+        # Most gates are full or far away, draw from those that are left
+        options = [gate for gate in range(gates) if degree[gate] < max_degree and (near is None or _fits(gate, near))]
+        return rng.choice(options) if options else None
+
+    def _fits(gate: int, near: int) -> bool:
+        if gate == near or (min(gate, near) + 1, max(gate, near) + 1) in netlist:
+            return False
+        if max_distance is None:
+            return True
+        (x1, y1), (x2, y2) = positions[gate], positions[near]
+        return abs(x1 - x2) + abs(y1 - y2) <= max_distance
+
+    attempts = 0
+    while len(netlist) < nets:
+        attempts += 1
+        if attempts > 100 * nets:
+            raise ValueError("Could not place all nets, allow more wires per gate or a larger max_distance.")
+
+        gate1 = pick()
+        gate2 = pick(near=gate1) if gate1 is not None else None
+        if gate2 is None:
+            continue
+
+        degree[gate1] += 1
+        degree[gate2] += 1
+        netlist.add((min(gate1, gate2) + 1, max(gate1, gate2) + 1))
+
+    netlist = list(netlist)
+    rng.shuffle(netlist)
+    return positions, netlist
+
+
+def write_chip(directory: str, number: int, positions: list[tuple[int, int]], netlist: list[tuple[int, int]]) -> tuple[str, str]:
+    """
+    Writes print_<number>.csv and netlist_<number>.csv in directory/chip_<number>.
+    Returns:
+      (path of the chip file, path of the netlist file)
+    """
+    chip_directory = os.path.join(directory, f'chip_{number}')
+    os.makedirs(chip_directory, exist_ok=True)
+    nodes_csv_path = os.path.join(chip_directory, f'print_{number}.csv')
+    netlist_csv_path = os.path.join(chip_directory, f'netlist_{number}.csv')
+
+    with open(nodes_csv_path, 'w') as file:
+        file.write('chip,x,y\n')
+        file.writelines(f'{node_id},{x},{y}\n' for node_id, (x, y) in enumerate(positions, start=1))
+    with open(netlist_csv_path, 'w') as file:
+        file.write('chip_a,chip_b\n')
+        file.writelines(f'{node1_id},{node2_id}\n' for node1_id, node2_id in netlist)
+
+    return nodes_csv_path, netlist_csv_path
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a random chip and netlist.")
+    parser.add_argument('--width', type=int, default=18, help="cells in x, including the free border (default: 18)")
+    parser.add_argument('--length', type=int, default=17, help="cells in y, including the free border (default: 17)")
+    parser.add_argument('--gates', type=int, default=25, help="amount of gates (default: 25)")
+    parser.add_argument('--nets', type=int, default=50, help="amount of nets (default: 50)")
+    parser.add_argument('--max-degree', type=int, default=MAX_GATE_DEGREE, help="wires per gate (default: 5)")
+    parser.add_argument('--skew', type=float, default=0.0, help="0 for evenly used gates, higher for a few busy gates (default: 0)")
+    parser.add_argument('--max-distance', type=int, default=None, help="maximum Manhattan distance of a net")
+    parser.add_argument('--seed', type=int, default=None, help="seed of the generator")
+    parser.add_argument('--number', type=int, default=10, help="number of the chip in the file names (default: 10)")
+    parser.add_argument('--out', default=os.path.join('gates_netlists', 'random'), help="directory (default: gates_netlists/random)")
+    args = parser.parse_args(argv)
+
+    positions, netlist = generate_chip(
+        args.width, args.length, args.gates, args.nets, args.max_degree, args.skew, args.max_distance, args.seed
+    )
+    nodes_csv_path, netlist_csv_path = write_chip(args.out, args.number, positions, netlist)
+    print(f"Wrote {len(positions)} gates to {nodes_csv_path} and {len(netlist)} nets to {netlist_csv_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,23 +1,56 @@
-import pandas as pd
+import csv
+import os
+from functools import lru_cache
+
 from code.classes.nodes_class import Node
+from code.classes.chip_class import ChipContext
+
+def read_csv_rows(csv_path) -> list[dict[str, str]]:
+    """
+    Reads a csv file with a header into a dict per row. Empty lines are skipped and
+    the names and values are stripped, like pandas.read_csv() does for these files.
+    """
+    with open(csv_path, newline='', encoding='utf-8-sig') as file:
+        reader = csv.reader(file)
+        header = [name.strip() for name in next(reader, [])]
+        return [
+            dict(zip(header, (value.strip() for value in row)))
+            for row in reader
+            if any(value.strip() for value in row)
+        ]
 
 def import_netlist(csv_path) -> list[tuple[int, int]]:
     """
     Generates a list of tuples from the netlist csv file.
     """
-    data = pd.read_csv(csv_path)
     return [
         (int(row['chip_a']), int(row['chip_b']))
-        for _, row in data.iterrows()
+        for row in read_csv_rows(csv_path)
     ]
 
 def import_nodes(csv_path) -> list[Node]:
     """
     Imports nodes based on a csv file and returns a list of Node objects.
     """
-    data = pd.read_csv(csv_path)
-
     return [
         Node(int(row['x']), int(row['y']))
-        for _, row in data.iterrows()
-    ]
\ No newline at end of file
+        for row in read_csv_rows(csv_path)
+    ]
+
+
+def load_chip_context(nodes_csv_path, netlist_csv_path) -> ChipContext:
+    """
+    Returns the ChipContext of a chip and netlist. The csv files are only parsed the first time,
+    after that the same (read-only) context is returned.
+    """
+    return _load_chip_context(os.path.abspath(nodes_csv_path), os.path.abspath(netlist_csv_path))
+
+
+@lru_cache(maxsize=None)
+def _load_chip_context(nodes_csv_path, netlist_csv_path) -> ChipContext:
+    return ChipContext(
+        import_nodes(nodes_csv_path),
+        import_netlist(netlist_csv_path),
+        nodes_csv_path=nodes_csv_path,
+        netlist_csv_path=netlist_csv_path,
+    )
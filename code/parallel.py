@@ -0,0 +1,104 @@
+import random
+import time
+
+from code.classes.chip_class import ChipContext
+from code.classes.grid_class import LAYERS, initialise_grid
+from code.engine import route_ordering
+
+# State of a worker process, filled in once by _init_worker
+_worker_grid = None
+_worker_functie = None
+_worker_seed = None
+_worker_dfs_budget = None
+
+
+def _init_worker(context: ChipContext, algorithm: str, functie, seed: int, layers: int, backend: str,
+                 dfs_nodes: int, dfs_depth: int|None, buckets: bool) -> None:
+    """
+    Builds the private grid of a worker process.
+    """
+    global _worker_grid, _worker_functie, _worker_seed, _worker_dfs_budget
+    _worker_grid, _, _ = initialise_grid(context, algorithm, layers, backend)
+    _worker_grid.give_search_kernel().use_buckets = buckets
+    _worker_functie = functie
+    _worker_seed = seed
+    _worker_dfs_budget = (dfs_nodes, dfs_depth)
+
+
+def _route_in_worker(job: tuple[int, list[tuple[int, int]]]) -> tuple:
+    """
+    Routes one ordering on the grid of the worker.
+    Returns:
+      (success, cost, wires, iteration_time), wires is None if the ordering failed
+    """
+    h, ordering = job
+    iteration_start_time = time.time()
+
+    # The seed only depends on the ordering, not on which worker routes it
+    random.seed(f"{_worker_seed}-{h}")
+
+    grid = _worker_grid
+    dfs_nodes, dfs_depth = _worker_dfs_budget
+    success, wires = route_ordering(
+        _worker_functie, ordering, grid.give_context().give_nodes(), grid, dfs_nodes=dfs_nodes, dfs_depth=dfs_depth
+    )
+    cost = grid.cost() if success else None
+
+    return success, cost, (wires if success else None), time.time() - iteration_start_time
+
+
+def run_multiple_runs_parallel(
+    context,
+    algorithm,
+    cost_min,
+    successful_grid,
+    tries,
+    all_wire_runs,
+    functie,
+    sort,
+    workers,
+    seed=0,
+    checkpoint=None,
+    layers=LAYERS,
+    backend='dense',
+    dfs_nodes=1000,
+    dfs_depth=None,
+    buckets=False
+):
+    """
+    Executes multiple runs of the chosen algorithm, the orderings in sort are routed by a pool of
+    worker processes that each own a grid. The results are handled in the order of sort, so the
+    output is the same as that of run_multiple_runs. The best grid so far is kept on disk with checkpoint.
+    The budgets of the DFS search are given to every worker, see backtracking_dfs(). With buckets
+    the workers search Lee's wires with the bucket queue, see SearchKernel.search_buckets().
+    Returns:
+      (wires_cost_min, successful_grid, tries, cost_min)
+    """
+    # Imported here, it takes longer than the rest of the startup and most runs don't use it
+    from concurrent.futures import ProcessPoolExecutor
+
+    wires_cost_min = None
+    jobs = [(h, list(netlists)) for h, netlists in enumerate(sort)]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(context, algorithm, functie, seed, layers, backend, dfs_nodes, dfs_depth, buckets)
+    ) as executor:
+        results = executor.map(_route_in_worker, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+
+        for h, (success, cost, wires, iteration_time) in enumerate(results):
+            if success:
+                all_wire_runs.append(wires)
+                successful_grid += 1
+                if cost_min > cost:
+                    cost_min = cost
+                    wires_cost_min = wires
+
+            tries += 1
+            print(f"Iteration {h+1} took {iteration_time:.2f} seconds")
+            print(f"Amount of solutions attempted: {tries} | Best cost so far: {cost_min}")
+            if checkpoint is not None:
+                checkpoint.update(wires_cost_min, cost_min)
+
+    return wires_cost_min, successful_grid, tries, cost_min
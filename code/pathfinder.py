@@ -0,0 +1,142 @@
+import numpy as np
+
+from code.classes.grid_class import Grid_3D
+from code.classes.nodes_class import Node
+from code.classes.wire_class import Wire
+from code.algorithms import route_with_kernel, lay_wire
+
+
+def pathfinder_routing(
+    netlist: list[tuple[int, int]],
+    nodes_list: list[Node],
+    grid: Grid_3D,
+    max_rounds: int = 30,
+    present_factor: float = 10,
+    present_growth: float = 1.5,
+    history_factor: float = 5,
+    access_cost: float = 30,
+) -> tuple[bool, list[Wire], dict]:
+    """
+    Negotiated congestion routing (PathFinder). All nets are routed with A*, wires may share
+    cells (intersections). Then, round after round, every net that runs through a shared cell is
+    ripped up and rerouted. On top of the base cost field of the grid a cell costs:
+    - present_factor * the amount of other wires through it, the factor grows every round
+    - a history cost, that grows every round the cell is shared
+    - access_cost if the cell lies next to a node. Every wire needs one such cell at each end,
+      so this only makes detours past the nodes (which can lock other nets out) more expensive
+    So the nets negotiate who gets a crowded cell, until no cell is shared or max_rounds is reached.
+
+    The best solution that was found is left on the grid.
+    Returns:
+      (success, wires, stats), the wires follow the order of the netlist
+    """
+    if len(netlist) == 0:
+        raise ValueError("No netlist given.")
+
+    grid.clear_wires()
+    grid.apply_costs_around_nodes()
+    base = grid.flat_values().copy()
+    field = base.copy() # base plus the access costs, the negotiated costs are added on top
+    history = np.zeros(grid.size, dtype=np.float64)
+    node_cells = grid.flat_node_cells()
+
+    wires = [None] * len(netlist)
+    paths = [None] * len(netlist)
+    stats = {'rounds': 0, 'routings': 0, 'cost_per_round': []}
+    present = float(present_factor)
+
+    def access_cells(k: int) -> list[int]:
+        """
+        Returns the cells next to the nodes of net k, a wire of net k has to use one at each end.
+        """
+        cells = []
+        for node_id in netlist[k]:
+            node = nodes_list[node_id - 1]
+            for dx, dy, dz in ((-1, 0, 0), (1, 0, 0), (0, -1, 0), (0, 1, 0), (0, 0, 1)):
+                x, y, z = node.give_x() + dx, node.give_y() + dy, dz
+                if grid.in_bounds(x, y, z):
+                    cells.append(grid.index(x, y, z))
+        return cells
+
+    for k in range(len(netlist)):
+        field[access_cells(k)] = base[access_cells(k)] + access_cost
+
+    def rip_up(k: int) -> None:
+        """
+        Removes the wire of net k from the grid.
+        """
+        if wires[k] is not None:
+            grid.remove_wire(wires[k])
+            wires[k], paths[k] = None, None
+
+    def route(k: int) -> None:
+        """
+        Routes net k on the current negotiated cost field.
+        """
+        node1, node2 = nodes_list[netlist[k][0] - 1], nodes_list[netlist[k][1] - 1]
+        values = field + history + present * grid.flat_point_counts()
+        wires[k] = route_with_kernel(node1, node2, grid, heuristic=True, values=values.tolist())
+        if wires[k] is not None:
+            paths[k] = [grid.index(*point.give_place()) for point in wires[k].give_wirepoints()[1:-1]]
+        stats['routings'] += 1
+
+    for k in range(len(netlist)):
+        route(k)
+
+    best = None
+    for rounds in range(max_rounds + 1):
+        failed = sum(wire is None for wire in wires)
+        cost = grid.cost()
+        stats['cost_per_round'].append(cost)
+
+        # Fewest failed nets first, then the lowest cost
+        if best is None or (failed, cost) < best[:2]:
+            best = (failed, cost, list(paths))
+
+        point_counts = grid.flat_point_counts()
+        shared = (point_counts > 1) & ~node_cells
+        if (failed == 0 and not shared.any()) or rounds == max_rounds:
+            break
+
+        # Cells that stay shared get more expensive for good, the present cost rises every round
+        history[shared] += history_factor * (point_counts[shared] - 1)
+        present *= present_growth
+        stats['rounds'] += 1
+
+        # A net that could not be routed goes first, the wires around its nodes make way for it
+        # and the cells around its nodes get more expensive for the other nets
+        to_route = [k for k, wire in enumerate(wires) if wire is None]
+        for k in list(to_route):
+            cells = access_cells(k)
+            history[cells] += history_factor
+            for j, path in enumerate(paths):
+                if path is not None and not set(cells).isdisjoint(path):
+                    rip_up(j)
+                    to_route.append(j)
+
+        # Then every net that runs through a shared cell is routed again
+        for k, path in enumerate(paths):
+            if path is not None and shared[path].any():
+                rip_up(k)
+                to_route.append(k)
+
+        for k in dict.fromkeys(to_route):
+            route(k)
+
+    # Put the best solution back on the grid
+    failed, cost, best_paths = best
+    if best_paths != paths:
+        grid.clear_wires()
+        grid.apply_costs_around_nodes()
+        for k, path in enumerate(best_paths):
+            node1, node2 = nodes_list[netlist[k][0] - 1], nodes_list[netlist[k][1] - 1]
+            wires[k] = None if path is None else lay_wire(node1, node2, grid, path)
+
+    # The wires leave their penalties in the cost field, like the other routers do
+    grid.apply_costs_around_nodes()
+    for wire in wires:
+        if wire is not None:
+            grid.set_point_value(wire, 50)
+            grid.add_wire_list(wire)
+
+    return failed == 0, wires, stats
@@ -0,0 +1,145 @@
+import time
+
+from code.algorithms import dfs_algorithm, manhattan_wire
+from code.classes.grid_class import Grid_3D
+
+
+class OrderingTrie:
+    """
+    Prefix trie of orderings of the netlist. Every node is one connection, a path from the root
+    is a prefix that orderings share; the orderings that end in a node are kept in that node.
+    """
+    __slots__ = ('children', 'orderings')
+
+    def __init__(self) -> None:
+        self.children = {}
+        self.orderings = []
+
+
+    def add(self, ordering, index: int) -> None:
+        """
+        Adds an ordering, index is its position in the list of orderings.
+        """
+        node = self
+        for connection in ordering:
+            connection = tuple(connection)
+            child = node.children.get(connection)
+            if child is None:
+                child = node.children[connection] = OrderingTrie()
+            node = child
+        node.orderings.append(index)
+
+
+    def give_orderings(self) -> list[int]:
+        """
+        Returns the indices of all orderings below (and in) this node.
+        """
+        indices, stack = [], [self]
+        while stack:
+            node = stack.pop()
+            indices.extend(node.orderings)
+            stack.extend(node.children.values())
+        return indices
+
+
+def evaluate_orderings_trie(functie, orderings, nodes_list, grid: Grid_3D) -> tuple[list[tuple], int]:
+    """
+    Routes a batch of orderings, routing every shared prefix only once. The orderings are put in a
+    prefix trie that is walked depth first inside one grid transaction; where orderings branch off,
+    a snapshot is taken and every branch starts from it, by undoing the wires of the branch before.
+    The result is the same as routing each ordering with route_ordering(), as long as the router
+    only depends on the grid (A*, Lee, Manhattan).
+    Returns:
+      (results, routings), results holds (success, cost, wires) for every ordering in the given order
+    """
+    if functie == dfs_algorithm:
+        raise ValueError("DFS removes wires while routing, its orderings can't share prefixes.")
+
+    trie = OrderingTrie()
+    for index, ordering in enumerate(orderings):
+        if len(ordering) == 0:
+            raise ValueError("No netlist given.")
+        trie.add(ordering, index)
+
+    results = [None] * len(orderings)
+    routings = 0
+
+    grid.clear_wires()
+    grid.apply_costs_around_nodes()
+    grid.begin()
+
+    # Every frame is a trie node with its children, the next child to route and the snapshot
+    # of the grid at the node (only needed when there is more than one child)
+    frames = [[list(trie.children.items()), 0, grid.snapshot() if len(trie.children) > 1 else None]]
+    while frames:
+        frame = frames[-1]
+        children, position, snapshot = frame
+        if position == len(children):
+            frames.pop()
+            continue
+        if position > 0:
+            grid.restore(snapshot)
+        frame[1] += 1
+
+        (node1_id, node2_id), child = children[position]
+        wire = functie(nodes_list[node1_id - 1], nodes_list[node2_id - 1], grid)
+        routings += 1
+
+        # The Manhattan router always returns a wire, it counts its failures on the grid
+        if wire is None and functie != manhattan_wire:
+            for index in child.give_orderings():
+                results[index] = (False, None, None)
+            continue
+        grid.add_wire_list(wire)
+
+        for index in child.orderings:
+            success = functie != manhattan_wire or grid.failed_wires == 0
+            results[index] = (success, grid.cost() if success else None, list(grid.return_wire_list()) if success else None)
+
+        if child.children:
+            frames.append([list(child.children.items()), 0, grid.snapshot() if len(child.children) > 1 else None])
+
+    grid.commit()
+    return results, routings
+
+
+def run_multiple_runs_trie(
+    nodes_list,
+    grid,
+    cost_min,
+    successful_grid,
+    tries,
+    all_wire_runs,
+    functie,
+    sort,
+    checkpoint=None
+):
+    """
+    Executes multiple runs of the chosen algorithm, with the orderings in sort evaluated
+    together by evaluate_orderings_trie(). The results are handled in the order of sort,
+    like run_multiple_runs does. The best grid so far is kept on disk with checkpoint.
+    Returns:
+      (wires_cost_min, successful_grid, tries, cost_min)
+    """
+    wires_cost_min = None
+    start_time = time.time()
+    results, routings = evaluate_orderings_trie(functie, sort, nodes_list, grid)
+
+    for success, cost, wires in results:
+        if success:
+            all_wire_runs.append(wires)
+            successful_grid += 1
+            if cost_min > cost:
+                cost_min = cost
+                wires_cost_min = wires
+
+        tries += 1
+        print(f"Amount of solutions attempted: {tries} | Best cost so far: {cost_min}")
+        if checkpoint is not None:
+            checkpoint.update(wires_cost_min, cost_min)
+
+    total_routings = sum(len(ordering) for ordering in sort)
+    print(f"Routing the shared prefixes once took {time.time() - start_time:.2f} seconds, "
+          f"{routings} of {total_routings} net routings")
+
+    return wires_cost_min, successful_grid, tries, cost_min
@@ -0,0 +1,184 @@
+"""
+Saving and loading of solutions (the wires of a routed netlist).
+
+Two formats are supported, chosen by the extension of the file:
+- .csv, the output format of the course: a row "(a,b)","[(x,y,z),...]" per net and a last row
+  chip_<chip>_net_<netlist>,<cost>
+- .npz, compact numpy arrays: the points of all wires one after the other, the offset of every
+  wire in them, the node ids of every net and the chip, netlist and cost
+
+Run as a script to check a saved solution offline:
+    python -m code.solution solution.npz --plot
+"""
+import argparse
+import ast
+import csv
+import os
+import sys
+from collections import Counter
+
+import numpy as np
+
+from code.algorithms import lay_solution
+from code.classes.chip_class import ChipContext
+from code.classes.grid_class import LAYERS, Grid_3D, initialise_grid
+from code.classes.wire_class import Wire, WirePoint
+from code.imports import load_chip_context
+
+
+def wire_net(wire: Wire, context: ChipContext) -> tuple[int, int]:
+    """
+    Returns the node ids of the net a wire connects.
+    """
+    return (
+        context.give_node_id(wire.start_node.give_x(), wire.start_node.give_y()),
+        context.give_node_id(wire.end_node.give_x(), wire.end_node.give_y()),
+    )
+
+
+def save_solution(path: str, wires: list[Wire], context: ChipContext, chip, netlist, cost: int) -> None:
+    """
+    Saves the wires of a solution as .npz or (course) .csv, depending on the extension of path.
+    The file is written next to path first and then moved, so an existing file is never left half written.
+    """
+    temporary_path = path + '.tmp'
+    if path.endswith('.csv'):
+        with open(temporary_path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['net', 'wires'])
+            for wire in wires:
+                node1_id, node2_id = wire_net(wire, context)
+                points = ','.join(f"({x},{y},{z})" for x, y, z in (point.give_place() for point in wire.give_wirepoints()))
+                writer.writerow([f"({node1_id},{node2_id})", f"[{points}]"])
+            writer.writerow([f"chip_{chip}_net_{netlist}", cost])
+    else:
+        points = [point.give_place() for wire in wires for point in wire.give_wirepoints()]
+        lengths = [len(wire.give_wirepoints()) for wire in wires]
+        with open(temporary_path, 'wb') as file:
+            np.savez_compressed(
+                file,
+                points=np.array(points, dtype=np.int16).reshape(-1, 3),
+                offsets=np.concatenate(([0], np.cumsum(lengths))).astype(np.int64),
+                nets=np.array([wire_net(wire, context) for wire in wires], dtype=np.int32).reshape(-1, 2),
+                meta=np.array([int(chip), int(netlist), int(cost)], dtype=np.int64),
+            )
+    os.replace(temporary_path, path)
+
+
+def read_solution(path: str) -> tuple[int, int, int, list[tuple[tuple[int, int], list[tuple[int, int, int]]]]]:
+    """
+    Reads a file written by save_solution() (or any file in the course format).
+    Returns:
+      (chip, netlist, cost, [(net, points) per wire])
+    """
+    if path.endswith('.csv'):
+        with open(path, newline='') as file:
+            rows = [row for row in csv.reader(file) if row]
+        chip_net, cost = rows[-1]
+        _, chip, _, netlist = chip_net.split('_')
+        wires = [(ast.literal_eval(net), ast.literal_eval(points)) for net, points in rows[1:-1]]
+        return int(chip), int(netlist), int(cost), wires
+
+    with np.load(path) as data:
+        points, offsets, nets = data['points'].tolist(), data['offsets'].tolist(), data['nets'].tolist()
+        chip, netlist, cost = data['meta'].tolist()
+    wires = [
+        (tuple(nets[k]), [tuple(point) for point in points[offsets[k]:offsets[k + 1]]])
+        for k in range(len(nets))
+    ]
+    return chip, netlist, cost, wires
+
+
+def load_solution(path: str, base_path: str = os.path.join('.', 'gates_netlists'), layers: int = None) -> tuple[list[Wire], Grid_3D, dict]:
+    """
+    Loads a solution and lays its wires on a new grid of the chip. Without layers the grid
+    gets the usual amount of layers, or more if the wires go higher.
+    Returns:
+      (wires, grid, info), info holds the chip, netlist and the cost stored in the file
+    """
+    chip, netlist, cost, saved_wires = read_solution(path)
+    context = load_chip_context(
+        os.path.join(base_path, f'chip_{chip}', f'print_{chip}.csv'),
+        os.path.join(base_path, f'chip_{chip}', f'netlist_{netlist}.csv'),
+    )
+    if layers is None:
+        layers = max([LAYERS] + [z + 1 for _, points in saved_wires for _, _, z in points])
+    grid, _, _ = initialise_grid(context, 'a', layers)
+
+    wires = []
+    for (node1_id, node2_id), points in saved_wires:
+        wire = Wire(start_node=context.give_node(node1_id), end_node=context.give_node(node2_id), context=context)
+        for point in points[1:-1]:
+            wire.add_wire_point(WirePoint(*point))
+        wires.append(wire)
+    lay_solution(wires, grid)
+
+    return wires, grid, {'chip': chip, 'netlist': netlist, 'cost': cost}
+
+
+def check_solution(wires: list[Wire], grid: Grid_3D) -> list[str]:
+    """
+    Checks that the wires laid on the grid form a valid solution: every net of the netlist has
+    exactly one wire, wires only take unit steps inside the grid, don't run through other nodes
+    and don't share segments.
+    Returns:
+      a description per problem, empty if the solution is valid
+    """
+    context = grid.give_context()
+    node_cells = grid.node_cell_lookup()
+    problems = []
+
+    nets = [wire_net(wire, context) for wire in wires]
+    wire_counts = Counter(tuple(sorted(net)) for net in nets)
+    for net in context.give_netlist():
+        count = wire_counts.pop(tuple(sorted(net)), 0)
+        if count != 1:
+            problems.append(f"net {tuple(net)} has {count} wires")
+    for net in wire_counts:
+        problems.append(f"wire {net} is not a net of the netlist")
+
+    segments = set()
+    for wire, net in zip(wires, nets):
+        wirepoints = wire.give_wirepoints()
+        for point in wirepoints[1:-1]:
+            if not grid.in_bounds(*point.give_place()):
+                problems.append(f"wire {net} leaves the grid at {point.give_place()}")
+            elif node_cells[grid.index(*point.give_place())]:
+                problems.append(f"wire {net} runs through a node at {point.give_place()}")
+        for i in range(len(wirepoints) - 1):
+            edge = grid.edge_index(*wirepoints[i].give_place(), *wirepoints[i + 1].give_place())
+            if edge < 0:
+                problems.append(f"wire {net} jumps from {wirepoints[i].give_place()} to {wirepoints[i + 1].give_place()}")
+            elif edge in segments:
+                problems.append(f"wire {net} shares the segment from {wirepoints[i].give_place()} to {wirepoints[i + 1].give_place()}")
+            segments.add(edge)
+    return problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check (and plot) a saved solution.")
+    parser.add_argument('path', help="solution file (.npz or .csv)")
+    parser.add_argument('--plot', action='store_true', help="plot the wires")
+    args = parser.parse_args(argv)
+
+    wires, grid, info = load_solution(args.path)
+    problems = check_solution(wires, grid)
+
+    # Recounted from the grid, not taken from the running totals
+    lines = sum(len(wire.give_wirepoints()) - 1 for wire in wires)
+    cost = lines + 300 * grid.count_intersections()
+
+    print(f"Chip {info['chip']}, netlist {info['netlist']}: {len(wires)} wires, cost {cost} (stored: {info['cost']})")
+    for problem in problems:
+        print(f"Invalid: {problem}")
+    if not problems:
+        print("The solution is valid.")
+
+    if args.plot:
+        from code.visualisation.visualisation import plot_wires_3d
+        plot_wires_3d(wires, grid.n, grid.m, grid.height)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,259 @@
+"""
+Speculative routing of the nets of one ordering in parallel.
+
+Worker processes search the next nets of the ordering, each on its own copy of the grid with the
+wires that were laid when the search was handed out, while the calling process lays the nets in
+the order of the ordering. A search only reads the cells it expanded, their neighbours and the
+neighbours of its end, so its path is still exact if the wires laid since it was handed out stay
+clear of those cells; such a path is laid as it is. Every other net is routed on the grid itself,
+also when its search isn't back yet: the calling process never waits for a worker. So the wires
+are always those of routing the nets one by one, see route_ordering().
+"""
+import itertools
+
+import numpy as np
+
+from code.algorithms import KERNEL_ROUTERS, a_star_algorithm, bidirectional_a_star_algorithm, kernel_path, lay_wire, lee_algorithm
+from code.classes.chip_class import ChipContext
+from code.classes.grid_class import LAYERS, Grid_3D, initialise_grid
+from code.classes.wire_class import Wire
+
+# The search of every router of the search kernel: (heuristic, bidirectional) of kernel_path()
+SEARCHES = {
+    a_star_algorithm: (True, False),
+    lee_algorithm: (False, False),
+    bidirectional_a_star_algorithm: (True, True),
+}
+
+
+def _speculative_worker(connection, context: ChipContext, algorithm: str, functie, layers: int, backend: str,
+                        buckets: bool) -> None:
+    """
+    Searches nets on a private grid until it receives None. A message holds the ordering it belongs
+    to, whether that ordering starts on a cleared grid (see SpeculativeRouter.begin_ordering()), the
+    wires laid since the last message of the ordering, and the position and nodes of the net.
+    The grid is kept in a transaction, so a new ordering starts by rolling back to the grid of
+    initialise_grid().
+    """
+    grid, _, _ = initialise_grid(context, algorithm, layers, backend)
+    nodes_list = context.give_nodes()
+    kernel = grid.give_search_kernel()
+    kernel.use_buckets = buckets
+    kernel.expanded = []
+    heuristic, bidirectional = SEARCHES[functie]
+    token = None
+    grid.begin()
+
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        ordering_token, cleared, new_wires, position, node1_id, node2_id = message
+
+        if ordering_token != token:
+            token = ordering_token
+            grid.rollback()
+            grid.begin()
+            if cleared:
+                grid.clear_wires()
+                grid.apply_costs_around_nodes()
+        for laid_node1_id, laid_node2_id, path in new_wires:
+            grid.add_wire_list(lay_wire(nodes_list[laid_node1_id - 1], nodes_list[laid_node2_id - 1], grid, path))
+
+        # Bidirectional A* also reads the cheapest value of the cost field
+        field_min = grid.value_bounds()[0] if bidirectional else None
+        path = kernel_path(nodes_list[node1_id - 1], nodes_list[node2_id - 1], grid, heuristic, bidirectional)
+        connection.send((token, position, path, np.array(kernel.expanded, dtype=np.int32), field_min))
+        kernel.expanded.clear()
+    connection.close()
+
+
+class SpeculativeRouter:
+    """
+    Routes the nets of orderings with Lee, A* or bidirectional A*, while worker processes search the
+    next nets of the ordering. Use it as a context manager, or close() it, to stop the workers.
+    An ordering is started with begin_ordering(), after which route_net() routes its nets in order.
+    """
+    def __init__(self, context: ChipContext, algorithm: str, functie, workers: int,
+                 layers: int = LAYERS, backend: str = 'dense', buckets: bool = False) -> None:
+        if functie not in KERNEL_ROUTERS:
+            raise ValueError("Speculative routing works for Lee, A* and bidirectional A* only.")
+        if workers < 1:
+            raise ValueError("Speculative routing needs at least one worker.")
+
+        # Imported here, like the process pool of code/parallel.py most runs don't need it
+        import multiprocessing
+
+        self.functie = functie
+        self.workers = workers
+        self._bidirectional = SEARCHES[functie][1]
+        self._nodes = context.give_nodes()
+        self._connections = []
+        self._processes = []
+        for _ in range(workers):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_speculative_worker,
+                args=(worker_connection, context, algorithm, functie, layers, backend, buckets),
+                daemon=True,
+            )
+            process.start()
+            worker_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+        # Per worker: (ordering, position, wires laid) of the search it is doing, and
+        # (ordering, wires laid) of its grid
+        self._jobs = [None] * workers
+        self._worker_grids = [None] * workers
+        self._tokens = itertools.count()
+        self._token = None
+
+        # Statistics over all orderings: searches handed out, paths laid as they were searched and
+        # searches that came back but were crossed by a wire laid after they were handed out
+        self.speculated = 0
+        self.used = 0
+        self.conflicts = 0
+
+
+    def __enter__(self) -> 'SpeculativeRouter':
+        return self
+
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+    def close(self) -> None:
+        """
+        Stops the worker processes.
+        """
+        for w, connection in enumerate(self._connections):
+            # A worker that is still sending its last path has to be read first, or it never stops
+            if self._jobs[w] is not None:
+                connection.recv()
+            connection.send(None)
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections, self._processes = [], []
+
+
+    def begin_ordering(self, ordering, grid: Grid_3D, cleared: bool = True) -> None:
+        """
+        Starts routing an ordering on the grid. With cleared the grid was just cleared and got the
+        cost field of apply_costs_around_nodes(), otherwise it is the grid of initialise_grid().
+        Searches of an earlier ordering that are still running are dropped when they come back.
+        """
+        if not cleared and grid.return_wire_list():
+            raise ValueError("The grid already has wires, route on a cleared grid.")
+        self._token = next(self._tokens)
+        self._ordering = ordering
+        self._grid = grid
+        self._cleared = cleared
+        self._position = 0
+        self._next_position = 1
+        self._results = {}
+        self._laid = [] # (node1_id, node2_id, path) of every laid wire, the workers lay them as well
+
+        # Per cell the last laid wire that runs through it or next to it, -1 if none
+        if getattr(self, '_touched', None) is None or len(self._touched) != grid.size:
+            self._touched = np.empty(grid.size, dtype=np.int32)
+            offsets = [0, 1, -1, grid.height, -grid.height, grid.m * grid.height, -grid.m * grid.height]
+            self._offsets = np.array(offsets, dtype=np.int64)
+        self._touched.fill(-1)
+
+
+    def route_net(self, position: int) -> Wire|None:
+        """
+        Routes the net at a position of the ordering (in order) and lays its wire on the grid.
+        Returns:
+          the wire, or None if the net can't be routed
+        """
+        grid = self._grid
+        self._position = position
+        self._collect()
+        self._hand_out()
+
+        node1_id, node2_id = self._ordering[position]
+        node1, node2 = self._nodes[node1_id - 1], self._nodes[node2_id - 1]
+
+        result = self._results.pop(position, None)
+        if result is not None:
+            path, expanded, field_min, laid = result
+            end = grid.index(node2.give_x(), node2.give_y(), node2.give_z())
+            touched = self._touched
+            if touched[end] < laid and (len(expanded) == 0 or touched[expanded].max() < laid) and \
+                    (not self._bidirectional or field_min == grid.value_bounds()[0]):
+                self.used += 1
+                if path is None:
+                    return None
+                wire = lay_wire(node1, node2, grid, path)
+                self._mark(wire, path)
+                return wire
+            self.conflicts += 1
+
+        wire = self.functie(node1, node2, grid)
+        if wire is not None:
+            self._mark(wire, [grid.index(*point.give_place()) for point in wire.give_wirepoints()[1:-1]])
+        return wire
+
+
+    def _mark(self, wire: Wire, path: list[int]) -> None:
+        """
+        Records a laid wire: it is sent to the workers, and its cells and their neighbours are touched.
+        """
+        node1_id, node2_id = self._ordering[self._position]
+        number = len(self._laid)
+        self._laid.append((node1_id, node2_id, path))
+
+        grid = self._grid
+        cells = np.array([grid.index(*point.give_place()) for point in wire.give_wirepoints()], dtype=np.int64)
+        cells = (cells[:, None] + self._offsets[None, :]).reshape(-1)
+        self._touched[cells[(cells >= 0) & (cells < grid.size)]] = number
+
+
+    def _collect(self) -> None:
+        """
+        Reads the searches that came back, without waiting for the others.
+        """
+        for w, job in enumerate(self._jobs):
+            if job is None or not self._connections[w].poll():
+                continue
+            token, position, path, expanded, field_min = self._connections[w].recv()
+            self._jobs[w] = None
+            if token == self._token and position >= self._position:
+                self._results[position] = (path, expanded, field_min, job[2])
+
+
+    def _hand_out(self) -> None:
+        """
+        Hands the next nets of the ordering, at most one per worker ahead, to the idle workers.
+        """
+        ordering = self._ordering
+        last = min(self._position + self.workers, len(ordering) - 1)
+        for w, job in enumerate(self._jobs):
+            if self._next_position > last:
+                break
+            if job is not None:
+                continue
+
+            # A worker that searched for another ordering starts over on the grid of this one
+            worker_grid = self._worker_grids[w]
+            new_wires = self._laid if worker_grid is None or worker_grid[0] != self._token else self._laid[worker_grid[1]:]
+            position = self._next_position
+            node1_id, node2_id = ordering[position]
+            self._connections[w].send((self._token, self._cleared, new_wires, position, node1_id, node2_id))
+
+            self._jobs[w] = (self._token, position, len(self._laid))
+            self._worker_grids[w] = (self._token, len(self._laid))
+            self._next_position += 1
+            self.speculated += 1
+
+
+    def give_stats(self) -> dict:
+        """
+        Returns the searches that were handed out, the paths that were laid as they were searched and
+        the searches that were crossed by a wire laid later.
+        """
+        return {'speculated': self.speculated, 'used': self.used, 'conflicts': self.conflicts}
@@ -1,10 +1,12 @@
 from code.classes.wire_class import Wire
-import matplotlib.pyplot as plt
 
-def plot_wires_3d(wires: list[Wire], grid_width: int, grid_height: int):
+def plot_wires_3d(wires: list[Wire], grid_width: int, grid_height: int, layers: int = 8):
     """
     A function used to plot the wires of the grid in 3D.
+    Matplotlib is imported on the first plot, so runs that don't plot don't load it.
     """
+    import matplotlib.pyplot as plt
+
     fig = plt.figure()
     ax = fig.add_subplot(111, projection='3d')
 
@@ -18,7 +20,7 @@ def plot_wires_3d(wires: list[Wire], grid_width: int, grid_height: int):
 
     ax.set_xlim(0, grid_width)
     ax.set_ylim(0, grid_height)
-    ax.set_zlim(0, 7)
+    ax.set_zlim(0, layers - 1)
 
     ax.set_xlabel('X')
     ax.set_ylabel('Y')
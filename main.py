@@ -1,104 +1,164 @@
+import argparse
 import os
-import time
 
-from code.classes.grid_class import initialise_grid
-from code.imports import import_netlist, import_nodes
-from code.visualisation.visualisation import plot_wires_3d
+from code.api import route
 from code.functions import (
     get_singular_multiple,
     get_netlist,
     get_algorithms,
-    get_sorting_method,
+    get_sorting_answer,
+    find_chip,
+    choose_algorithm,
+    give_q_table,
 )
-from code.engine import run_multiple_runs, run_single_run
+from code.algorithms import KERNEL_ROUTERS
+from code.classes.grid_class import LAYERS, BACKENDS
+from code.classes.qtable_class import QTable
+from code.pathfinder import pathfinder_routing
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Route the netlists of a chip. Settings that are not given are asked for.")
+    parser.add_argument('--iterations', type=int, default=None,
+                        help="amount of orderings to try, 1 is a single run (PathFinder: maximum amount of rounds)")
+    parser.add_argument('--netlist', default=None,
+                        help="netlist to route (1-9, or the number of a generated netlist in --base-path)")
+    parser.add_argument('--base-path', default=os.path.join('.', 'gates_netlists'), metavar='PATH',
+                        help="directory with the chip_<number> directories (default: ./gates_netlists)")
+    parser.add_argument('--algorithm', default=None,
+                        help="Manhattan (m), Depth First (d), Lee (l), A* (a), Bidirectional A* (b) or PathFinder (p)")
+    parser.add_argument('--sort', default=None,
+                        help="sorting method: Random (r), Q-Learning (q, multiple runs only), Busy nodes (b) or Distance of a connection (d)")
+    parser.add_argument('--headless', action='store_true',
+                        help="don't plot the wires (matplotlib is not imported)")
+    parser.add_argument('--save', default=None, metavar='PATH',
+                        help="save the best grid, as .npz or in the csv format of the course (.csv)")
+    parser.add_argument('--checkpoint', default=None, metavar='PATH',
+                        help="keep the best grid so far of a multiple run in this file (.npz or .csv)")
+    parser.add_argument('--checkpoint-interval', type=float, default=60, metavar='SECONDS',
+                        help="write the checkpoint at most once per interval (default: 60)")
+    parser.add_argument('--resume', default=None, metavar='PATH',
+                        help="start a multiple run from the grid in a checkpoint or saved grid (.npz or .csv)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of processes that route the orderings of a multiple run, not with Q-learning (default: 1)")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="seed for the random orderings and the workers, makes runs reproducible")
+    parser.add_argument('--prune', action='store_true',
+                        help="Lee, A* and bidirectional A*: abandon orderings that can no longer beat the best grid so far (not with --workers or --share-prefixes)")
+    parser.add_argument('--share-prefixes', action='store_true',
+                        help="route the prefixes that orderings share only once (A*, Lee, bidirectional A* and Manhattan)")
+    parser.add_argument('--anneal', type=int, default=0, metavar='ITERATIONS',
+                        help="improve the best grid of a multiple run with simulated annealing (default: off)")
+    parser.add_argument('--anneal-time', type=float, default=None, metavar='SECONDS',
+                        help="time limit of the simulated annealing")
+    parser.add_argument('--q-table', default=None, metavar='PATH',
+                        help="Q-learning: load the Q-table from this file if it exists and save it after the run")
+    parser.add_argument('--q-max-states', type=int, default=None,
+                        help="Q-learning: maximum amount of states kept in the Q-table (default: 10000, or that of the loaded table)")
+    parser.add_argument('--q-compact', action='store_true', default=None,
+                        help="Q-learning: store states as a hash of the ordering instead of the ordering")
+    parser.add_argument('--dfs-nodes', type=int, default=1000,
+                        help="DFS: maximum amount of net routings of the backtracking search per ordering (default: 1000)")
+    parser.add_argument('--dfs-depth', type=int, default=None,
+                        help="DFS: maximum amount of backjumps on the search path (default: no limit)")
+    parser.add_argument('--buckets', action='store_true',
+                        help="Lee: queue the search in a bucket queue instead of a heap, the wires are the same")
+    parser.add_argument('--speculative', type=int, default=0, metavar='WORKERS',
+                        help="Lee, A* and bidirectional A*: processes that search the next nets of an ordering ahead, the wires are the same (not with --workers or --share-prefixes)")
+    parser.add_argument('--layers', type=int, default=LAYERS,
+                        help=f"layers of the grid, including the base layer (default: {LAYERS})")
+    parser.add_argument('--backend', default='dense', choices=BACKENDS,
+                        help="storage of the wires on the grid, sparse stores only the occupied cells (default: dense)")
+    return parser.parse_args()
+
 
 def main():
-    # Setup
-    iter = get_singular_multiple()
-    chip, netlist = get_netlist()
-    functie, algorithm = get_algorithms()
-
-    base_path = os.path.join('.', 'gates_netlists')
-    nodes_csv_path = os.path.join(base_path, f'chip_{chip}', f'print_{chip}.csv')
-    netlist_csv_path = os.path.join(base_path, f'chip_{chip}', f'netlist_{netlist}.csv')
-
-    nodes_list = import_nodes(nodes_csv_path)
-    netlist = import_netlist(netlist_csv_path)
-
-    grid, grid_width, grid_length = initialise_grid(
-        nodes_list, 
-        nodes_csv_path, 
-        algorithm, 
-        netlist_csv_path
-    )
+    args = parse_arguments()
+
+    # Setup, the settings that are not given on the command line are asked for
+    iter = args.iterations if args.iterations is not None else get_singular_multiple()
+    if iter < 1:
+        raise SystemExit("The amount of iterations must be positive.")
+
+    if args.prune and (args.share_prefixes or args.workers > 1):
+        raise SystemExit("--prune can't be combined with --workers or --share-prefixes.")
+    if args.speculative < 0:
+        raise SystemExit("The amount of speculative workers can't be negative.")
+    if args.speculative > 0 and (args.share_prefixes or args.workers > 1):
+        raise SystemExit("--speculative can't be combined with --workers or --share-prefixes.")
+
+    if args.resume is not None and not os.path.exists(args.resume):
+        raise SystemExit(f"{args.resume} does not exist.")
+
+    if args.netlist is not None:
+        if find_chip(args.netlist, args.base_path) is None:
+            raise SystemExit(f"Netlist {args.netlist} does not exist in {args.base_path}.")
+        netlist = args.netlist
+    else:
+        _, netlist = get_netlist()
 
-    # Get sorting method
-    sort = get_sorting_method(netlist, nodes_list, iter)
-
-    # Set variables to keep score of successful grids
-    all_wire_runs = []
-    successful_grid = 0
-    tries = 0
-    cost_min = float('inf')
-
-    total_start_time = time.time()
-    print("Starting algorithm...")
-
-    # -----------------------------------------------------------
-    # Multiple runs
-    # -----------------------------------------------------------
-    if iter > 1:
-        # Run multiple iterations
-        wires_cost_min, successful_grid, tries, cost_min = run_multiple_runs(
-            iter,
-            netlist,
-            nodes_list,
-            grid,
-            cost_min,
-            successful_grid,
-            tries,
-            all_wire_runs,
-            nodes_csv_path,
-            netlist_csv_path,
-            functie, 
-            sort
-        )
-
-        # After all iterations
-        total_end_time = time.time()
-        total_time = total_end_time - total_start_time
-        print(f"Total time for {iter} iterations: {total_time:.2f} seconds")
-
-        if tries > 0:
-            success_percentage = (successful_grid / tries) * 100
-            print(f"{success_percentage}% of the grids were successful")
-
-        if successful_grid >= 1:
-            print(f"The grid with minimal cost costs: {cost_min}")
-            plot_wires_3d(wires_cost_min, grid_width, grid_length)
-        else:
-            print("No successful grid found.")
-
-    # -----------------------------------------------------------
-    # Single run
-    # -----------------------------------------------------------
+    if args.algorithm is not None:
+        if choose_algorithm(args.algorithm) is None:
+            raise SystemExit(f"Unknown algorithm: {args.algorithm}")
+        algorithm = args.algorithm
     else:
-        single_run_start_time = time.time()
-
-        run_single_run(
-            functie,
-            netlist,
-            nodes_list,
-            grid,
-            grid_width,
-            grid_length,
-            nodes_csv_path,
-            netlist_csv_path,
-        )
-
-        single_run_end_time = time.time()
-        single_run_time = single_run_end_time - single_run_start_time
-        print(f"Single run took {single_run_time:.2f} seconds")
+        _, algorithm = get_algorithms()
+
+    if args.resume is not None and (iter == 1 or choose_algorithm(algorithm) == pathfinder_routing):
+        raise SystemExit("--resume only continues a multiple run (--iterations above 1) of an ordering based algorithm, not PathFinder.")
+
+    if args.prune and choose_algorithm(algorithm) not in KERNEL_ROUTERS:
+        raise SystemExit("--prune only works for Lee, A* and bidirectional A*.")
+    if args.speculative > 0 and choose_algorithm(algorithm) not in KERNEL_ROUTERS:
+        raise SystemExit("--speculative only works for Lee, A* and bidirectional A*.")
+
+    # PathFinder settles the order of the nets itself
+    sort = args.sort
+    if sort is None and choose_algorithm(algorithm) != pathfinder_routing:
+        sort = get_sorting_answer(iter)
+
+    q_learning = sort is not None and sort.lower().startswith('q') and iter > 1
+    if q_learning and args.workers > 1:
+        raise SystemExit("Q-learning can't be combined with --workers, it changes its orderings while running.")
+    q_table = None
+    if q_learning:
+        try:
+            if args.q_table is not None and os.path.exists(args.q_table):
+                q_table = QTable.load(args.q_table, args.q_max_states, args.q_compact)
+            else:
+                q_table = QTable(args.q_max_states if args.q_max_states is not None else 10000, bool(args.q_compact))
+        except ValueError as error:
+            raise SystemExit(str(error))
+
+    route(
+        None,
+        netlist,
+        algorithm,
+        sort if sort is not None else 'r',
+        iter,
+        seed=args.seed,
+        workers=args.workers,
+        prune=args.prune,
+        share_prefixes=args.share_prefixes,
+        anneal=args.anneal,
+        anneal_time=args.anneal_time,
+        q_table=q_table,
+        dfs_nodes=args.dfs_nodes,
+        dfs_depth=args.dfs_depth,
+        buckets=args.buckets,
+        speculative=args.speculative,
+        save=args.save,
+        checkpoint=args.checkpoint,
+        checkpoint_interval=args.checkpoint_interval,
+        resume=args.resume,
+        layers=args.layers,
+        backend=args.backend,
+        base_path=args.base_path,
+        plot=not args.headless,
+        verbose=True,
+    )
+
+    if q_learning and args.q_table is not None:
+        give_q_table().save(args.q_table)
 
 if __name__ == "__main__":
     main()
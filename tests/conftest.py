@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from code.imports import load_chip_context
+
+BASE_PATH = os.path.join(os.path.dirname(__file__), '..', 'gates_netlists')
+
+
+@pytest.fixture
+def base_path():
+    """
+    Returns the directory with the chips of the course.
+    """
+    return BASE_PATH
+
+
+@pytest.fixture
+def load_netlist():
+    """
+    Returns a function that loads the chip context of a netlist (1-9) of the course.
+    """
+    def load(netlist: int):
+        chip = (netlist - 1) // 3
+        return load_chip_context(
+            os.path.join(BASE_PATH, f'chip_{chip}', f'print_{chip}.csv'),
+            os.path.join(BASE_PATH, f'chip_{chip}', f'netlist_{netlist}.csv'),
+        )
+    return load
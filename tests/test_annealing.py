@@ -0,0 +1,64 @@
+"""
+Tests of the simulated-annealing post-optimiser.
+
+Run from the main directory:
+    python -m pytest -q
+"""
+import pytest
+
+from code.algorithms import a_star_algorithm
+from code.annealing import simulated_annealing
+from code.classes.grid_class import BACKENDS, initialise_grid
+from code.engine import route_ordering
+
+
+def routed_grid(context, backend: str = 'dense'):
+    """
+    Returns a grid with every net of the context routed by A*, and its wires.
+    """
+    grid, _, _ = initialise_grid(context, 'a', backend=backend)
+    success, wires = route_ordering(a_star_algorithm, list(context.give_netlist()), context.give_nodes(), grid)
+    assert success
+    return grid, wires
+
+
+def places(wires) -> list:
+    """
+    Returns the coordinates of the wirepoints of every wire.
+    """
+    return [[point.give_place() for point in wire.give_wirepoints()] for wire in wires]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('legal_only', [True, False])
+def test_annealing_keeps_the_best_solution(load_netlist, backend, legal_only):
+    grid, wires = routed_grid(load_netlist(3), backend)
+    start_cost = grid.cost()
+
+    best_wires, stats = simulated_annealing(wires, grid, iterations=200, legal_only=legal_only, seed=1)
+    assert stats['start_cost'] == start_cost
+    assert stats['iterations'] == 200
+    assert stats['cost'] <= start_cost
+
+    # The best solution is complete and lies on the grid, the totals match a recount
+    assert len(best_wires) == len(wires) and None not in best_wires
+    assert places(grid.return_wire_list()) == places(best_wires)
+    assert grid.cost() == stats['cost']
+    assert grid.cost() == sum(len(wire.give_wirepoints()) - 1 for wire in best_wires) + 300 * grid.count_intersections()
+    assert grid.count_intersections() == grid.total_intersections()
+
+
+def test_annealing_is_reproducible(load_netlist):
+    context = load_netlist(2)
+    results = []
+    for _ in range(2):
+        grid, wires = routed_grid(context)
+        best_wires, stats = simulated_annealing(wires, grid, iterations=100, seed=7)
+        results.append((places(best_wires), stats['cost'], stats['accepted']))
+    assert results[0] == results[1]
+
+
+def test_annealing_needs_a_budget(load_netlist):
+    grid, wires = routed_grid(load_netlist(1))
+    with pytest.raises(ValueError):
+        simulated_annealing(wires, grid, iterations=None, time_limit=None)
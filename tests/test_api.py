@@ -0,0 +1,25 @@
+"""
+Tests of route(): the combinations of options it rejects and the grid it returns.
+
+Run from the main directory:
+    python -m pytest -q
+"""
+import pytest
+
+from code.api import route
+
+
+def test_q_learning_with_workers_is_rejected(base_path):
+    with pytest.raises(ValueError, match="Q-learning"):
+        route(None, 1, 'a', 'q', 4, workers=2, base_path=base_path)
+
+
+@pytest.mark.parametrize('options', [
+    {}, {'workers': 2}, {'share_prefixes': True}, {'prune': True}, {'anneal': 20},
+])
+def test_result_grid_holds_the_best_wires(base_path, options):
+    result = route(None, 4, 'a', 'r', 6, seed=4, base_path=base_path, **options)
+    assert result.success
+    places = [[point.give_place() for point in wire.give_wirepoints()] for wire in result.wires]
+    assert [[point.give_place() for point in wire.give_wirepoints()] for wire in result.grid.return_wire_list()] == places
+    assert result.grid.cost() == result.cost
@@ -0,0 +1,46 @@
+"""
+Tests of the dense and sparse backends of Grid_3D.
+
+Run from the main directory:
+    python -m pytest -q
+"""
+import numpy as np
+import pytest
+
+from code.algorithms import a_star_algorithm, bidirectional_a_star_algorithm, dfs_algorithm, lee_algorithm, manhattan_wire
+from code.classes.grid_class import BACKENDS, initialise_grid
+from code.engine import route_ordering
+
+
+@pytest.mark.parametrize('netlist', [1, 2, 4])
+@pytest.mark.parametrize('functie', [manhattan_wire, dfs_algorithm, lee_algorithm, a_star_algorithm, bidirectional_a_star_algorithm])
+def test_backends_route_the_same(load_netlist, netlist, functie):
+    context = load_netlist(netlist)
+    nodes = context.give_nodes()
+    ordering = list(context.give_netlist())
+
+    results = []
+    for backend in BACKENDS:
+        grid, _, _ = initialise_grid(context, 'a', backend=backend)
+        success, wires = route_ordering(functie, ordering, nodes, grid)
+        results.append((
+            success, grid.cost(), [[point.give_place() for point in wire.give_wirepoints()] for wire in wires],
+            grid.flat_values().tolist(), grid.flat_point_counts().tolist(), grid.value_bounds(),
+        ))
+    assert results[0] == results[1]
+
+
+def test_sparse_grid_stores_only_what_differs(load_netlist):
+    context = load_netlist(4)
+    grid, _, _ = initialise_grid(context, 'a', backend='sparse')
+    success, wires = route_ordering(a_star_algorithm, list(context.give_netlist()), context.give_nodes(), grid)
+    assert success
+
+    # The point counts hold the cells of the wires, the cost field the rings and the wire penalties
+    wire_cells = {point.give_place() for wire in wires for point in wire.give_wirepoints()[:-1]}
+    assert len(grid.point_count_lookup()) <= len(wire_cells)
+    assert len(grid.grid_values) < grid.size / 2
+    values = grid.flat_values()
+    stored = np.zeros(grid.size, dtype=bool)
+    stored[list(grid.grid_values.keys())] = True
+    assert all(values[index] == grid.grid_values.base_value(index) for index in np.flatnonzero(~stored)[::97])
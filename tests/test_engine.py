@@ -0,0 +1,86 @@
+"""
+Tests of the multiple runs of the engine.
+
+Run from the main directory:
+    python -m pytest -q
+"""
+import contextlib
+import io
+import random
+
+import pytest
+
+from code.algorithms import a_star_algorithm, lee_algorithm
+from code.api import route
+from code.classes.grid_class import initialise_grid
+from code.engine import remaining_lengths, run_multiple_runs
+
+
+def multiple_runs(context, functie, orderings, prune_stats=None) -> tuple:
+    """
+    Routes the orderings in a multiple run, without its output.
+    Returns:
+      (wires_cost_min, successful_grid, tries, cost_min)
+    """
+    grid, _, _ = initialise_grid(context, 'a')
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run_multiple_runs(
+            len(orderings), list(context.give_netlist()), context.give_nodes(), grid, float('inf'), 0, 0, [],
+            functie, orderings, prune_stats=prune_stats
+        )
+
+
+def random_orderings(context, amount: int, seed: int) -> list:
+    rng = random.Random(seed)
+    netlist = list(context.give_netlist())
+    return [rng.sample(netlist, len(netlist)) for _ in range(amount)]
+
+
+def test_remaining_lengths_sum_the_distances_after_a_position(load_netlist):
+    context = load_netlist(1)
+    nodes = context.give_nodes()
+    ordering = list(context.give_netlist())
+    distances = [
+        abs(nodes[a - 1].give_x() - nodes[b - 1].give_x()) + abs(nodes[a - 1].give_y() - nodes[b - 1].give_y())
+        for a, b in ordering
+    ]
+    assert remaining_lengths(ordering, nodes) == [sum(distances[position + 1:]) for position in range(len(ordering))]
+
+
+@pytest.mark.parametrize('netlist', [2, 4])
+@pytest.mark.parametrize('functie', [a_star_algorithm, lee_algorithm])
+def test_pruning_finds_the_same_best_grid(load_netlist, netlist, functie):
+    context = load_netlist(netlist)
+    orderings = random_orderings(context, 20, netlist)
+    prune_stats = {'pruned_orderings': 0, 'skipped_routings': 0}
+
+    full = multiple_runs(context, functie, orderings)
+    pruned = multiple_runs(context, functie, orderings, prune_stats)
+    assert pruned[3] == full[3]
+    assert pruned[2] == full[2] == len(orderings)
+    assert prune_stats['pruned_orderings'] > 0
+    assert prune_stats['skipped_routings'] > 0
+    assert pruned[1] <= full[1]
+
+
+def test_finished_ordering_that_ties_is_not_pruned(load_netlist):
+    context = load_netlist(1)
+    ordering = list(context.give_netlist())
+    prune_stats = {'pruned_orderings': 0, 'skipped_routings': 0}
+
+    # The second run routes the same grid, it ties the best cost after its last net
+    _, successful_grid, tries, _ = multiple_runs(context, a_star_algorithm, [ordering, ordering], prune_stats)
+    assert (successful_grid, tries) == (2, 2)
+    assert prune_stats['pruned_orderings'] == 0
+
+
+def test_pruned_orderings_count_as_tries(base_path):
+    result = route(None, 4, 'a', 'r', 20, seed=2, prune=True, base_path=base_path)
+    assert result.tries == 20
+    assert result.stats['pruned_orderings'] + result.successful <= result.tries
+
+
+@pytest.mark.parametrize('algorithm', ['m', 'd', 'p'])
+def test_pruning_is_rejected_for_other_routers(base_path, algorithm):
+    with pytest.raises(ValueError, match="Pruning"):
+        route(None, 1, algorithm, 'r', 4, prune=True, base_path=base_path)
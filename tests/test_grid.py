@@ -0,0 +1,114 @@
+"""
+Tests of the transactions and running cost totals of Grid_3D on both backends.
+
+Run from the main directory (the package is called code, like a module of the standard library):
+    python -m pytest -q
+"""
+import random
+
+import pytest
+
+from code.algorithms import a_star_algorithm, bidirectional_a_star_algorithm, lee_algorithm, manhattan_wire
+from code.classes.grid_class import BACKENDS, initialise_grid
+from code.engine import route_ordering
+
+
+def grid_state(grid) -> tuple:
+    """
+    Returns everything a rollback has to restore.
+    """
+    return (
+        grid.flat_point_counts().tolist(),
+        grid.flat_values().tolist(),
+        grid.flat_edges().tolist(),
+        [id(wire) for wire in grid.return_wire_list()],
+        grid.cost(),
+        grid.total_intersections(),
+    )
+
+
+def check_invariants(grid) -> None:
+    """
+    Checks the running totals and cached bounds against a recount.
+    """
+    assert grid.count_intersections() == grid.total_intersections()
+    values = grid.flat_values()
+    assert grid.value_bounds() == (values.min(), values.max())
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('seed', range(4))
+def test_rollback_restores_the_grid(load_netlist, backend, seed):
+    rng = random.Random(seed)
+    context = load_netlist(2)
+    nodes = context.give_nodes()
+    netlist = list(context.give_netlist())
+    routers = (a_star_algorithm, lee_algorithm, bidirectional_a_star_algorithm)
+
+    grid, _, _ = initialise_grid(context, 'a', backend=backend)
+    grid.apply_costs_around_nodes()
+    for node1_id, node2_id in netlist[:5]:
+        grid.add_wire_list(a_star_algorithm(nodes[node1_id - 1], nodes[node2_id - 1], grid))
+    check_invariants(grid)
+    before = grid_state(grid)
+
+    grid.begin()
+    transactions = 1
+    snapshot = None
+    for _ in range(40):
+        step = rng.randrange(6)
+        if step == 0 or step == 1:
+            node1_id, node2_id = rng.choice(netlist)
+            wire = rng.choice(routers)(nodes[node1_id - 1], nodes[node2_id - 1], grid)
+            if wire is not None:
+                grid.add_wire_list(wire)
+        elif step == 2 and grid.return_wire_list():
+            grid.remove_wire(rng.choice(grid.return_wire_list()))
+        elif step == 3:
+            if rng.random() < 0.5:
+                grid.clear_wires()
+            else:
+                grid.apply_costs_around_nodes()
+        elif step == 4:
+            if snapshot is None:
+                snapshot, snapshot_state = grid.snapshot(), grid_state(grid)
+            else:
+                grid.restore(snapshot)
+                assert grid_state(grid) == snapshot_state
+                snapshot = None
+        else:
+            # A snapshot is only restored inside the transaction it was taken in
+            grid.begin()
+            transactions += 1
+            snapshot = None
+        check_invariants(grid)
+
+    for _ in range(transactions):
+        grid.rollback()
+    assert grid_state(grid) == before
+    check_invariants(grid)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('netlist, functie', [(4, a_star_algorithm), (2, manhattan_wire), (4, manhattan_wire)])
+def test_delta_cost_matches_the_cost(load_netlist, backend, netlist, functie):
+    context = load_netlist(netlist)
+    grid, _, _ = initialise_grid(context, 'a', backend=backend)
+    _, wires = route_ordering(functie, list(context.give_netlist()), context.give_nodes(), grid)
+    assert grid.total_intersections() > 0
+    recount = sum(len(wire.give_wirepoints()) - 1 for wire in wires) + 300 * grid.count_intersections()
+    assert grid.cost() == recount
+
+    for wire in list(wires):
+        cost = grid.cost()
+        removal = grid.delta_cost(wire, remove=True)
+        grid.begin()
+        grid.remove_wire(wire)
+        assert grid.cost() - cost == removal
+
+        # Adding the wire back is what the rollback does
+        addition = grid.delta_cost(wire)
+        grid.rollback()
+        assert addition == -removal
+        assert grid.cost() == cost
+    check_invariants(grid)
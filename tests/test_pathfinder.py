@@ -0,0 +1,64 @@
+"""
+Tests of the negotiated congestion router.
+
+Run from the main directory:
+    python -m pytest -q
+"""
+import pytest
+
+from code.classes.grid_class import BACKENDS, initialise_grid
+from code.pathfinder import pathfinder_routing
+
+
+def check_wire(wire, node1, node2) -> None:
+    """
+    Checks that a wire runs in unit steps from node1 to node2.
+    """
+    places = [point.give_place() for point in wire.give_wirepoints()]
+    assert places[0] == (node1.give_x(), node1.give_y(), 0)
+    assert places[-1] == (node2.give_x(), node2.give_y(), 0)
+    for (x1, y1, z1), (x2, y2, z2) in zip(places, places[1:]):
+        assert abs(x1 - x2) + abs(y1 - y2) + abs(z1 - z2) == 1
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('netlist', [1, 2, 3])
+def test_pathfinder_routes_without_sharing(load_netlist, backend, netlist):
+    context = load_netlist(netlist)
+    nodes = context.give_nodes()
+    connections = list(context.give_netlist())
+    grid, _, _ = initialise_grid(context, 'p', backend=backend)
+
+    success, wires, stats = pathfinder_routing(connections, nodes, grid)
+    assert success
+    assert len(stats['cost_per_round']) == stats['rounds'] + 1
+    assert stats['routings'] >= len(connections)
+
+    # The wires follow the netlist and no two of them share a segment or a cell outside the gates
+    segments = set()
+    for (node1_id, node2_id), wire in zip(connections, wires):
+        check_wire(wire, nodes[node1_id - 1], nodes[node2_id - 1])
+        points = wire.give_wirepoints()
+        for start, finish in zip(points, points[1:]):
+            segment = frozenset((start.give_place(), finish.give_place()))
+            assert segment not in segments
+            segments.add(segment)
+    assert grid.count_intersections() == 0
+
+    # The best round is left on the grid
+    assert grid.return_wire_list() == wires
+    assert grid.cost() == sum(len(wire.give_wirepoints()) - 1 for wire in wires)
+    assert grid.cost() in stats['cost_per_round']
+
+
+def test_pathfinder_without_rounds_routes_every_net_once(load_netlist):
+    context = load_netlist(4)
+    connections = list(context.give_netlist())
+    grid, _, _ = initialise_grid(context, 'p')
+
+    _, wires, stats = pathfinder_routing(connections, context.give_nodes(), grid, max_rounds=0)
+    assert stats['rounds'] == 0
+    assert stats['routings'] == len(connections)
+    assert stats['cost_per_round'] == [grid.cost()]
+    assert grid.count_intersections() == grid.total_intersections()
+    assert len(wires) == len(connections)
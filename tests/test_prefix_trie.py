@@ -0,0 +1,74 @@
+"""
+Tests of routing the shared prefixes of orderings once.
+
+Run from the main directory:
+    python -m pytest -q
+"""
+import random
+
+import pytest
+
+from code.algorithms import a_star_algorithm, bidirectional_a_star_algorithm, dfs_algorithm, lee_algorithm, manhattan_wire
+from code.classes.grid_class import BACKENDS, initialise_grid
+from code.engine import route_ordering
+from code.prefix_trie import OrderingTrie, evaluate_orderings_trie
+
+
+def prefix_orderings(context, amount: int, seed: int) -> list:
+    """
+    Returns orderings that only differ in the order of their last few connections, so they share prefixes.
+    The first ordering is given twice.
+    """
+    rng = random.Random(seed)
+    netlist = list(context.give_netlist())
+    orderings = [list(netlist)]
+    for _ in range(amount - 1):
+        split = rng.randrange(max(len(netlist) - 4, 0), len(netlist))
+        orderings.append(netlist[:split] + rng.sample(netlist[split:], len(netlist) - split))
+    return orderings
+
+
+def places(wires) -> list:
+    """
+    Returns the coordinates of the wirepoints of every wire.
+    """
+    return [[point.give_place() for point in wire.give_wirepoints()] for wire in wires]
+
+
+def test_trie_keeps_every_ordering():
+    orderings = [[(1, 2), (3, 4)], [(1, 2), (5, 6)], [(1, 2), (3, 4)], [(3, 4)]]
+    trie = OrderingTrie()
+    for index, ordering in enumerate(orderings):
+        trie.add(ordering, index)
+    assert sorted(trie.give_orderings()) == [0, 1, 2, 3]
+    assert list(trie.children) == [(1, 2), (3, 4)]
+    assert trie.children[(1, 2)].children[(3, 4)].orderings == [0, 2]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('functie', [a_star_algorithm, lee_algorithm, bidirectional_a_star_algorithm, manhattan_wire])
+def test_trie_routes_like_every_ordering_alone(load_netlist, backend, functie):
+    context = load_netlist(2)
+    nodes = context.give_nodes()
+    orderings = prefix_orderings(context, 8, 1)
+
+    grid, _, _ = initialise_grid(context, 'a', backend=backend)
+    results, routings = evaluate_orderings_trie(functie, orderings, nodes, grid)
+    assert routings < sum(len(ordering) for ordering in orderings)
+
+    # Every ordering gets what routing it on its own gives
+    for ordering, (success, cost, wires) in zip(orderings, results):
+        expected_success, expected_wires = route_ordering(functie, ordering, nodes, grid)
+        assert success == expected_success
+        if success:
+            assert cost == grid.cost()
+            assert places(wires) == places(expected_wires)
+        else:
+            assert cost is None and wires is None
+
+
+def test_trie_rejects_dfs(load_netlist):
+    context = load_netlist(1)
+    grid, _, _ = initialise_grid(context, 'd')
+    with pytest.raises(ValueError):
+        evaluate_orderings_trie(dfs_algorithm, [list(context.give_netlist())], context.give_nodes(), grid)
@@ -0,0 +1,73 @@
+"""
+Tests of the bounded Q-table of the Q-learning ordering mode.
+
+Run from the main directory:
+    python -m pytest -q
+"""
+import pytest
+
+from code.classes.qtable_class import QTable
+
+ORDERINGS = [[(1, 2), (3, 4)], [(3, 4), (1, 2)], [(1, 3), (2, 4)], [(2, 4), (1, 3)]]
+
+
+def test_least_recently_used_state_is_dropped():
+    table = QTable(max_states=2)
+    first, second, third = (table.encode_state(ordering) for ordering in ORDERINGS[:3])
+    table.update(first, (0, 1), 1.0, second, alpha=0.5, gamma=0.9)
+    table.update(second, (0, 1), 1.0, first, alpha=0.5, gamma=0.9)
+
+    # Reading the first state makes the second one the least recently used
+    assert table.best_action(first) == (0, 1)
+    table.update(third, (1, 0), 1.0, first, alpha=0.5, gamma=0.9)
+    assert len(table) == 2
+    assert table.give_actions(second) == {}
+    assert table.give_actions(first) == {(0, 1): 0.5}
+
+
+def test_update_follows_the_q_learning_formula():
+    table = QTable()
+    state, next_state = table.encode_state(ORDERINGS[0]), table.encode_state(ORDERINGS[1])
+    table.update(next_state, (1, 0), 2.0, state, alpha=1.0, gamma=0.0)
+    table.update(state, (0, 1), 1.0, next_state, alpha=0.5, gamma=0.5)
+    assert table.give_actions(state) == {(0, 1): 0.5 * (1.0 + 0.5 * 2.0)}
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_save_and_load_keep_the_table(tmp_path, compact):
+    table = QTable(max_states=10, compact=compact)
+    states = [table.encode_state(ordering) for ordering in ORDERINGS]
+    for k, state in enumerate(states):
+        table.update(state, (0, k), float(k), states[0], alpha=0.5, gamma=0.9)
+
+    path = str(tmp_path / 'q_table.json')
+    table.save(path)
+    loaded = QTable.load(path)
+    assert (loaded.max_states, loaded.compact, len(loaded)) == (10, compact, len(states))
+    for state in states:
+        assert loaded.give_actions(state) == table.give_actions(state)
+
+
+def test_load_shrinks_and_compacts(tmp_path):
+    table = QTable(max_states=10)
+    states = [table.encode_state(ordering) for ordering in ORDERINGS]
+    for k, state in enumerate(states):
+        table.update(state, (0, 1), float(k), state, alpha=1.0, gamma=0.0)
+    path = str(tmp_path / 'q_table.json')
+    table.save(path)
+
+    # The least recently used states are dropped, the others are stored as hashes
+    loaded = QTable.load(path, max_states=2, compact=True)
+    assert loaded.compact and len(loaded) == 2
+    assert loaded.give_actions(loaded.encode_state(ORDERINGS[0])) == {}
+    assert loaded.give_actions(loaded.encode_state(ORDERINGS[3])) == {(0, 1): 3.0}
+
+    # A compact table can't become a full one again
+    loaded.save(path)
+    with pytest.raises(ValueError):
+        QTable.load(path, compact=False)
+
+
+def test_table_holds_a_state():
+    with pytest.raises(ValueError):
+        QTable(max_states=0)
@@ -0,0 +1,48 @@
+"""
+Tests of the search kernel: the bucket queue of Lee against its heap.
+
+Run from the main directory:
+    python -m pytest -q
+"""
+import pytest
+
+from code.api import route
+from code.algorithms import lay_wire
+from code.classes.grid_class import BACKENDS, initialise_grid
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('netlist', [1, 4])
+@pytest.mark.parametrize('costs', [True, False])
+def test_buckets_match_heap(load_netlist, backend, netlist, costs):
+    context = load_netlist(netlist)
+    nodes = context.give_nodes()
+    grid, _, _ = initialise_grid(context, 'l', backend=backend)
+    kernel = grid.give_search_kernel()
+
+    # Without the costs around the nodes the field is all zero until the first wire is laid
+    grid.clear_wires()
+    if costs:
+        grid.apply_costs_around_nodes()
+
+    for node1_id, node2_id in context.give_netlist():
+        node1, node2 = nodes[node1_id - 1], nodes[node2_id - 1]
+        start = grid.index(node1.give_x(), node1.give_y(), node1.give_z())
+        end = grid.index(node2.give_x(), node2.give_y(), node2.give_z())
+
+        path = kernel.search(start, end, heuristic=False)
+        assert kernel.search_buckets(start, end) == path
+        if path is None:
+            break
+        lay_wire(node1, node2, grid, path)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_route_with_buckets(base_path, workers):
+    results = [
+        route(None, 2, 'l', 'r', 4, seed=3, workers=workers, buckets=buckets, base_path=base_path)
+        for buckets in (False, True)
+    ]
+    assert results[0].cost == results[1].cost
+    assert [[point.give_place() for point in wire.give_wirepoints()] for wire in results[0].wires] == \
+        [[point.give_place() for point in wire.give_wirepoints()] for wire in results[1].wires]
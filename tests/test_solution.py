@@ -0,0 +1,110 @@
+"""
+Tests of saving, loading and checkpointing solutions.
+
+Run from the main directory:
+    python -m pytest -q
+"""
+import pytest
+
+from code.algorithms import a_star_algorithm
+from code.api import route
+from code.classes.checkpoint_class import Checkpoint
+from code.classes.grid_class import initialise_grid
+from code.engine import route_ordering
+from code.solution import check_solution, load_solution, read_solution, save_solution
+
+
+def places(wires) -> list:
+    """
+    Returns the coordinates of the wirepoints of every wire.
+    """
+    return [[point.give_place() for point in wire.give_wirepoints()] for wire in wires]
+
+
+@pytest.fixture
+def routed(load_netlist):
+    """
+    Returns the context, wires and cost of netlist 4 routed with A*.
+    """
+    context = load_netlist(4)
+    grid, _, _ = initialise_grid(context, 'a')
+    success, wires = route_ordering(a_star_algorithm, list(context.give_netlist()), context.give_nodes(), grid)
+    assert success
+    return context, wires, grid.cost()
+
+
+@pytest.mark.parametrize('extension', ['.npz', '.csv'])
+def test_saved_solution_loads_the_same_grid(tmp_path, base_path, routed, extension):
+    context, wires, cost = routed
+    path = str(tmp_path / f'solution{extension}')
+    save_solution(path, wires, context, 1, 4, cost)
+
+    chip, netlist, saved_cost, saved_wires = read_solution(path)
+    assert (chip, netlist, saved_cost) == (1, 4, cost)
+    assert [points for _, points in saved_wires] == places(wires)
+
+    loaded_wires, grid, info = load_solution(path, base_path)
+    assert info == {'chip': 1, 'netlist': 4, 'cost': cost}
+    assert places(loaded_wires) == places(wires)
+    assert grid.cost() == cost
+    assert check_solution(loaded_wires, grid) == []
+
+
+def test_formats_convert_into_each_other(tmp_path, base_path, routed):
+    context, wires, cost = routed
+    save_solution(str(tmp_path / 'solution.npz'), wires, context, 1, 4, cost)
+    loaded_wires, grid, _ = load_solution(str(tmp_path / 'solution.npz'), base_path)
+    save_solution(str(tmp_path / 'solution.csv'), loaded_wires, grid.give_context(), 1, 4, grid.cost())
+    assert read_solution(str(tmp_path / 'solution.csv')) == read_solution(str(tmp_path / 'solution.npz'))
+
+
+def test_check_solution_finds_a_missing_net(tmp_path, base_path, routed):
+    context, wires, cost = routed
+    path = str(tmp_path / 'solution.npz')
+    save_solution(path, wires[1:], context, 1, 4, cost)
+    loaded_wires, grid, _ = load_solution(path, base_path)
+    assert len(check_solution(loaded_wires, grid)) == 1
+
+
+def test_checkpoint_writes_the_best_solution(tmp_path, routed):
+    context, wires, cost = routed
+    path = str(tmp_path / 'checkpoint.npz')
+
+    # Within the interval nothing is written until flush()
+    checkpoint = Checkpoint(path, context, 1, 4, interval=3600)
+    checkpoint.update(wires, cost)
+    checkpoint.update(None, float('inf'))
+    assert checkpoint.writes == 0
+    checkpoint.flush()
+    checkpoint.flush()
+    assert checkpoint.writes == 1
+    assert read_solution(path)[2] == cost
+
+    # A worse solution doesn't replace the best one
+    checkpoint = Checkpoint(path, context, 1, 4, interval=0)
+    checkpoint.update(wires, cost)
+    checkpoint.update(wires[:1], cost + 1)
+    assert checkpoint.writes == 1
+    assert read_solution(path)[2] == cost
+
+
+def test_resume_keeps_the_checkpoint_as_best_grid(tmp_path, base_path):
+    path = str(tmp_path / 'checkpoint.npz')
+    first = route(None, 4, 'a', 'r', 5, seed=1, checkpoint=path, base_path=base_path)
+    assert first.success
+    assert read_solution(path)[2] == first.cost
+
+    resumed = route(None, 4, 'a', 'r', 2, seed=2, resume=path, base_path=base_path)
+    assert resumed.success
+    assert resumed.cost <= first.cost
+    assert resumed.grid.cost() == resumed.cost
+
+
+def test_resume_needs_a_multiple_run(tmp_path, base_path, routed):
+    context, wires, cost = routed
+    path = str(tmp_path / 'solution.npz')
+    save_solution(path, wires, context, 1, 4, cost)
+    with pytest.raises(ValueError):
+        route(None, 4, 'a', 'r', 1, resume=path, base_path=base_path)
+    with pytest.raises(ValueError):
+        route(None, 4, 'p', 'r', 5, resume=path, base_path=base_path)
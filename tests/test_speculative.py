@@ -0,0 +1,84 @@
+"""
+Tests of speculative routing: the workers that search ahead may not change the wires.
+
+Run from the main directory:
+    python -m pytest -q
+"""
+import random
+
+import pytest
+
+from code.algorithms import a_star_algorithm, bidirectional_a_star_algorithm, lee_algorithm
+from code.api import route
+from code.classes.grid_class import initialise_grid
+from code.engine import route_ordering
+from code.speculative import SpeculativeRouter
+
+
+def wire_places(wires) -> list:
+    return [[point.give_place() for point in wire.give_wirepoints()] for wire in wires]
+
+
+@pytest.mark.parametrize('functie, backend', [
+    (a_star_algorithm, 'dense'), (lee_algorithm, 'dense'), (bidirectional_a_star_algorithm, 'dense'),
+    (a_star_algorithm, 'sparse'),
+])
+def test_orderings_match_sequential_routing(load_netlist, backend, functie):
+    context = load_netlist(4)
+    nodes = context.give_nodes()
+    netlist = list(context.give_netlist())
+    rng = random.Random(2)
+    orderings = [rng.sample(netlist, len(netlist)) for _ in range(4)]
+
+    grid, _, _ = initialise_grid(context, 'a', backend=backend)
+    expected = []
+    for ordering in orderings:
+        success, wires = route_ordering(functie, ordering, nodes, grid)
+        expected.append((success, wire_places(wires), grid.cost()))
+
+    speculative_grid, _, _ = initialise_grid(context, 'a', backend=backend)
+    with SpeculativeRouter(context, 'a', functie, 2, backend=backend) as router:
+        for ordering, result in zip(orderings, expected):
+            success, wires = route_ordering(functie, ordering, nodes, speculative_grid, speculative=router)
+            assert (success, wire_places(wires), speculative_grid.cost()) == result
+        stats = router.give_stats()
+
+    assert stats['used'] > 0
+    assert stats['used'] + stats['conflicts'] <= stats['speculated']
+
+
+@pytest.mark.parametrize('algorithm', ['a', 'l', 'b'])
+@pytest.mark.parametrize('iterations, sort', [(1, 'd'), (5, 'r'), (5, 'q')])
+def test_route_matches_without_speculation(base_path, algorithm, iterations, sort):
+    results = [
+        route(None, 4, algorithm, sort, iterations, seed=5, speculative=speculative, base_path=base_path)
+        for speculative in (0, 2)
+    ]
+    assert results[0].cost == results[1].cost
+    assert results[0].successful == results[1].successful
+    assert wire_places(results[0].wires or []) == wire_places(results[1].wires or [])
+    assert 'speculative' in results[1].stats
+
+
+@pytest.mark.parametrize('algorithm, options', [
+    ('a', {'prune': True}), ('l', {'buckets': True}), ('a', {'backend': 'sparse'}),
+])
+def test_route_with_options_matches(base_path, algorithm, options):
+    results = [
+        route(None, 4, algorithm, 'r', 4, seed=1, speculative=speculative, base_path=base_path, **options)
+        for speculative in (0, 3)
+    ]
+    assert results[0].cost == results[1].cost
+    assert results[0].tries == results[1].tries
+    assert wire_places(results[0].wires) == wire_places(results[1].wires)
+
+
+@pytest.mark.parametrize('options, message', [
+    ({'algorithm': 'm'}, "only works for"),
+    ({'workers': 2}, "can't be combined"),
+    ({'share_prefixes': True}, "can't be combined"),
+])
+def test_speculative_rejects_other_options(base_path, options, message):
+    options = {'algorithm': 'a', **options}
+    with pytest.raises(ValueError, match=message):
+        route(None, 1, sort='r', iterations=3, speculative=2, base_path=base_path, **options)